@@ -0,0 +1,1210 @@
+"""
+Benchmarks for the Piper TTS service (not shipped in the Docker image).
+
+Run from tts-service/ on a host with the model files in place:
+
+    python bench.py engines                # Piper subprocess/pool vs in-process onnx engine
+    python bench.py normalize              # vectorized vs legacy per-sample output normalization
+    python bench.py text                   # compiled text normalization: equivalence + throughput
+    python bench.py chunker                # linear-time chunker vs legacy on 100k+ char inputs
+    python bench.py features               # single-pass chunk features: equivalence + per-chunk cost
+    python bench.py frontend               # chars/sec per text front-end stage, no Piper binary needed
+    python bench.py makespan               # chapter wall time: text-order vs longest-chunk-first dispatch
+    python bench.py loudness               # whole-file vs streamed normalization: loudness deviation checks
+
+Front-end baselines are per host: record one with `frontend --save-baseline FILE`, then run
+`frontend --baseline FILE` after a change; it exits non-zero when a stage got slower than
+--threshold allows.
+
+Environment variables (MODEL_PATH, PIPER_BINARY, MAX_PARALLEL_PIPER, ...) are the same as for server.py.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import re
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import server
+
+CORPUS = """Es war einmal ein kleiner Drache namens Funkel, der am Rand des Nebelwaldes wohnte. Jeden Morgen flog er über die Wiesen und zählte die Wolken.
+
+"Guten Morgen, Funkel!", rief Emma vom Gartenzaun. "Hast du heute schon die Sonne gesehen?"
+
+Funkel schüttelte den Kopf. "Nein", murmelte er, "die Sonne versteckt sich hinter dem Berg. Vielleicht ist sie müde."
+
+Emma lachte und kletterte auf den alten Apfelbaum. Von dort oben konnte sie bis zum Fluss sehen, wo die Enten im Schilf schnatterten. Plötzlich hörte sie ein lautes Platsch! Ein Fisch war aus dem Wasser gesprungen.
+
+"Hast du das gesehen?", flüsterte Emma aufgeregt. "Der Fisch war so groß wie ein Brot!"
+
+Der kleine Drache breitete seine Flügel aus. Dann flog er los, über die Brücke und an der Mühle vorbei, bis er am Ufer landete. Das Wasser glitzerte, und irgendwo im Schilf quakte ein Frosch.
+
+Doch der Fisch war verschwunden. Nur ein paar Luftblasen stiegen noch auf ... und dann war alles still.
+
+"Morgen", sagte Funkel leise, "morgen finden wir ihn bestimmt."
+
+Emma nickte. Zusammen gingen sie nach Hause, während die Sonne endlich hinter dem Berg hervorkam und den ganzen Wald in goldenes Licht tauchte."""
+
+DIALOGUE_CORPUS = """Kapitel 3: Der Besuch beim Uhrmacher
+
+Um 7:30 Uhr klopfte es an der Tür. "Wer ist da?", fragte Opa Ben und schob die Brille zurecht.
+
+"Ich bin's!", rief Emma. "Und Funkel ist auch dabei!"
+
+Opa Ben öffnete. Der kleine Drache streckte den Kopf herein und schnupperte. "Hier riecht es nach Öl und Kuchen", flüsterte er.
+
+"Das ist Apfelkuchen", sagte Opa Ben ruhig. "Den gibt es aber erst, wenn die Turmuhr wieder geht."
+
+Emma: "Ist sie schon wieder kaputt?"
+
+"Seit Montag, d.h. seit genau 3 Tagen. Dr. Sommer meint, ein Zahnrad ist gebrochen." Opa Ben seufzte. "Ca. 120 Zahnräder hat die alte Uhr, und ich finde das kaputte nicht."
+
+Funkel brüllte vor Begeisterung: "Ich kann in den Turm fliegen! Ich kann überall hin!"
+
+"Nicht so laut!", lachte Emma. "Sonst wachen die Fledermäuse auf."
+
+Sie stiegen die Wendeltreppe hinauf, Stufe für Stufe, bis ganz nach oben. Dort tickte nichts ... gar nichts. Nur der Wind pfiff durch die Ritzen.
+
+"Da!", schrie Funkel plötzlich. "Da unten, neben dem großen Rad, z.B. dort, wo es glitzert!"
+
+Opa Ben kniff die Augen zusammen. "Tatsächlich", murmelte er. "Das ist Nr. 47. Du hast es gefunden, Funkel."
+
+Der Drache strahlte. Emma jubelte und klatschte in die Hände. Um 12:00 Uhr schlug die Turmuhr zum ersten Mal seit Tagen wieder, und alle im Dorf sahen zum Turm hinauf."""
+
+
+def _audio_seconds(pcm_bytes, sample_rate):
+    return pcm_bytes / 2.0 / sample_rate
+
+
+def _piper_chunk(chunk, params):
+    # Bypass generate_pcm_chunk so TTS_ENGINE=onnx does not redirect the Piper side.
+    if server._piper_pool is not None:
+        return server._piper_pool.synthesize(chunk, *params)
+    return server._generate_pcm_chunk_subprocess(chunk, *params)
+
+
+def _bench_piper(chunks, chunk_params):
+    workers = max(1, min(server.MAX_PARALLEL_PIPER, len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pcm_chunks = list(pool.map(lambda item: _piper_chunk(*item), zip(chunks, chunk_params)))
+    return sum(len(pcm) for pcm in pcm_chunks)
+
+
+def _bench_onnx(engine, chunks, chunk_params):
+    return sum(pcm.nbytes for pcm in engine.synthesize_many(chunks, chunk_params))
+
+
+def bench_engines(args):
+    chunks, chunk_params = server._prepare_chunks(
+        CORPUS, server.DEFAULT_LENGTH_SCALE, server.DEFAULT_NOISE_SCALE, server.DEFAULT_NOISE_W
+    )
+    print(f"Corpus: {len(CORPUS)} chars, {len(chunks)} chunks")
+
+    engines = []
+    if os.path.exists(server.PIPER_BINARY):
+        engines.append(('piper', lambda: _bench_piper(chunks, chunk_params), server.MODEL_SAMPLE_RATE))
+    if server.ort is not None and server.phonemize_espeak is not None:
+        onnx_engine = server._onnx_engine or server.OnnxSynthesisEngine(server.MODEL_PATH, server.MODEL_CONFIG_PATH)
+        engines.append(('onnx', lambda: _bench_onnx(onnx_engine, chunks, chunk_params), onnx_engine.sample_rate))
+    if not engines:
+        print("No engine available (Piper binary missing and onnxruntime not installed)")
+        return 1
+
+    for name, run, sample_rate in engines:
+        run()  # warm-up: worker start / session init
+        timings = []
+        audio_bytes = 0
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            audio_bytes = run()
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        audio_seconds = _audio_seconds(audio_bytes, sample_rate)
+        rtf = best / audio_seconds if audio_seconds else float('inf')
+        print(f"{name:>6}: best {best:.2f}s, mean {sum(timings) / len(timings):.2f}s, "
+              f"audio {audio_seconds:.1f}s, RTF {rtf:.3f}")
+    return 0
+
+
+def _legacy_postprocess_pcm(pcm_bytes, sample_rate):
+    """Reference copy of the original per-sample normalization loop."""
+    pcm = bytearray(pcm_bytes)
+    sample_count = len(pcm) // 2
+    if sample_count <= 0:
+        return pcm_bytes
+
+    max_abs = 0
+    for i in range(0, len(pcm), 2):
+        value = struct.unpack_from('<h', pcm, i)[0]
+        abs_value = abs(value)
+        if abs_value > max_abs:
+            max_abs = abs_value
+
+    if max_abs == 0:
+        return pcm_bytes
+
+    target_peak = server._clamp(server.OUTPUT_TARGET_PEAK, 0.10, 0.99)
+    target_amplitude = int(32767 * target_peak)
+    gain = server._clamp(target_amplitude / max_abs, 0.60, 2.50)
+
+    fade_samples = int(max(0, server.OUTPUT_EDGE_FADE_MS) * sample_rate / 1000)
+    fade_samples = min(fade_samples, sample_count // 2)
+
+    for sample_index in range(sample_count):
+        raw_value = struct.unpack_from('<h', pcm, sample_index * 2)[0]
+        scaled = int(raw_value * gain)
+
+        if fade_samples > 0:
+            if sample_index < fade_samples:
+                scaled = int(scaled * (sample_index / fade_samples))
+            elif sample_index >= (sample_count - fade_samples):
+                tail_pos = sample_count - sample_index - 1
+                scaled = int(scaled * (tail_pos / fade_samples))
+
+        scaled = max(-32768, min(32767, scaled))
+        struct.pack_into('<h', pcm, sample_index * 2, scaled)
+
+    return bytes(pcm)
+
+
+def _synthetic_speech_pcm(seconds, sample_rate, seed=7):
+    """Speech-like int16 PCM: random syllable bursts with pauses, peak well below full scale."""
+    rng = random.Random(seed)
+    samples = server.np.zeros(int(seconds * sample_rate), dtype=server.np.int16)
+    position = 0
+    while position < samples.size:
+        burst = rng.randint(sample_rate // 20, sample_rate // 4)
+        amplitude = rng.randint(2000, 14000)
+        t = server.np.arange(min(burst, samples.size - position))
+        samples[position:position + t.size] = (amplitude * server.np.sin(t * rng.uniform(0.02, 0.2))).astype(server.np.int16)
+        position += t.size + rng.randint(0, sample_rate // 10)
+    return samples.tobytes()
+
+
+def bench_normalize(args):
+    if not server.ENABLE_OUTPUT_NORMALIZATION:
+        print("ENABLE_OUTPUT_NORMALIZATION is off; nothing to measure")
+        return 1
+
+    sample_rate = server.MODEL_SAMPLE_RATE
+    failures = 0
+    for minutes in args.minutes:
+        pcm = _synthetic_speech_pcm(minutes * 60, sample_rate)
+
+        fast = bytearray(pcm)
+        start = time.perf_counter()
+        server._postprocess_output_pcm(fast, sample_rate)
+        fast_time = time.perf_counter() - start
+
+        line = f"{minutes:>4g} min ({len(pcm) / 1e6:.1f} MB): vectorized {fast_time * 1000:.0f} ms"
+        if minutes <= args.legacy_max_minutes:
+            start = time.perf_counter()
+            legacy = _legacy_postprocess_pcm(pcm, sample_rate)
+            legacy_time = time.perf_counter() - start
+            identical = legacy == fast
+            failures += 0 if identical else 1
+            line += (f", legacy {legacy_time:.1f} s, speedup {legacy_time / fast_time:.0f}x, "
+                     f"identical={identical}")
+        print(line)
+    return 1 if failures else 0
+
+
+def _legacy_enhance_story_text_for_tts(text):
+    """Reference copy of the original _enhance_story_text_for_tts."""
+    # Parenthetical fragments usually sound better with short pauses.
+    text = re.sub(r'\(([^)]+)\)', r', \1,', text)
+
+    # Chapter titles and section headers should become spoken sentence starts.
+    text = re.sub(r'(?im)^\s*(kapitel\s+\d+)\s*[:\-]\s*', r'\1. ', text)
+    text = re.sub(r'(?im)^\s*(szene\s+\d+)\s*[:\-]\s*', r'\1. ', text)
+
+    # Semicolons are often swallowed in TTS, convert to clearer sentence breaks.
+    text = re.sub(r';\s*', '. ', text)
+
+    # Protect spoken rhythm for common symbol patterns.
+    text = re.sub(r'\s*/\s*', ' oder ', text)
+    text = re.sub(r'\s*&\s*', ' und ', text)
+
+    # Normalize punctuation bursts.
+    text = re.sub(r'!{3,}', '!!', text)
+    text = re.sub(r'\?{3,}', '??', text)
+    text = re.sub(r'\.{5,}', '...', text)
+
+    # Add a small pause before abrupt topic changes.
+    text = re.sub(r'([.!?])\s*(Doch|Aber|Plötzlich|Dann)\b', r'\1 ... \2', text)
+
+    return text
+
+
+def _legacy_preprocess_text(text):
+    """Reference copy of the original preprocess_text."""
+    # ── Abbreviations ──
+    text = re.sub(r'\bz\.B\.\b', 'zum Beispiel', text)
+    text = re.sub(r'\bd\.h\.\b', 'das heißt', text)
+    text = re.sub(r'\bu\.a\.\b', 'unter anderem', text)
+    text = re.sub(r'\bbzw\.\b', 'beziehungsweise', text)
+    text = re.sub(r'\busw\.\b', 'und so weiter', text)
+    text = re.sub(r'\bu\.s\.w\.\b', 'und so weiter', text)
+    text = re.sub(r'\bca\.\b', 'circa', text)
+    text = re.sub(r'\bDr\.\b', 'Doktor', text)
+    text = re.sub(r'\bProf\.\b', 'Professor', text)
+    text = re.sub(r'\bHr\.\b', 'Herr', text)
+    text = re.sub(r'\bFr\.\b', 'Frau', text)
+    text = re.sub(r'\bNr\.\b', 'Nummer', text)
+    text = re.sub(r'\bSt\.\b', 'Sankt', text)
+    text = re.sub(r'\bStr\.\b', 'Straße', text)
+    text = re.sub(r'\bo\.ä\.\b', 'oder ähnliches', text)
+    text = re.sub(r'\bs\.o\.\b', 'siehe oben', text)
+    text = re.sub(r'\bggf\.\b', 'gegebenenfalls', text)
+    text = re.sub(r'\bevtl\.\b', 'eventuell', text)
+    text = re.sub(r'\bMio\.\b', 'Millionen', text)
+    text = re.sub(r'\bMrd\.\b', 'Milliarden', text)
+    # ── Time expressions: 14:30 → vierzehn Uhr dreißig ──
+    def time_to_german(m):
+        h = int(m.group(1))
+        mins = int(m.group(2))
+        result = server.number_to_german(h) + ' Uhr'
+        if mins > 0:
+            result += ' ' + server.number_to_german(mins)
+        return result
+    text = re.sub(r'\b(\d{1,2}):(\d{2})\b', time_to_german, text)
+    # ── Normalize German quotation marks to ASCII for consistent handling ──
+    text = text.replace('\u201e', '"')   # „ → "
+    text = text.replace('\u201c', '"')   # " → "
+    text = text.replace('\u201d', '"')   # " → "
+    text = text.replace('\u00bb', '"')   # » → "
+    text = text.replace('\u00ab', '"')   # « → "
+    text = text.replace('\u203a', '"')   # › → "
+    text = text.replace('\u2039', '"')   # ‹ → "
+    # ── Remove markdown artifacts ──
+    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
+    text = re.sub(r'\*(.+?)\*', r'\1', text)
+    text = re.sub(r'#{1,6}\s*', '', text)
+    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
+    # ── Scene transition markers → pause ──
+    text = re.sub(r'^[\*\-]{3,}\s*$', '...', text, flags=re.MULTILINE)
+    # ── Normalize dashes ──
+    text = text.replace('\u2014', ', ')  # em-dash
+    text = text.replace('\u2013', ', ')  # en-dash
+    # ── Whitespace cleanup ──
+    text = re.sub(r'\n+', '\n\n', text)
+    text = re.sub(r'[ \t]+', ' ', text)
+    return text.strip()
+
+
+def _legacy_prepare_for_tts(text):
+    """Reference copy of the original prepare_for_tts."""
+    # ── 1. Paragraph breaks → sentence-ending pause ──
+    # Piper ignores \n\n. Replace with period + newline so it creates a real pause.
+    # Do this FIRST so later rules operate on clean text.
+    text = re.sub(r'\n\n+', '.\n\n', text)
+    # Clean up double periods (but preserve intentional ellipses)
+    text = re.sub(r'\.{2}(?!\.)', '.', text)
+
+    # ── 2. Dialogue pauses: breathing room around quoted speech ──
+    # Insert pause before opening quote when preceded by sentence-ending punctuation
+    text = re.sub(r'([.!?])\s*"', r'\1 ... "', text)
+    # Pause after closing quote before speech attribution verbs
+    attribution_verbs = (
+        'sagte|rief|flüsterte|fragte|antwortete|meinte|murmelte|schrie|lachte|'
+        'erklärte|bat|dachte|brummte|seufzte|stöhnte|jubelte|wisperte|knurrte|'
+        'hauchte|schluchzte|jammerte|staunte|schnaubte|zischte|sang|brüllte'
+    )
+    text = re.sub(
+        r'([.!?])"\s*,?\s*(' + attribution_verbs + r')',
+        r'\1" ... \2', text
+    )
+    # Pause before opening quote when starting speech mid-narration
+    text = re.sub(r'(\w{3,}):\s*"', r'\1: ... "', text)
+
+    # ── 3. Exclamation/question emphasis ──
+    text = re.sub(r'!\s', '!! ', text)
+    text = re.sub(r'\?\s', '?? ', text)
+
+    # ── 4. Comma breathing: add commas at natural breath points ──
+    # Before subordinate conjunctions
+    text = re.sub(
+        r'(\w{4,})\s+(wenn|als|weil|dass|aber|doch|denn|obwohl|damit|bevor|nachdem|während|sobald|ob|falls|solange)\s',
+        r'\1, \2 ', text
+    )
+    # Before "und" / "oder" in longer clauses (only when preceded by 6+ chars to avoid short phrases)
+    text = re.sub(r'(\w{6,})\s+(und|oder)\s+(\w{4,})', r'\1, \2 \3', text)
+
+    # ── 5. Interjection pauses ──
+    # Common German interjections get a micro-pause after them
+    interjections = (
+        'Ach|Oh|Ah|Ooh|Wow|Hey|Hm|Hmm|Na|Naja|Tja|Aha|Ohje|Hoppla|'
+        'Hurra|Ups|Autsch|Aua|Igitt|Pfui|Juhu|Oje|Mensch|Mist|Donnerwetter'
+    )
+    text = re.sub(r'\b(' + interjections + r')([,!]?\s)', r'\1, ... ', text)
+
+    # ── 6. Number pronunciation ──
+    text = re.sub(r'\b(\d+)\b', lambda m: server.number_to_german(int(m.group(1))), text)
+
+    # ── 7. Onomatopoeia emphasis: stretch sound words for kids ──
+    sound_words = {
+        'Platsch': 'Plaatsch', 'platsch': 'plaatsch',
+        'Bumm': 'Buumm', 'bumm': 'buumm',
+        'Puff': 'Puuff', 'puff': 'puuff',
+        'Knall': 'Knaall', 'knall': 'knaall',
+        'Zisch': 'Ziisch', 'zisch': 'ziisch',
+        'Klopf': 'Kloopf', 'klopf': 'kloopf',
+        'Plopp': 'Ploopp', 'plopp': 'ploopp',
+        'Krach': 'Kraach', 'krach': 'kraach',
+        'Huiii': 'Huuiii',
+        'Pssst': 'Psssst',
+        'Huch': 'Huuch', 'huch': 'huuch',
+        'Wusch': 'Wuusch', 'wusch': 'wuusch',
+        'Schwupp': 'Schwuupp', 'schwupp': 'schwuupp',
+        'Rums': 'Ruums', 'rums': 'ruums',
+        'Piep': 'Pieep', 'piep': 'pieep',
+        'Miau': 'Miaauu', 'miau': 'miaauu',
+        'Wuff': 'Wuuff', 'wuff': 'wuuff',
+        'Brumm': 'Bruumm', 'brumm': 'bruumm',
+        'Ratsch': 'Raatsch', 'ratsch': 'raatsch',
+        'Klirr': 'Kliirr', 'klirr': 'kliirr',
+        'Kling': 'Kliing', 'kling': 'kliing',
+        'Dong': 'Doong', 'dong': 'doong',
+        'Tock': 'Toock', 'tock': 'toock',
+        'Tick': 'Tiick', 'tick': 'tiick',
+    }
+    for word, replacement in sound_words.items():
+        text = re.sub(r'\b' + re.escape(word) + r'\b', replacement, text)
+
+    # ── 8. Trailing ellipsis for suspense sentences ──
+    # "Er öffnete die Tür." at end of paragraph → add slight suspense if followed by paragraph break
+    text = re.sub(r'([.])(\n\n)', r'\1 ...\2', text)
+
+    # ── 9. Clean up artifacts ──
+    text = re.sub(r',\s*,', ',', text)
+    text = re.sub(r'\.\s*,', '.', text)
+    text = re.sub(r',\s*\.', '.', text)
+    text = re.sub(r'\.{4,}', '...', text)   # normalize 4+ dots to 3
+    text = re.sub(r'[ \t]+', ' ', text)
+    text = re.sub(r' *\n *', '\n', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r'\s+([.!?,])', r'\1', text)  # no space before punctuation
+
+    return text.strip()
+
+
+def _legacy_frontend(text):
+    text = _legacy_preprocess_text(text)
+    text = _legacy_prepare_for_tts(text)
+    return _legacy_enhance_story_text_for_tts(text)
+
+
+def _frontend(text):
+    text = server.preprocess_text(text)
+    text = server.prepare_for_tts(text)
+    return server._enhance_story_text_for_tts(text)
+
+
+# Fragments that exercise every normalization rule, including awkward spacing and glued abbreviations.
+_FUZZ_TOKENS = (
+    'z.B.', 'z.B.Katzen', 'd.h.', 'u.a.x', 'bzw.', 'usw.', 'u.s.w.Ende', 'ca.', 'Dr.', 'Dr.Sommer', 'Prof.Bunt',
+    'Hr.Meier', 'Fr.Klee', 'Nr.', 'St.Martin', 'Str.', 'o.ä.', 's.o.', 's.o.ä.x', 'Dr.St.x', 'ggf.', 'evtl.',
+    'Mio.', 'Mrd.', '14:30', '7:05', '12:00', '\u201eHallo\u201c', '\u00bbNein\u00ab', '\u203aJa\u2039', '\u201d',
+    '**fett**', '*kursiv*', '# Titel', '###', '[Link](http://x)', '***', '---', '\u2014', '\u2013', 'Emma', 'Funkel',
+    'sagte', 'rief', 'flüsterte', 'wenn', 'weil', 'obwohl', 'und', 'oder', 'Wunderbar', 'Drachenkind', 'Ach', 'Oh',
+    'Hmm,', 'Juhu!', 'Platsch', 'platsch', 'Bumm', 'Huiii', 'Pssst', 'Tick', 'Tock', 'Klingel', '3', '21', '1999',
+    '12345', '"', '."', '!"', '?"', ':', ';', '/', '&', '(leise)', 'Kapitel 1:', 'Szene 2 -', '!!!!', '???',
+    '......', '....', '..', '...', '.', ',', '!', '?', 'Doch', 'Aber', 'Plötzlich', 'Dann',
+)
+_FUZZ_SEPARATORS = ('', ' ', ' ', ' ', '  ', '\n', '\n\n', '\t', ' \n ')
+
+
+def _fuzz_texts(count, seed=11):
+    rng = random.Random(seed)
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 40)):
+            parts.append(rng.choice(_FUZZ_TOKENS))
+            parts.append(rng.choice(_FUZZ_SEPARATORS))
+        yield ''.join(parts)
+
+
+def _long_story(min_chars):
+    paragraphs = CORPUS.split('\n\n')
+    out = []
+    size = 0
+    index = 0
+    while size < min_chars:
+        paragraph = paragraphs[index % len(paragraphs)]
+        out.append(paragraph)
+        size += len(paragraph) + 2
+        index += 1
+    return '\n\n'.join(out)
+
+
+def bench_text(args):
+    stages = (
+        ('preprocess_text', _legacy_preprocess_text, server.preprocess_text),
+        ('prepare_for_tts', _legacy_prepare_for_tts, server.prepare_for_tts),
+        ('_enhance_story_text_for_tts', _legacy_enhance_story_text_for_tts, server._enhance_story_text_for_tts),
+        ('full front-end', _legacy_frontend, _frontend),
+    )
+
+    samples = [CORPUS, _long_story(20000)] + list(_fuzz_texts(args.fuzz))
+    mismatches = 0
+    for name, legacy, compiled in stages:
+        failed = 0
+        for text in samples:
+            if legacy(text) != compiled(text):
+                failed += 1
+                if failed == 1:
+                    print(f"  first mismatch in {name}: {text[:120]!r}")
+        mismatches += failed
+        print(f"equivalence {name:<28} {len(samples) - failed}/{len(samples)} identical")
+
+    for size in args.sizes:
+        text = _long_story(size)
+        timings = {}
+        for label, fn in (('legacy', _legacy_frontend), ('compiled', _frontend)):
+            best = float('inf')
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                fn(text)
+                best = min(best, time.perf_counter() - start)
+            timings[label] = best
+        print(f"throughput {len(text):>7} chars: legacy {len(text) / timings['legacy'] / 1e6:.2f} Mchar/s, "
+              f"compiled {len(text) / timings['compiled'] / 1e6:.2f} Mchar/s "
+              f"({timings['legacy'] / timings['compiled']:.2f}x)")
+    return 1 if mismatches else 0
+
+
+def _legacy_split_overlong_sentence(sentence, max_chars):
+    """Reference copy of the original queue-based splitter."""
+    sentence = sentence.strip()
+    if not sentence:
+        return []
+    if len(sentence) <= max_chars:
+        return [sentence]
+
+    parts = []
+    queue = [sentence]
+    separators = [', ', '; ', ': ', ' - ', ' – ', ' und ', ' oder ', ' aber ']
+
+    while queue:
+        item = queue.pop(0).strip()
+        if not item:
+            continue
+        if len(item) <= max_chars:
+            parts.append(item)
+            continue
+
+        split_done = False
+        center = len(item) // 2
+
+        for sep in separators:
+            positions = [m.start() for m in re.finditer(re.escape(sep), item)]
+            if not positions:
+                continue
+            split_at = min(positions, key=lambda pos: abs(pos - center))
+            left = item[:split_at + len(sep) - 1].strip()
+            right = item[split_at + len(sep):].strip()
+            if left and right and left != item and right != item:
+                queue.insert(0, right)
+                queue.insert(0, left)
+                split_done = True
+                break
+
+        if split_done:
+            continue
+
+        hard_split = item.rfind(' ', 0, max_chars)
+        if hard_split < int(max_chars * 0.55):
+            hard_split = item.find(' ', max_chars)
+
+        if hard_split == -1:
+            parts.append(item)
+            continue
+
+        left = item[:hard_split].strip()
+        right = item[hard_split + 1:].strip()
+        if left:
+            queue.insert(0, left)
+        if right:
+            queue.insert(1 if left else 0, right)
+
+    return parts
+
+
+def _legacy_split_text_into_chunks(text, max_chars):
+    """Reference copy of the original string-concatenating chunker."""
+    paragraphs = text.split('\n\n')
+    chunks = []
+
+    for para in paragraphs:
+        para = para.strip()
+        if not para:
+            continue
+
+        sentences = server._split_sentences_preserve_quotes(para)
+        normalized_sentences = []
+        for sentence in sentences:
+            if not sentence or not sentence.strip():
+                continue
+            normalized_sentences.extend(_legacy_split_overlong_sentence(sentence, max_chars))
+
+        current_chunk = ''
+        current_sentence_count = 0
+        current_has_dialogue = False
+
+        for sentence in normalized_sentences:
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+
+            has_dialogue = '"' in sentence
+            if not current_chunk:
+                current_chunk = sentence
+                current_sentence_count = 1
+                current_has_dialogue = has_dialogue
+                continue
+
+            would_exceed = len(current_chunk) + len(sentence) + 1 > max_chars
+            sentence_limit_hit = current_sentence_count >= max(1, server.MAX_SENTENCES_PER_CHUNK)
+            dialogue_boundary = has_dialogue != current_has_dialogue and len(current_chunk) > 40
+
+            if would_exceed or sentence_limit_hit or dialogue_boundary:
+                chunks.append(current_chunk.strip())
+                current_chunk = sentence
+                current_sentence_count = 1
+                current_has_dialogue = has_dialogue
+            else:
+                current_chunk = (current_chunk + ' ' + sentence).strip()
+                current_sentence_count += 1
+                current_has_dialogue = current_has_dialogue or has_dialogue
+
+        if current_chunk:
+            chunks.append(current_chunk.strip())
+
+    return chunks
+
+
+def _chunker_inputs(size, seed=5):
+    rng = random.Random(seed)
+    words = re.findall(r'\w+', CORPUS)
+    separators = (', ', '; ', ' - ', ' und ', ' oder ', ' aber ', ' ')
+
+    def run_on(with_separators):
+        out = []
+        length = 0
+        while length < size:
+            word = rng.choice(words)
+            sep = rng.choice(separators) if with_separators and rng.random() < 0.15 else ' '
+            out.append(word + sep)
+            length += len(word) + len(sep)
+        return ''.join(out).strip() + '.'
+
+    return (
+        ('story', _long_story(size)),
+        ('run-on paragraph', run_on(True)),
+        ('no separators', run_on(False)),
+    )
+
+
+def bench_chunker(args):
+    max_chars = server.MAX_CHUNK_CHARS
+    for size in args.sizes:
+        for name, text in _chunker_inputs(size):
+            results = {}
+            for label, fn in (('legacy', _legacy_split_text_into_chunks), ('linear', server.split_text_into_chunks)):
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    chunks = fn(text, max_chars)
+                    timings.append(time.perf_counter() - start)
+                results[label] = (min(timings), chunks)
+            (legacy_t, legacy_chunks), (new_t, new_chunks) = results['legacy'], results['linear']
+            lengths = [len(c) for c in new_chunks]
+            over = sum(1 for n in lengths if n > max_chars)
+            same = 'identical' if legacy_chunks == new_chunks else 'different cuts'
+            print(f"{name:<17} {len(text):>7} chars: legacy {legacy_t * 1000:8.1f} ms ({len(legacy_chunks)} chunks), "
+                  f"linear {new_t * 1000:7.1f} ms ({len(new_chunks)} chunks, min {min(lengths)}, "
+                  f"max {max(lengths)}, >{max_chars}: {over}) [{same}]")
+    return 0
+
+
+def _legacy_extract_speaker_hint(chunk):
+    name_pattern = r'([A-Za-zÄÖÜäöüß][A-Za-zÄÖÜäöüß0-9_-]{1,24})'
+
+    # Pattern 1: Name: "..."
+    match = re.search(r'\b' + name_pattern + r'\s*:\s*"', chunk, re.IGNORECASE)
+    if match:
+        return match.group(1).lower()
+
+    # Pattern 2: "...", sagte Name
+    speech_verbs = (
+        r'sagte|fragte|antwortete|rief|schrie|fl[üu]sterte|murmelte|'
+        r'meinte|br[üu]llte|jammerte|lachte|seufzte|knurrte|wisperte|hauchte'
+    )
+    match = re.search(r'"\s*,?\s*(?:' + speech_verbs + r')\s+' + name_pattern + r'\b', chunk, re.IGNORECASE)
+    if match:
+        return match.group(1).lower()
+
+    # Pattern 3: Name sagte: "..."
+    match = re.search(r'\b' + name_pattern + r'\s+(?:' + speech_verbs + r')\b', chunk, re.IGNORECASE)
+    if match:
+        return match.group(1).lower()
+
+    return None
+
+
+def _legacy_emotion_tuning_from_text(chunk):
+    if not server.ENABLE_EMOTION_VARIATION:
+        return 1.0, 0.0, 0.0
+
+    text = chunk.strip()
+    lower = text.lower()
+
+    def contains(pattern):
+        return re.search(pattern, lower, re.IGNORECASE) is not None
+
+    # Score likely emotion classes from punctuation and lexical cues.
+    scores = {
+        'anger': 0,
+        'joy': 0,
+        'sadness': 0,
+        'fear': 0,
+        'calm': 0,
+        'suspense': 0,
+    }
+
+    exclaim_count = text.count('!')
+    question_count = text.count('?')
+    if exclaim_count >= 2:
+        scores['anger'] += 2
+        scores['joy'] += 1
+    elif exclaim_count == 1:
+        scores['joy'] += 1
+    if question_count >= 2:
+        scores['fear'] += 1
+        scores['suspense'] += 1
+    elif question_count == 1:
+        scores['suspense'] += 1
+    if '...' in text:
+        scores['suspense'] += 2
+        scores['calm'] += 1
+
+    if contains(r'\b(schrie|br[üu]llte|knurrte|wut|zorn|fauchte|w[üu]tend)\b'):
+        scores['anger'] += 3
+    if contains(r'\b(lachte|jubelte|grinste|freute|strahlte|fr[öo]hlich)\b'):
+        scores['joy'] += 3
+    if contains(r'\b(weinte|schluchzte|traurig|seufzte|leise|verzweifelt)\b'):
+        scores['sadness'] += 3
+    if contains(r'\b(zitterte|aengstlich|ängstlich|panik|furcht|flucht|erschrocken)\b'):
+        scores['fear'] += 3
+    if contains(r'\b(fluesterte|flüsterte|ruhig|sanft|behutsam|gelassen)\b'):
+        scores['calm'] += 3
+
+    emotion = max(scores, key=lambda key: scores[key])
+    if scores[emotion] == 0:
+        return 1.0, 0.0, 0.0
+
+    # length_multiplier, noise_delta, noise_w_delta
+    profiles = {
+        'anger': (0.99, 0.09, 0.06),
+        'joy': (1.00, 0.07, 0.05),
+        'sadness': (1.09, -0.07, -0.05),
+        'fear': (1.02, 0.07, 0.05),
+        'calm': (1.05, -0.05, -0.04),
+        'suspense': (1.07, -0.04, -0.03),
+    }
+    return profiles[emotion]
+
+
+def _legacy_derive_chunk_params(chunk, base_length, base_noise, base_noise_w):
+    """Reference copy of the original multi-pass prosody derivation."""
+    normalized = chunk.strip()
+    length = base_length
+    noise = base_noise
+    noise_w = base_noise_w
+
+    # Global emotion shaping.
+    emotion_length, emotion_noise, emotion_noise_w = _legacy_emotion_tuning_from_text(normalized)
+    length *= emotion_length
+    noise += emotion_noise
+    noise_w += emotion_noise_w
+
+    if server.ENABLE_DYNAMIC_CHUNK_TUNING:
+        has_dialogue = '"' in normalized
+        has_exclamation = normalized.endswith('!!') or normalized.endswith('!')
+        has_question = normalized.endswith('?')
+        has_suspense = normalized.endswith('...') or normalized.count('...') > 0
+        is_short = len(normalized) < 70
+
+        if has_dialogue:
+            length *= 1.03
+            noise += 0.04
+            noise_w += 0.04
+
+        if has_exclamation:
+            length *= 0.98
+            noise += 0.10
+            noise_w += 0.08
+
+        if has_question:
+            length *= 1.00
+            noise += 0.05
+            noise_w += 0.04
+
+        if has_suspense:
+            length *= 1.05
+            noise -= 0.05
+            noise_w -= 0.04
+
+        if is_short and not has_exclamation:
+            length *= 1.00
+
+        # Long narrative chunks should not drift too slow.
+        if len(normalized) >= server.LONG_CHUNK_THRESHOLD and not has_exclamation:
+            length *= server.LONG_CHUNK_LENGTH_MULT
+
+    # Character-based variation (deterministic per speaker).
+    if server.ENABLE_CHARACTER_VOICE_VARIATION:
+        speaker = _legacy_extract_speaker_hint(normalized)
+        if speaker:
+            if speaker in server.CHARACTER_VOICE_PROFILES:
+                char_length, char_noise, char_noise_w = server.CHARACTER_VOICE_PROFILES[speaker]
+            else:
+                char_length, char_noise, char_noise_w = server._speaker_hash_profile(speaker)
+            length *= char_length
+            noise += char_noise
+            noise_w += char_noise_w
+
+    relative_min = base_length * server.MIN_RELATIVE_LENGTH_MULT
+    relative_max = base_length * server.MAX_RELATIVE_LENGTH_MULT
+    if relative_min > relative_max:
+        relative_min, relative_max = relative_max, relative_min
+
+    length = server._clamp(length, relative_min, relative_max)
+    length = server._clamp(length, server.MIN_LENGTH_SCALE, server.MAX_LENGTH_SCALE)
+    noise = server._clamp(noise, server.MIN_NOISE_SCALE, server.MAX_NOISE_SCALE)
+    noise_w = server._clamp(noise_w, server.MIN_NOISE_W, server.MAX_NOISE_W)
+    return length, noise, noise_w
+
+# Words and shapes that trip every feature: emotion cues (incl. umlaut variants), speaker forms, punctuation runs.
+_FEATURE_TOKENS = (
+    'schrie', 'brüllte', 'Brullte', 'WUT', 'zornig', 'Zorn', 'lachte', 'Fröhlich', 'frohlich', 'weinte', 'leise',
+    'leiser', 'seufzte', 'Panik', 'ängstlich', 'aengstlich', 'Flucht', 'flüsterte', 'fluesterte', 'ruhig', 'Sanft',
+    'Emma', 'Funkel', 'Opa_Ben', 'Ärger', 'sagte', 'fragte', 'rief', 'meinte', 'hauchte', 'wisperte', 'Der', 'und',
+    '"', '",', '" ,', ':', ': "', '!', '!!', '?', '??', '...', '..', '.', ',', 'Emma:', 'Kapitel 1:', '\n',
+)
+
+
+def _feature_chunks(fuzz, seed=13):
+    chunks = server.split_text_into_chunks(_long_story(50000), server.MAX_CHUNK_CHARS)
+    rng = random.Random(seed)
+    for _ in range(fuzz):
+        parts = [rng.choice(_FEATURE_TOKENS) for _ in range(rng.randint(1, 30))]
+        chunks.append(''.join(part + rng.choice(('', ' ', ' ', '  ')) for part in parts))
+    return chunks
+
+
+def bench_features(args):
+    chunks = _feature_chunks(args.fuzz)
+    base = (server.DEFAULT_LENGTH_SCALE, server.DEFAULT_NOISE_SCALE, server.DEFAULT_NOISE_W)
+    server._chunk_features.cache_clear()
+    failed = 0
+    for chunk in chunks:
+        if _legacy_derive_chunk_params(chunk, *base) != server._derive_chunk_params(chunk, *base):
+            failed += 1
+            if failed == 1:
+                print(f"  first mismatch: {chunk[:120]!r}")
+    print(f"equivalence {len(chunks) - failed}/{len(chunks)} chunks derive identical params")
+
+    # Unique chunks, no more than the extractor cache holds: cold rows clear it first, the cached row hits.
+    unique = list(dict.fromkeys(chunks))[:server._chunk_features.cache_info().maxsize]
+    rows = (
+        ('legacy', lambda chunk: _legacy_derive_chunk_params(chunk, *base), False),
+        ('single-pass', lambda chunk: server._derive_chunk_params(chunk, *base), True),
+        ('single-pass cached', lambda chunk: server._derive_chunk_params(chunk, *base), False),
+        ('extract only', lambda chunk: server.ChunkFeatures(chunk.strip()), False),
+    )
+    timings = {}
+    for label, fn, cold in rows:
+        best = float('inf')
+        for _ in range(args.repeat):
+            if cold:
+                server._chunk_features.cache_clear()
+            start = time.perf_counter()
+            for chunk in unique:
+                fn(chunk)
+            best = min(best, time.perf_counter() - start)
+        timings[label] = best
+        print(f"{label:<19} {best / len(unique) * 1e6:7.2f} us/chunk "
+              f"({timings['legacy'] / best:.2f}x vs legacy, {len(unique)} chunks)")
+    return 1 if failed else 0
+
+
+# Building blocks for generated chapters. Every chapter draws its own sentences from these with
+# a fixed seed, so corpora are distinct texts (not one paragraph repeated) yet identical per run.
+_CHAPTER_NAMES = ('Emma', 'Funkel', 'Opa Ben', 'Lina', 'Kater Moritz', 'Frau Holle', 'Jonas', 'Eule Wilma')
+_CHAPTER_PLACES = (
+    'am Rand des Nebelwaldes', 'hinter der alten Mühle', 'im Turm der Stadtuhr', 'unten am Fluss',
+    'auf dem Dachboden', 'zwischen den Apfelbäumen', 'vor der Bäckerei', 'im verschneiten Tal',
+)
+_CHAPTER_NARRATION = (
+    '{a} lief {p} entlang und zählte leise bis {n}.',
+    'Um {h}:{m:02d} Uhr stand {a} {p} und wartete auf {b}.',
+    'Der Wind pfiff {p}, und {a} zog die Mütze tiefer ins Gesicht.',
+    '{a} fand {p} genau {n} glänzende Steine – einer davon war blau.',
+    'Nur ein paar Blätter raschelten noch ... dann war {p} alles still.',
+    'Ca. {n} Schritte weiter entdeckte {a} eine Spur, die z.B. von einem Fuchs stammen konnte.',
+    'Langsam, ganz langsam, kletterte {a} {p} hinauf, bis {b} von unten winkte.',
+    'Am {n}. Tag des Winters brachte {a} Tee und Kuchen zu {b}.',
+)
+_CHAPTER_DIALOGUE = (
+    '"{q}", rief {a} fröhlich.',
+    '"{q}", flüsterte {a} ängstlich.',
+    '„{q}“, sagte {a} ruhig.',
+    '{a}: "{q}!"',
+    '"{q}", brüllte {a} wütend, "und zwar sofort!"',
+    '"{q}", seufzte {a} traurig und sah zu {b} hinüber.',
+    '"{q}?", fragte {a} erschrocken.',
+)
+_CHAPTER_LINES = (
+    'Hast du das gesehen', 'Wir müssen {p} nachsehen', 'Das sind bestimmt {n} Sterne',
+    'Ich habe keine Angst', 'Komm schnell, {b}', 'Morgen finden wir es bestimmt',
+    'Nicht so laut, sonst wachen alle auf', 'Es ist genau {h} Uhr',
+)
+
+
+def _chapter(seed, min_chars, dialogue_share):
+    rng = random.Random(seed)
+    paragraphs = []
+    size = 0
+    while size < min_chars:
+        sentences = []
+        for _ in range(rng.randint(2, 5)):
+            a, b = rng.sample(_CHAPTER_NAMES, 2)
+            fields = {'a': a, 'b': b, 'p': rng.choice(_CHAPTER_PLACES), 'n': rng.randint(2, 999),
+                      'h': rng.randint(0, 23), 'm': rng.choice((0, 15, 30, 45))}
+            if rng.random() < dialogue_share:
+                fields['q'] = rng.choice(_CHAPTER_LINES).format(**fields)
+                template = rng.choice(_CHAPTER_DIALOGUE)
+            else:
+                template = rng.choice(_CHAPTER_NARRATION)
+            sentence = template.format(**fields)
+            sentences.append(sentence[0].upper() + sentence[1:])
+        paragraph = ' '.join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return f"Kapitel {seed}\n\n" + '\n\n'.join(paragraphs)
+
+
+# Bump when the corpora change; baselines recorded against other texts are not comparable.
+_FRONTEND_CORPUS_VERSION = 2
+
+
+def _frontend_corpora():
+    return (
+        ('short', CORPUS.split('\n\n')[0]),
+        ('5k', _chapter(1, 5000, 0.3)),
+        ('50k', '\n\n'.join(_chapter(seed, 10000, 0.3) for seed in range(2, 7))),
+        ('dialogue', '\n\n'.join([DIALOGUE_CORPUS] + [_chapter(seed, 5000, 0.8) for seed in range(7, 10)])),
+    )
+
+
+def _derive_all(chunks):
+    # Features are built per chunk rather than through the _chunk_features LRU, so repeated
+    # chunks and earlier stages do not turn this into a cache-hit measurement.
+    base = (server.DEFAULT_LENGTH_SCALE, server.DEFAULT_NOISE_SCALE, server.DEFAULT_NOISE_W)
+    for chunk in chunks:
+        server._prosody_from_features(server.ChunkFeatures(chunk.strip()), *base)
+
+
+# Stages in server order; each one is timed on the previous stage's output, like _prepare_chunks runs them.
+_FRONTEND_STAGES = (
+    ('preprocess_text', server.preprocess_text),
+    ('prepare_for_tts', server.prepare_for_tts),
+    ('_enhance_story_text_for_tts', server._enhance_story_text_for_tts),
+    ('split_text_into_chunks', server.split_text_into_chunks),
+    ('_derive_chunk_params', _derive_all),
+)
+
+
+_REFERENCE_TEXT = CORPUS * 4
+_REFERENCE_RE = re.compile(r'\b(\w)(\w*)\b')
+
+
+def _reference_workload(text):
+    # Fixed regex and string work that no server change touches; calibrates for host speed drift.
+    words = _REFERENCE_RE.sub(lambda m: m.group(2) + m.group(1), text).split()
+    return len(sorted(words))
+
+
+def _frontend_cases():
+    """(key, fn, input) per corpus and stage; each stage gets the previous stage's output."""
+    cases = [('reference', _reference_workload, _REFERENCE_TEXT)]
+    for corpus, text in _frontend_corpora():
+        current = text
+        for stage, fn in _FRONTEND_STAGES:
+            cases.append((f"{corpus}/{stage}", fn, current))
+            output = fn(current)
+            if output is not None:
+                current = output
+    return cases
+
+
+def bench_frontend(args):
+    # Samples go round-robin over all cases and each keeps its best, so a busy moment on the host
+    # costs every stage a sample instead of landing on whichever stage happened to be running.
+    cases = _frontend_cases()
+    loops = {}
+    for key, fn, arg in cases:
+        start = time.perf_counter()
+        fn(arg)
+        loops[key] = max(1, int(args.min_sample / max(time.perf_counter() - start, 1e-6)))
+    best = dict.fromkeys(loops, float('inf'))
+    for _ in range(args.repeat):
+        for key, fn, arg in cases:
+            start = time.perf_counter()
+            for _ in range(loops[key]):
+                fn(arg)
+            best[key] = min(best[key], (time.perf_counter() - start) / loops[key])
+
+    # Throughput is always relative to the raw input length, so stages of one corpus compare directly.
+    reference = len(_REFERENCE_TEXT) / best['reference']
+    results = {}
+    for corpus, text in _frontend_corpora():
+        for stage, _ in _FRONTEND_STAGES:
+            results[f"{corpus}/{stage}"] = len(text) / best[f"{corpus}/{stage}"]
+        total = sum(best[f"{corpus}/{stage}"] for stage, _ in _FRONTEND_STAGES)
+        results[f"{corpus}/total"] = len(text) / total
+
+    # Compare speeds relative to the reference workload, so a uniformly slower or busier host
+    # does not read as a regression of every stage.
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('corpus_version') != _FRONTEND_CORPUS_VERSION:
+            print(f"baseline {args.baseline} was recorded on other corpora; record a new one with --save-baseline")
+            return 2
+        host_scale = reference / baseline['reference_chars_per_second']
+        baseline = baseline['chars_per_second']
+        print(f"host speed vs baseline: {host_scale:.2f}x (baseline rates scaled accordingly)")
+
+    regressions = []
+    print(f"{'corpus/stage':<40} {'chars/s':>12} {'baseline':>12} {'change':>8}")
+    for key, rate in results.items():
+        line = f"{key:<40} {rate:>12,.0f}"
+        if baseline and key in baseline:
+            change = rate / (baseline[key] * host_scale) - 1.0
+            line += f" {baseline[key] * host_scale:>12,.0f} {change:>+8.1%}"
+            if change < -args.threshold:
+                regressions.append(key)
+                line += '  REGRESSION'
+        print(line)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'repeat': args.repeat,
+                'corpus_version': _FRONTEND_CORPUS_VERSION,
+                'reference_chars_per_second': reference,
+                'chars_per_second': results,
+            }, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"baseline written to {args.save_baseline}")
+
+    if regressions:
+        print(f"{len(regressions)} stage(s) slower than baseline by more than {args.threshold:.0%}: "
+              f"{', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def bench_makespan(args):
+    # Every run must synthesize every chunk, so replace the chunk cache with a disabled one.
+    server._chunk_cache = server.ChunkAudioCache(0)
+    chapters = (
+        ('chapter', CORPUS),
+        ('dialogue chapter', DIALOGUE_CORPUS),
+        ('long story', _long_story(args.long_chars)),
+    )
+    base = (server.DEFAULT_LENGTH_SCALE, server.DEFAULT_NOISE_SCALE, server.DEFAULT_NOISE_W)
+
+    # Warm-up: start workers and give the cost model timings to learn from.
+    server._do_generate(_long_story(3000), *base)
+    print(f"cost model after warm-up: {server._chunk_cost_model.stats()}")
+
+    mismatches = 0
+    for name, text in chapters:
+        timings = {False: [], True: []}
+        outputs = {}
+        for _ in range(args.repeat):
+            for longest_first in (False, True):
+                server.ENABLE_LONGEST_CHUNK_FIRST = longest_first
+                start = time.perf_counter()
+                outputs[longest_first] = server._do_generate(text, *base).getvalue()
+                timings[longest_first].append(time.perf_counter() - start)
+        same = outputs[False] == outputs[True]
+        mismatches += not same
+        in_order, longest = min(timings[False]), min(timings[True])
+        chunks = len(server.split_text_into_chunks(_frontend(text)))
+        print(f"{name:<17} {len(text):>6} chars, {chunks:>3} chunks: text order {in_order:6.2f}s, "
+              f"longest first {longest:6.2f}s ({1 - longest / in_order:+.1%} makespan) "
+              f"[{'identical' if same else 'DIFFERENT'} audio]")
+    return 1 if mismatches else 0
+
+
+def _loudness_scenarios(chunk_count, rng):
+    """Per-chunk level offsets in dB for chapters whose chunks come out of the engine at different levels."""
+    return (
+        ('single chunk', [0.0]),
+        ('uniform', [rng.uniform(-1.0, 0.0) for _ in range(chunk_count)]),
+        ('varied', [rng.uniform(-4.0, 0.0) for _ in range(chunk_count)]),
+        ('crescendo', [-6.0 + 6.0 * i / max(1, chunk_count - 1) for i in range(chunk_count)]),
+        ('loud opening', [0.0] + [rng.uniform(-5.0, -2.0) for _ in range(chunk_count - 1)]),
+    )
+
+
+def _rms_db(pcm):
+    samples = server.np.frombuffer(pcm, dtype='<i2').astype(server.np.float64)
+    rms = float(server.np.sqrt(server.np.mean(samples * samples))) if samples.size else 0.0
+    return 20 * math.log10(rms) if rms > 0 else float('-inf')
+
+
+def _streamed_chunks(chunks, pcms, sample_rate):
+    """Run _stream_pcm over ready-made chunk PCM; returns each chunk's streamed bytes (gaps dropped)."""
+    real_iter = server._iter_pcm_in_order
+    server._iter_pcm_in_order = lambda chunk_texts, chunk_params: iter(pcms)
+    try:
+        pieces = list(server._stream_pcm(chunks, [None] * len(chunks), sample_rate))
+    finally:
+        server._iter_pcm_in_order = real_iter
+    # _stream_pcm yields chunk, gap, chunk, ..., chunk.
+    return pieces[::2]
+
+
+def bench_loudness(args):
+    if not server.ENABLE_OUTPUT_NORMALIZATION:
+        print("ENABLE_OUTPUT_NORMALIZATION is off; nothing to check")
+        return 0
+    sample_rate = server.MODEL_SAMPLE_RATE
+    target = int(32767 * server._clamp(server.OUTPUT_TARGET_PEAK, 0.10, 0.99))
+    chunks = server.split_text_into_chunks(_frontend(CORPUS))[:args.chunks]
+    rng = random.Random(3)
+    failures = 0
+    real_mode = server.STREAM_NORMALIZATION
+
+    print(f"{'scenario':<13} {'file peak':>10} {'stream peak':>12} {'max dev':>8} {'mean dev':>9} "
+          f"{'exact':>6} {'off: max dev':>13}")
+    for name, levels in _loudness_scenarios(len(chunks), rng):
+        texts = chunks[:len(levels)]
+        pcms = []
+        for i, (text, level) in enumerate(zip(texts, levels)):
+            raw = server.np.frombuffer(
+                _synthetic_speech_pcm(max(0.5, len(text) / 15), sample_rate, seed=i), dtype='<i2'
+            )
+            # Loud enough (about -2.5 dBFS at 0 dB) that the gains stay inside the 0.6..2.5 clamp.
+            pcms.append((raw * 1.8 * 10 ** (level / 20)).astype(server.np.int16).tobytes())
+
+        # Whole-file path: locate every chunk in the assembled output.
+        wav = server._assemble_wav(list(pcms), texts, sample_rate).getvalue()
+        file_chunks = []
+        position = 44
+        for i, pcm in enumerate(pcms):
+            file_chunks.append(wav[position:position + len(pcm)])
+            position += len(pcm)
+            if i < len(pcms) - 1:
+                position += len(server._get_silence_between(texts[i], texts[i + 1], sample_rate))
+        file_peak = max(abs(int(v)) for v in (server.np.frombuffer(wav[44:], dtype='<i2').max(),
+                                                server.np.frombuffer(wav[44:], dtype='<i2').min()))
+
+        deviations = {}
+        for mode in ('peak', 'off'):
+            server.STREAM_NORMALIZATION = mode
+            streamed = _streamed_chunks(texts, pcms, sample_rate)
+            deviations[mode] = [_rms_db(a) - _rms_db(b) for a, b in zip(streamed, file_chunks)]
+            if mode == 'peak':
+                stream_peak = max(int(server.np.abs(server.np.frombuffer(c, dtype='<i2').astype(server.np.int32)).max())
+                                  for c in streamed)
+                exact = sum(1 for a, b in zip(streamed, file_chunks) if a == b)
+        server.STREAM_NORMALIZATION = real_mode
+
+        spread = max(levels) - min(levels)
+        max_dev = max(abs(d) for d in deviations['peak'])
+        # The whole-file gain may be clamped (0.6..2.5); then the file peak is not the target.
+        file_gain = target / max(1, max(int(server.np.abs(server.np.frombuffer(p, dtype='<i2').astype(server.np.int32)).max())
+                                        for p in pcms))
+        checks = [
+            ('file peak at target', 0.6 < file_gain < 2.5 and abs(file_peak - target) > 1),
+            ('stream above target', stream_peak > target),
+            ('stream deviation exceeds level spread', max_dev > spread + 0.1),
+        ]
+        failed = [label for label, bad in checks if bad]
+        failures += len(failed)
+        print(f"{name:<13} {20 * math.log10(file_peak / target):>+9.2f}dB "
+              f"{20 * math.log10(stream_peak / target):>+11.2f}dB {max_dev:>7.2f}dB "
+              f"{sum(deviations['peak']) / len(levels):>+8.2f}dB {exact:>3}/{len(levels):<2} "
+              f"{max(abs(d) for d in deviations['off']):>12.2f}dB"
+              + (f"  FAIL: {', '.join(failed)}" if failed else ''))
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    engines = sub.add_parser('engines', help='Piper binary vs in-process onnx engine on the same corpus')
+    engines.add_argument('--repeat', type=int, default=3)
+    engines.set_defaults(func=bench_engines)
+
+    normalize = sub.add_parser('normalize', help='Vectorized vs legacy output normalization on 1/10/30 min of audio')
+    normalize.add_argument('--minutes', type=float, nargs='+', default=[1, 10, 30])
+    normalize.add_argument('--legacy-max-minutes', type=float, default=30,
+                           help='Skip the slow reference loop above this length')
+    normalize.set_defaults(func=bench_normalize)
+
+    text = sub.add_parser('text', help='Compiled text normalization vs reference passes: equivalence and throughput')
+    text.add_argument('--fuzz', type=int, default=3000, help='Number of random rule-heavy documents to compare')
+    text.add_argument('--sizes', type=int, nargs='+', default=[5000, 50000, 200000])
+    text.add_argument('--repeat', type=int, default=5)
+    text.set_defaults(func=bench_text)
+
+    chunker = sub.add_parser('chunker', help='Linear-time chunker vs legacy on long stories and run-on paragraphs')
+    chunker.add_argument('--sizes', type=int, nargs='+', default=[100000, 400000])
+    chunker.add_argument('--repeat', type=int, default=3, help='Report the best of this many runs')
+    chunker.set_defaults(func=bench_chunker)
+
+    features = sub.add_parser('features', help='Single-pass chunk feature extraction vs legacy prosody derivation')
+    features.add_argument('--fuzz', type=int, default=5000, help='Number of random cue-heavy chunks to compare')
+    features.add_argument('--repeat', type=int, default=5)
+    features.set_defaults(func=bench_features)
+
+    frontend = sub.add_parser('frontend', help='Chars/sec per text front-end stage, checked against a JSON baseline')
+    frontend.add_argument('--repeat', type=int, default=15, help='Round-robin samples per stage')
+    frontend.add_argument('--min-sample', type=float, default=0.02, help='Seconds each timing sample loops for')
+    frontend.add_argument('--baseline', help='JSON file from --save-baseline to compare against')
+    frontend.add_argument('--save-baseline', help='Write this run as the new baseline JSON')
+    frontend.add_argument('--threshold', type=float, default=0.25,
+                          help='Allowed slowdown per stage before failing (0.25 = 25%%)')
+    frontend.set_defaults(func=bench_frontend)
+
+    makespan = sub.add_parser('makespan', help='Chapter wall time with text-order vs longest-chunk-first dispatch')
+    makespan.add_argument('--repeat', type=int, default=3)
+    makespan.add_argument('--long-chars', type=int, default=20000)
+    makespan.set_defaults(func=bench_makespan)
+
+    loudness = sub.add_parser('loudness', help='Whole-file vs streamed normalization: loudness deviation checks')
+    loudness.add_argument('--chunks', type=int, default=24, help='Chunks per synthetic chapter')
+    loudness.set_defaults(func=bench_loudness)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 import subprocess
-from flask import Flask, request, send_file, jsonify
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Flask, Response, request, send_file, jsonify
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import io
 import os
 import sys
@@ -10,12 +10,35 @@ import re
 import base64
 import uuid
 import threading
+import json
+import queue
+import select
+import shutil
+import atexit
+import tempfile
+import sqlite3
+import hashlib
+import platform
+import functools
+import itertools
+import urllib.parse
+from collections import deque, OrderedDict
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    from piper_phonemize import phonemize_espeak
+except ImportError:
+    ort = None
+    phonemize_espeak = None
 
 app = Flask(__name__)
 
 # Fallback paths for local testing vs Docker
 MODEL_PATH = os.environ.get('MODEL_PATH', "/app/model.onnx")
 PIPER_BINARY = os.environ.get('PIPER_BINARY', "/usr/local/bin/piper_bin/piper")
+MODEL_CONFIG_PATH = os.environ.get('MODEL_CONFIG_PATH', MODEL_PATH + ".json")
 
 def _get_env_int(name, default):
     raw = os.environ.get(name)
@@ -138,11 +161,19 @@ SILENCE_PERIOD_MS = _get_env_int('SILENCE_PERIOD_MS', _QUALITY['silence_period']
 SILENCE_COMMA_MS = _get_env_int('SILENCE_COMMA_MS', _QUALITY['silence_comma'])
 SILENCE_DEFAULT_MS = _get_env_int('SILENCE_DEFAULT_MS', _QUALITY['silence_default'])
 
+# Bounds for the per-request "pause_scale" multiplier applied to all chunk gaps.
+MIN_PAUSE_SCALE = _get_env_float('MIN_PAUSE_SCALE', 0.25)
+MAX_PAUSE_SCALE = _get_env_float('MAX_PAUSE_SCALE', 3.0)
+
 # Optional quality refinements
 ENABLE_DYNAMIC_CHUNK_TUNING = _get_env_bool('ENABLE_DYNAMIC_CHUNK_TUNING', True)
 ENABLE_OUTPUT_NORMALIZATION = _get_env_bool('ENABLE_OUTPUT_NORMALIZATION', True)
 OUTPUT_TARGET_PEAK = _get_env_float('OUTPUT_TARGET_PEAK', 0.93)
 OUTPUT_EDGE_FADE_MS = _get_env_int('OUTPUT_EDGE_FADE_MS', 6)
+# How /generate/stream normalizes (whole-file responses always peak-normalize the complete file):
+#   "peak": per-chunk gain from the running peak including the chunk being sent (see StreamNormalizer)
+#   "off":  engine level, edge fades only
+STREAM_NORMALIZATION = os.environ.get('STREAM_NORMALIZATION', 'peak').strip().lower()
 ENABLE_CHARACTER_VOICE_VARIATION = _get_env_bool('ENABLE_CHARACTER_VOICE_VARIATION', True)
 ENABLE_EMOTION_VARIATION = _get_env_bool('ENABLE_EMOTION_VARIATION', True)
 DEBUG_TTS_PROSODY = _get_env_bool('DEBUG_TTS_PROSODY', False)
@@ -190,21 +221,244 @@ if CUSTOM_PRONUNCIATIONS_RAW:
 CHARACTER_VOICE_PROFILES_RAW = os.environ.get('CHARACTER_VOICE_PROFILES', '').strip()
 
 # ── Async job registry ────────────────────────────────────────────────────────
-# Stores: { job_id: { "status": "processing"|"ready"|"error", "result": bytes|None, "error": str|None, "created": float } }
+# Identical submissions share one synthesis ("flight"); every submitter still gets its own job_id.
+# Flight: { "key": str, "status": "processing"|"ready"|"error", "result": BytesIO|None, "result_path": str|None,
+#           "result_bytes": int, "error": str|None, "subscribers": int,
+#           "started": float, "finished": float|None, "chunks_done": int, "chunks_total": int|None, "audio_bytes": int, "version": int }
+# Stores: { job_id: { "flight": Flight, "created": float } }
 _jobs: dict = {}
+# Request hash -> flight that is still processing
+_inflight: dict = {}
 _jobs_lock = threading.Lock()
+# Bytes of finished results held in memory (results spilled to disk are not counted).
+_job_store_memory_bytes = 0
+# Notified whenever a flight's progress or status changes (bumps flight["version"]); feeds /generate/events.
+_jobs_changed = threading.Condition(_jobs_lock)
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+# Upper bounds (seconds) of the stage latency histogram buckets; +Inf is implicit.
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class Metrics:
+    """
+    Process-wide counters and latency histograms for /metrics. Every thread records into
+    its own shard, so the hot path never takes a lock; a scrape sums all shards. Shards of
+    finished threads are folded into a retired total so thread churn does not grow the list.
+    """
+
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def inc(self, name, value=1, **labels):
+        """Add to a counter (or an up/down gauge when value is negative)."""
+        shard = self._shard()
+        key = (name, tuple(sorted(labels.items())))
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, stage, seconds):
+        """Record one stage latency sample."""
+        shard = self._shard()
+        key = ('stage_seconds', stage)
+        hist = shard.get(key)
+        if hist is None:
+            # Per-bucket counts (last one is +Inf), then the sum of samples.
+            hist = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        index = 0
+        for bound in self.buckets:
+            if seconds <= bound:
+                break
+            index += 1
+        hist[index] += 1
+        hist[-1] += seconds
+
+    @staticmethod
+    def _merge(into, shard):
+        for key, value in shard.items():
+            if key[0] == 'stage_seconds':
+                total = into.get(key)
+                if total is None:
+                    into[key] = list(value)
+                else:
+                    for i, v in enumerate(value):
+                        total[i] += v
+            else:
+                into[key] = into.get(key, 0) + value
+
+    def snapshot(self):
+        """Summed values: {(counter, labels): value} and {('stage_seconds', stage): [counts..., sum]}."""
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    self._merge(self._retired, shard)
+            self._shards = live
+            totals = {}
+            self._merge(totals, self._retired)
+            for _, shard in live:
+                # dict.copy() is atomic under the GIL, so a concurrent insert cannot break the walk.
+                self._merge(totals, shard.copy())
+        return totals
+
+_metrics = Metrics()
+
+class _timed:
+    """Context manager recording the block's wall time under a stage of the latency histogram."""
+
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+# Long-lived Piper processes shared by every request (sync, async jobs and /batch).
+# Each worker keeps model.onnx and espeak loaded and receives chunks as JSON lines on stdin.
+PIPER_WORKER_POOL = _get_env_bool('PIPER_WORKER_POOL', True)
+# Recycle a worker after this many chunks to keep memory growth in check.
+PIPER_WORKER_MAX_JOBS = _get_env_int('PIPER_WORKER_MAX_JOBS', 250)
+PIPER_WORKER_TIMEOUT_SECONDS = _get_env_float('PIPER_WORKER_TIMEOUT_SECONDS', 120.0)
+
+# Synthesis engine: "piper" runs the Piper binary, "onnx" runs the voice in-process via onnxruntime.
+TTS_ENGINE = os.environ.get('TTS_ENGINE', 'piper').strip().lower()
+if TTS_ENGINE not in ('piper', 'onnx'):
+    TTS_ENGINE = 'piper'
+# Second resident voice (Thorsten emotional, 8 speakers) for dialogue chunks with a clear emotion.
+# It gets its own worker pool and scheduler slots (EMOTIONAL_MAX_PARALLEL) next to the narrator's.
+EMOTIONAL_MODEL_PATH = os.environ.get('EMOTIONAL_MODEL_PATH', "/app/emotional_model.onnx")
+EMOTIONAL_MODEL_CONFIG_PATH = os.environ.get('EMOTIONAL_MODEL_CONFIG_PATH', EMOTIONAL_MODEL_PATH + ".json")
+ENABLE_EMOTIONAL_VOICE = _get_env_bool('ENABLE_EMOTIONAL_VOICE', True)
+EMOTIONAL_MAX_PARALLEL = _get_env_int('EMOTIONAL_MAX_PARALLEL', 1)
+# detected emotion -> emotional model speaker name; emotions not listed stay with the narrator voice.
+EMOTIONAL_SPEAKERS_RAW = os.environ.get('EMOTIONAL_SPEAKERS', 'anger:angry,joy:amused,fear:surprised,calm:whisper')
+
+# Max sentences per batched inference call for the onnx engine.
+ONNX_BATCH_SIZE = _get_env_int('ONNX_BATCH_SIZE', 8)
+# Silence after every sentence, as the Piper binary adds it (its --sentence_silence default).
+ONNX_SENTENCE_SILENCE_SECONDS = _get_env_float('ONNX_SENTENCE_SILENCE_SECONDS', 0.2)
+ONNX_INTRA_OP_THREADS = _get_env_int('ONNX_INTRA_OP_THREADS', 0)
+
+# Phoneme-id cache for the onnx engine, keyed by normalized sentence text.
+# PHONEME_CACHE_DB adds a persistent SQLite tier (empty = memory only).
+PHONEME_CACHE_SIZE = _get_env_int('PHONEME_CACHE_SIZE', 5000)
+PHONEME_CACHE_DB = os.environ.get('PHONEME_CACHE_DB', '').strip()
+
+# Content-addressed cache of synthesized chunk PCM (memory LRU + optional disk tier).
+CHUNK_CACHE_MEMORY_MB = _get_env_int('CHUNK_CACHE_MEMORY_MB', 128)
+CHUNK_CACHE_DIR = os.environ.get('CHUNK_CACHE_DIR', '').strip()
+# Disk tier budget; also enforced at startup, so lowering it trims an existing CHUNK_CACHE_DIR.
+CHUNK_CACHE_DISK_MB = _get_env_int('CHUNK_CACHE_DISK_MB', 1024)
+
+# Compressed output (output_format=opus|mp3|flac) is encoded by ffmpeg; wav needs no encoder.
+FFMPEG_BINARY = os.environ.get('FFMPEG_BINARY', 'ffmpeg')
+OPUS_BITRATE = os.environ.get('OPUS_BITRATE', '32k')
+MP3_BITRATE = os.environ.get('MP3_BITRATE', '64k')
+# Keep one idle ffmpeg per (format, sample rate) started so requests skip process startup.
+FFMPEG_WARM_ENCODERS = _get_env_bool('FFMPEG_WARM_ENCODERS', True)
+
+# /generate/stream renders at most this many chunks ahead of what the client has consumed.
+STREAM_LOOKAHEAD_CHUNKS = _get_env_int('STREAM_LOOKAHEAD_CHUNKS', 4)
+
+# Submit a request's chunks most expensive first (by learned cost), so no long chunk is left
+# running alone at the end. Assembly order is unaffected; streaming always renders in text order.
+ENABLE_LONGEST_CHUNK_FIRST = _get_env_bool('ENABLE_LONGEST_CHUNK_FIRST', True)
 
 # Background thread pool for async job processing (separate from per-request parallelism)
 JOB_EXECUTOR_WORKERS = _get_env_int('JOB_EXECUTOR_WORKERS', _QUALITY['job_workers'])
-_job_executor = ThreadPoolExecutor(max_workers=JOB_EXECUTOR_WORKERS, thread_name_prefix="tts-job")
+
+# Opt-in boot calibration of max_parallel, max_chunk_chars and job_workers for this host.
+# Values set explicitly through their environment variables are never overridden.
+AUTO_TUNE = _get_env_bool('AUTO_TUNE', False)
+# Calibration result; restarts on the same host, model and quality mode reuse it instead of re-measuring.
+# Point it at a persistent volume (e.g. a Railway volume mount): the temp dir default is lost on every
+# redeploy, so each deploy would calibrate again.
+AUTO_TUNE_CACHE_PATH = os.environ.get(
+    'AUTO_TUNE_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'piper-autotune.json')
+).strip()
+def _available_cpus():
+    """CPUs this process may use: its affinity mask, capped by the container's cgroup CPU quota."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    quota = period = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>".
+        with open('/sys/fs/cgroup/cpu.max', 'r', encoding='utf-8') as f:
+            fields = f.read().split()
+        if fields and fields[0] != 'max':
+            quota, period = int(fields[0]), int(fields[1])
+    except (OSError, ValueError, IndexError):
+        try:
+            # cgroup v1: quota is -1 when unlimited.
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us', 'r', encoding='utf-8') as f:
+                quota = int(f.read())
+            with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us', 'r', encoding='utf-8') as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            quota = period = None
+    if quota is not None and quota > 0 and period:
+        cpus = min(cpus, max(1, -(-quota // period)))
+    return max(1, cpus)
+
+# Largest parallelism tried. Each tried worker loads the model, so the default stays within the
+# cgroup CPU quota and at most twice the preset parallelism, even if the container sees many host cores.
+AUTO_TUNE_MAX_PARALLEL = _get_env_int('AUTO_TUNE_MAX_PARALLEL', min(_available_cpus(), 2 * max(1, MAX_PARALLEL_PIPER)))
+# Smallest chunk size calibration may choose; shorter chunks lose sentence-level prosody.
+AUTO_TUNE_MIN_CHUNK_CHARS = _get_env_int('AUTO_TUNE_MIN_CHUNK_CHARS', 220)
+# Calibration runs at import, before gunicorn answers /health (healthcheckTimeout = 120 in
+# railway.toml), so its budget is capped well below that. No combination is started that
+# would not finish within the budget at the pace of the slowest one measured so far.
+AUTO_TUNE_BUDGET_LIMIT_SECONDS = 60.0
+AUTO_TUNE_BUDGET_SECONDS = min(_get_env_float('AUTO_TUNE_BUDGET_SECONDS', 40.0), AUTO_TUNE_BUDGET_LIMIT_SECONDS)
 
 # TTL for completed jobs: 10 minutes (client has time to fetch the result)
 JOB_TTL_SECONDS = 600
 
+# Finished results above this many in-memory bytes are spilled (oldest first) to JOB_SPILL_DIR.
+JOB_STORE_MEMORY_MB = _get_env_int('JOB_STORE_MEMORY_MB', 256)
+JOB_SPILL_DIR = os.environ.get('JOB_SPILL_DIR', '').strip()
+# The job reaper enforces JOB_TTL_SECONDS and the memory budget at least this often.
+JOB_REAPER_INTERVAL_SECONDS = _get_env_float('JOB_REAPER_INTERVAL_SECONDS', 30.0)
+
+# Idle /generate/events streams send a comment line this often so proxies keep them open.
+SSE_KEEPALIVE_SECONDS = 15
+# Each open /generate/events stream holds one gunicorn thread (--threads 8 in the Dockerfile) for the
+# whole job. Beyond this many, clients get 503 and poll /generate/status instead, so listeners cannot
+# starve /, /batch and /health. Raise it only together with the thread count.
+SSE_MAX_STREAMS = max(0, _get_env_int('SSE_MAX_STREAMS', 3))
+_sse_slots = threading.BoundedSemaphore(SSE_MAX_STREAMS) if SSE_MAX_STREAMS > 0 else None
+
 # Check if model exists
 if not os.path.exists(MODEL_PATH):
     print(f"WARNING: Model not found at {MODEL_PATH}", file=sys.stderr)
 
+def _read_model_sample_rate(config_path, default=22050):
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return int(json.load(f).get('audio', {}).get('sample_rate', default))
+    except Exception:
+        return int(default)
+
+# Internal audio is raw mono int16 PCM at the voice's sample rate; a WAV header is only added on output.
+MODEL_SAMPLE_RATE = _read_model_sample_rate(MODEL_CONFIG_PATH)
+
 print(
     (
         "Piper config: "
@@ -216,9 +470,19 @@ print(
         f"default_noise_scale={DEFAULT_NOISE_SCALE}, "
         f"default_noise_w={DEFAULT_NOISE_W}, "
         f"job_workers={JOB_EXECUTOR_WORKERS}, "
+        f"engine={TTS_ENGINE}, "
+        f"sample_rate={MODEL_SAMPLE_RATE}, "
+        f"worker_pool={PIPER_WORKER_POOL}, "
+        f"worker_max_jobs={PIPER_WORKER_MAX_JOBS}, "
+        f"chunk_cache_mb={CHUNK_CACHE_MEMORY_MB}, "
+        f"chunk_cache_dir={CHUNK_CACHE_DIR or '-'}, "
+        f"stream_lookahead={STREAM_LOOKAHEAD_CHUNKS}, "
+        f"longest_chunk_first={ENABLE_LONGEST_CHUNK_FIRST}, "
+        f"job_store_mb={JOB_STORE_MEMORY_MB}, "
         f"dynamic_tuning={ENABLE_DYNAMIC_CHUNK_TUNING}, "
         f"smoothing={ENABLE_PROSODY_SMOOTHING}, "
         f"output_normalization={ENABLE_OUTPUT_NORMALIZATION}, "
+        f"stream_normalization={STREAM_NORMALIZATION}, "
         f"character_variation={ENABLE_CHARACTER_VOICE_VARIATION}, "
         f"emotion_variation={ENABLE_EMOTION_VARIATION}, "
         f"custom_pronunciations={len(CUSTOM_PRONUNCIATIONS)}"
@@ -270,41 +534,82 @@ def _speaker_hash_profile(name):
     noise_w_delta = (((seed // 255) % 11) - 5) / 100.0
     return length_multiplier, noise_delta, noise_w_delta
 
-def _extract_speaker_hint(chunk):
-    name_pattern = r'([A-Za-zÄÖÜäöüß][A-Za-zÄÖÜäöüß0-9_-]{1,24})'
-
+_SPEAKER_NAME = r'([A-Za-zÄÖÜäöüß][A-Za-zÄÖÜäöüß0-9_-]{1,24})'
+_SPEECH_VERBS = (
+    r'sagte|fragte|antwortete|rief|schrie|fl[üu]sterte|murmelte|'
+    r'meinte|br[üu]llte|jammerte|lachte|seufzte|knurrte|wisperte|hauchte'
+)
+_SPEAKER_PATTERNS = (
     # Pattern 1: Name: "..."
-    match = re.search(r'\b' + name_pattern + r'\s*:\s*"', chunk, re.IGNORECASE)
-    if match:
-        return match.group(1).lower()
-
+    re.compile(r'\b' + _SPEAKER_NAME + r'\s*:\s*"', re.IGNORECASE),
     # Pattern 2: "...", sagte Name
-    speech_verbs = (
-        r'sagte|fragte|antwortete|rief|schrie|fl[üu]sterte|murmelte|'
-        r'meinte|br[üu]llte|jammerte|lachte|seufzte|knurrte|wisperte|hauchte'
-    )
-    match = re.search(r'"\s*,?\s*(?:' + speech_verbs + r')\s+' + name_pattern + r'\b', chunk, re.IGNORECASE)
-    if match:
-        return match.group(1).lower()
-
+    re.compile(r'"\s*,?\s*(?:' + _SPEECH_VERBS + r')\s+' + _SPEAKER_NAME + r'\b', re.IGNORECASE),
     # Pattern 3: Name sagte: "..."
-    match = re.search(r'\b' + name_pattern + r'\s+(?:' + speech_verbs + r')\b', chunk, re.IGNORECASE)
-    if match:
-        return match.group(1).lower()
-
+    re.compile(r'\b' + _SPEAKER_NAME + r'\s+(?:' + _SPEECH_VERBS + r')\b', re.IGNORECASE),
+)
+_WORD_RE = re.compile(r'\w+')
+
+# Whole words of _SPEECH_VERBS; patterns 2 and 3 cannot match a chunk without one of them.
+_SPEECH_VERB_WORDS = frozenset((
+    'sagte', 'fragte', 'antwortete', 'rief', 'schrie', 'flüsterte', 'flusterte', 'murmelte', 'meinte',
+    'brüllte', 'brullte', 'jammerte', 'lachte', 'seufzte', 'knurrte', 'wisperte', 'hauchte',
+))
+
+def _extract_speaker_hint(chunk, words=None):
+    """Speaker name from dialogue attribution, or None; `words` is the chunk's lowercased word set if known."""
+    if ':' in chunk:
+        match = _SPEAKER_PATTERNS[0].search(chunk)
+        if match:
+            return match.group(1).lower()
+    if words is None:
+        words = set(_WORD_RE.findall(chunk.lower()))
+    if words.isdisjoint(_SPEECH_VERB_WORDS):
+        return None
+    for pattern in _SPEAKER_PATTERNS[1:]:
+        match = pattern.search(chunk)
+        if match:
+            return match.group(1).lower()
     return None
 
-def _emotion_tuning_from_text(chunk):
-    if not ENABLE_EMOTION_VARIATION:
-        return 1.0, 0.0, 0.0
-
-    text = chunk.strip()
-    lower = text.lower()
-
-    def contains(pattern):
-        return re.search(pattern, lower, re.IGNORECASE) is not None
+# Lexical emotion cues as whole lowercased words (character classes spelled out).
+_EMOTION_WORDS = {}
+for _emotion, _words in (
+    ('anger', 'schrie brüllte brullte knurrte wut zorn fauchte wütend wutend'),
+    ('joy', 'lachte jubelte grinste freute strahlte fröhlich frohlich'),
+    ('sadness', 'weinte schluchzte traurig seufzte leise verzweifelt'),
+    ('fear', 'zitterte aengstlich ängstlich panik furcht flucht erschrocken'),
+    ('calm', 'fluesterte flüsterte ruhig sanft behutsam gelassen'),
+):
+    _EMOTION_WORDS.update(dict.fromkeys(_words.split(), _emotion))
+del _emotion, _words
+
+class ChunkFeatures:
+    """Everything prosody derivation reads from a chunk, extracted in one pass."""
+
+    __slots__ = (
+        'length', 'exclamations', 'questions', 'has_ellipsis',
+        'ends_exclamation', 'ends_question', 'has_dialogue', 'emotion_hits', 'speaker',
+    )
 
-    # Score likely emotion classes from punctuation and lexical cues.
+    def __init__(self, text):
+        self.length = len(text)
+        self.exclamations = text.count('!')
+        self.questions = text.count('?')
+        self.has_ellipsis = '...' in text
+        self.ends_exclamation = text.endswith('!')
+        self.ends_question = text.endswith('?')
+        self.has_dialogue = '"' in text
+        words = set(_WORD_RE.findall(text.lower()))
+        self.emotion_hits = frozenset(_EMOTION_WORDS[word] for word in words.intersection(_EMOTION_WORDS))
+        self.speaker = _extract_speaker_hint(text, words) if ENABLE_CHARACTER_VOICE_VARIATION else None
+
+# Chunks are looked at several times (prosody, voice routing, cache keys); extract each once.
+@functools.lru_cache(maxsize=4096)
+def _chunk_features(chunk):
+    return ChunkFeatures(chunk.strip())
+
+def _emotion_from_features(features):
+    """Most likely emotion class from punctuation and lexical cues, or None."""
     scores = {
         'anger': 0,
         'joy': 0,
@@ -314,53 +619,56 @@ def _emotion_tuning_from_text(chunk):
         'suspense': 0,
     }
 
-    exclaim_count = text.count('!')
-    question_count = text.count('?')
-    if exclaim_count >= 2:
+    if features.exclamations >= 2:
         scores['anger'] += 2
         scores['joy'] += 1
-    elif exclaim_count == 1:
+    elif features.exclamations == 1:
         scores['joy'] += 1
-    if question_count >= 2:
+    if features.questions >= 2:
         scores['fear'] += 1
         scores['suspense'] += 1
-    elif question_count == 1:
+    elif features.questions == 1:
         scores['suspense'] += 1
-    if '...' in text:
+    if features.has_ellipsis:
         scores['suspense'] += 2
         scores['calm'] += 1
 
-    if contains(r'\b(schrie|br[üu]llte|knurrte|wut|zorn|fauchte|w[üu]tend)\b'):
-        scores['anger'] += 3
-    if contains(r'\b(lachte|jubelte|grinste|freute|strahlte|fr[öo]hlich)\b'):
-        scores['joy'] += 3
-    if contains(r'\b(weinte|schluchzte|traurig|seufzte|leise|verzweifelt)\b'):
-        scores['sadness'] += 3
-    if contains(r'\b(zitterte|aengstlich|ängstlich|panik|furcht|flucht|erschrocken)\b'):
-        scores['fear'] += 3
-    if contains(r'\b(fluesterte|flüsterte|ruhig|sanft|behutsam|gelassen)\b'):
-        scores['calm'] += 3
+    for emotion in features.emotion_hits:
+        scores[emotion] += 3
 
     emotion = max(scores, key=lambda key: scores[key])
     if scores[emotion] == 0:
+        return None
+    return emotion
+
+# length_multiplier, noise_delta, noise_w_delta
+_EMOTION_PROFILES = {
+    'anger': (0.99, 0.09, 0.06),
+    'joy': (1.00, 0.07, 0.05),
+    'sadness': (1.09, -0.07, -0.05),
+    'fear': (1.02, 0.07, 0.05),
+    'calm': (1.05, -0.05, -0.04),
+    'suspense': (1.07, -0.04, -0.03),
+}
+
+def _classify_emotion(chunk):
+    """Most likely emotion class of a chunk from punctuation and lexical cues, or None."""
+    return _emotion_from_features(_chunk_features(chunk))
+
+def _emotion_tuning_from_text(chunk):
+    if not ENABLE_EMOTION_VARIATION:
+        return 1.0, 0.0, 0.0
+    emotion = _classify_emotion(chunk)
+    if emotion is None:
         return 1.0, 0.0, 0.0
+    return _EMOTION_PROFILES[emotion]
 
-    # length_multiplier, noise_delta, noise_w_delta
-    profiles = {
-        'anger': (0.99, 0.09, 0.06),
-        'joy': (1.00, 0.07, 0.05),
-        'sadness': (1.09, -0.07, -0.05),
-        'fear': (1.02, 0.07, 0.05),
-        'calm': (1.05, -0.05, -0.04),
-        'suspense': (1.07, -0.04, -0.03),
-    }
-    return profiles[emotion]
+_SENTENCE_RE = re.compile(r'.+?(?:[.!?]+(?:["\')\]]+)?)(?=\s+|$)|.+$', re.DOTALL)
 
 def _split_sentences_preserve_quotes(text):
     """Split text into sentence-like units while keeping closing quotes with sentence-ending punctuation."""
-    pattern = re.compile(r'.+?(?:[.!?]+(?:["\')\]]+)?)(?=\s+|$)|.+$', re.DOTALL)
     sentences = []
-    for match in pattern.finditer(text):
+    for match in _SENTENCE_RE.finditer(text):
         sentence = match.group(0).strip()
         if sentence:
             sentences.append(sentence)
@@ -374,106 +682,306 @@ def _apply_custom_pronunciations(text):
         updated = pattern.sub(replacement, updated)
     return updated
 
+# Separators an overlong sentence may be cut at. Lower penalty = more natural place for a pause.
+# The separator's punctuation/word stays with the left part, like a spoken pause after it.
+_SENTENCE_CUT_PENALTY = {
+    ', ': 0.0, '; ': 0.05, ': ': 0.1, ' - ': 0.15, ' – ': 0.2,
+    ' und ': 0.25, ' oder ': 0.3, ' aber ': 0.35,
+}
+# Plain word breaks are only used when no separator scores better.
+_WORD_CUT_PENALTY = 0.6
+
 def _split_overlong_sentence(sentence, max_chars):
+    """
+    Cut a sentence longer than max_chars into pieces in a single left-to-right pass.
+    Each cut is the separator or word break inside the max_chars window with the best score:
+    separator penalty plus distance from an even share of the remaining text, so pieces stay
+    balanced. Only the current window is searched, so the work stays linear in the sentence length.
+    """
     sentence = sentence.strip()
     if not sentence:
         return []
     if len(sentence) <= max_chars:
         return [sentence]
 
+    total = len(sentence)
     parts = []
-    queue = [sentence]
-    separators = [', ', '; ', ': ', ' - ', ' – ', ' und ', ' oder ', ' aber ']
+    start = 0
+
+    while total - start > max_chars:
+        window_end = start + max_chars
+        remaining = total - start
+        target = start + remaining // -(-remaining // max_chars)
+
+        # Only the occurrence of each separator nearest the target on either side can
+        # score best, so two bounded find/rfind calls per separator cover the window.
+        best = None
+        best_score = None
+        for sep, penalty in _SENTENCE_CUT_PENALTY.items():
+            width = len(sep)
+            for pos in (sentence.rfind(sep, start, target + 1),
+                        sentence.find(sep, max(start, target - width + 1), window_end + 1)):
+                if pos == -1:
+                    continue
+                left_end = pos + width - 1
+                score = penalty + abs(left_end - target) / max_chars
+                if best_score is None or score < best_score:
+                    best, best_score = (left_end, left_end + 1, penalty), score
+
+        # Nearest word breaks on either side of the target.
+        for pos in (sentence.rfind(' ', start + 1, target + 1), sentence.find(' ', target, window_end + 1)):
+            if pos == -1:
+                continue
+            score = _WORD_CUT_PENALTY + abs(pos - target) / max_chars
+            if best_score is None or score < best_score:
+                best, best_score = (pos, pos + 1, _WORD_CUT_PENALTY), score
+
+        if best is None:
+            # One very long word run: accept an overlong piece up to the next possible cut.
+            pos = sentence.find(' ', window_end)
+            if pos != -1:
+                best = (pos, pos + 1, _WORD_CUT_PENALTY)
+            for sep, penalty in _SENTENCE_CUT_PENALTY.items():
+                pos = sentence.find(sep, start)
+                if pos == -1:
+                    continue
+                left_end = pos + len(sep) - 1
+                if best is None or left_end < best[0]:
+                    best = (left_end, left_end + 1, penalty)
+            if best is None:
+                break
 
-    while queue:
-        item = queue.pop(0).strip()
-        if not item:
-            continue
-        if len(item) <= max_chars:
-            parts.append(item)
-            continue
+        piece = sentence[start:best[0]].strip()
+        if piece:
+            parts.append(piece)
+        start = best[1]
 
-        split_done = False
-        center = len(item) // 2
+    tail = sentence[start:].strip()
+    if tail:
+        parts.append(tail)
+    return parts
 
-        for sep in separators:
-            positions = [m.start() for m in re.finditer(re.escape(sep), item)]
-            if not positions:
-                continue
-            split_at = min(positions, key=lambda pos: abs(pos - center))
-            left = item[:split_at + len(sep) - 1].strip()
-            right = item[split_at + len(sep):].strip()
-            if left and right and left != item and right != item:
-                queue.insert(0, right)
-                queue.insert(0, left)
-                split_done = True
-                break
+# ── Text normalization engine ─────────────────────────────────────────────────
+# preprocess_text, prepare_for_tts and _enhance_story_text_for_tts run ordered lists of
+# precompiled steps. Literal replacements share one alternation with a dict lookup where
+# merging provably gives the same result as the old one-pattern-per-literal passes.
+# Order matters (e.g. markdown before whitespace cleanup, numbers before sound words),
+# so each stage is an explicit tuple that runs top to bottom.
+
+def _literal_alternation(literals, word_boundaries=True):
+    body = '|'.join(re.escape(literal) for literal in sorted(literals, key=len, reverse=True))
+    if word_boundaries:
+        return re.compile(r'\b(?:' + body + r')\b')
+    return re.compile(body)
+
+_ABBREVIATIONS = (
+    ('z.B.', 'zum Beispiel'),
+    ('d.h.', 'das heißt'),
+    ('u.a.', 'unter anderem'),
+    ('bzw.', 'beziehungsweise'),
+    ('usw.', 'und so weiter'),
+    ('u.s.w.', 'und so weiter'),
+    ('ca.', 'circa'),
+    ('Dr.', 'Doktor'),
+    ('Prof.', 'Professor'),
+    ('Hr.', 'Herr'),
+    ('Fr.', 'Frau'),
+    ('Nr.', 'Nummer'),
+    ('St.', 'Sankt'),
+    ('Str.', 'Straße'),
+    ('o.ä.', 'oder ähnliches'),
+    ('s.o.', 'siehe oben'),
+    ('ggf.', 'gegebenenfalls'),
+    ('evtl.', 'eventuell'),
+    ('Mio.', 'Millionen'),
+    ('Mrd.', 'Milliarden'),
+)
+_ABBREVIATION_ANY_RE = _literal_alternation(source for source, _target in _ABBREVIATIONS)
+_ABBREVIATION_STEPS = tuple(
+    (re.compile(r'\b' + re.escape(source) + r'\b'), target) for source, target in _ABBREVIATIONS
+)
 
-        if split_done:
-            continue
+def _expand_abbreviations(text):
+    # Abbreviations glued together ("s.o.ä.x") depend on the pass order, so the single
+    # alternation only decides whether the ordered passes need to run at all.
+    if _ABBREVIATION_ANY_RE.search(text) is None:
+        return text
+    for pattern, replacement in _ABBREVIATION_STEPS:
+        text = pattern.sub(replacement, text)
+    return text
 
-        hard_split = item.rfind(' ', 0, max_chars)
-        if hard_split < int(max_chars * 0.55):
-            hard_split = item.find(' ', max_chars)
+def _clock_time_to_german(m):
+    result = number_to_german(int(m.group(1))) + ' Uhr'
+    mins = int(m.group(2))
+    if mins > 0:
+        result += ' ' + number_to_german(mins)
+    return result
+
+# German/French quotation marks → ASCII quote, em/en dash → comma pause (one translate pass).
+_PREPROCESS_CHAR_MAP = str.maketrans({
+    '\u201e': '"',   # „ → "
+    '\u201c': '"',   # " → "
+    '\u201d': '"',   # " → "
+    '\u00bb': '"',   # » → "
+    '\u00ab': '"',   # « → "
+    '\u203a': '"',   # › → "
+    '\u2039': '"',   # ‹ → "
+    '\u2014': ', ',  # em-dash
+    '\u2013': ', ',  # en-dash
+})
+
+_PREPROCESS_STEPS = (
+    # ── Time expressions: 14:30 → vierzehn Uhr dreißig ──
+    (re.compile(r'\b(\d{1,2}):(\d{2})\b'), _clock_time_to_german),
+    # ── Quotes and dashes ──
+    (None, _PREPROCESS_CHAR_MAP),
+    # ── Remove markdown artifacts ──
+    (re.compile(r'\*\*(.+?)\*\*'), r'\1'),
+    (re.compile(r'\*(.+?)\*'), r'\1'),
+    (re.compile(r'#{1,6}\s*'), ''),
+    (re.compile(r'\[([^\]]+)\]\([^)]+\)'), r'\1'),
+    # ── Scene transition markers → pause ──
+    (re.compile(r'^[\*\-]{3,}\s*$', re.MULTILINE), '...'),
+    # ── Whitespace cleanup ──
+    (re.compile(r'\n+'), '\n\n'),
+    (re.compile(r'[ \t]+'), ' '),
+)
 
-        if hard_split == -1:
-            parts.append(item)
-            continue
+_ATTRIBUTION_VERBS = (
+    'sagte|rief|flüsterte|fragte|antwortete|meinte|murmelte|schrie|lachte|'
+    'erklärte|bat|dachte|brummte|seufzte|stöhnte|jubelte|wisperte|knurrte|'
+    'hauchte|schluchzte|jammerte|staunte|schnaubte|zischte|sang|brüllte'
+)
 
-        left = item[:hard_split].strip()
-        right = item[hard_split + 1:].strip()
-        if left:
-            queue.insert(0, left)
-        if right:
-            queue.insert(1 if left else 0, right)
+_INTERJECTIONS = (
+    'Ach|Oh|Ah|Ooh|Wow|Hey|Hm|Hmm|Na|Naja|Tja|Aha|Ohje|Hoppla|'
+    'Hurra|Ups|Autsch|Aua|Igitt|Pfui|Juhu|Oje|Mensch|Mist|Donnerwetter'
+)
 
-    return parts
+# Onomatopoeia emphasis: stretch sound words for kids.
+_SOUND_WORDS = {
+    'Platsch': 'Plaatsch', 'platsch': 'plaatsch',
+    'Bumm': 'Buumm', 'bumm': 'buumm',
+    'Puff': 'Puuff', 'puff': 'puuff',
+    'Knall': 'Knaall', 'knall': 'knaall',
+    'Zisch': 'Ziisch', 'zisch': 'ziisch',
+    'Klopf': 'Kloopf', 'klopf': 'kloopf',
+    'Plopp': 'Ploopp', 'plopp': 'ploopp',
+    'Krach': 'Kraach', 'krach': 'kraach',
+    'Huiii': 'Huuiii',
+    'Pssst': 'Psssst',
+    'Huch': 'Huuch', 'huch': 'huuch',
+    'Wusch': 'Wuusch', 'wusch': 'wuusch',
+    'Schwupp': 'Schwuupp', 'schwupp': 'schwuupp',
+    'Rums': 'Ruums', 'rums': 'ruums',
+    'Piep': 'Pieep', 'piep': 'pieep',
+    'Miau': 'Miaauu', 'miau': 'miaauu',
+    'Wuff': 'Wuuff', 'wuff': 'wuuff',
+    'Brumm': 'Bruumm', 'brumm': 'bruumm',
+    'Ratsch': 'Raatsch', 'ratsch': 'raatsch',
+    'Klirr': 'Kliirr', 'klirr': 'kliirr',
+    'Kling': 'Kliing', 'kling': 'kliing',
+    'Dong': 'Doong', 'dong': 'doong',
+    'Tock': 'Toock', 'tock': 'toock',
+    'Tick': 'Tiick', 'tick': 'tiick',
+}
+_SOUND_WORD_RE = _literal_alternation(_SOUND_WORDS)
 
-def _enhance_story_text_for_tts(text):
-    # Parenthetical fragments usually sound better with short pauses.
-    text = re.sub(r'\(([^)]+)\)', r', \1,', text)
+_PREPARE_STEPS = (
+    # ── 1. Paragraph breaks → sentence-ending pause ──
+    # Piper ignores \n\n. Replace with period + newline so it creates a real pause.
+    # Do this FIRST so later rules operate on clean text.
+    (re.compile(r'\n\n+'), '.\n\n'),
+    # Clean up double periods (but preserve intentional ellipses)
+    (re.compile(r'\.{2}(?!\.)'), '.'),
+    # ── 2. Dialogue pauses: breathing room around quoted speech ──
+    # Insert pause before opening quote when preceded by sentence-ending punctuation
+    (re.compile(r'([.!?])\s*"'), r'\1 ... "'),
+    # Pause after closing quote before speech attribution verbs
+    (re.compile(r'([.!?])"\s*,?\s*(' + _ATTRIBUTION_VERBS + r')'), r'\1" ... \2'),
+    # Pause before opening quote when starting speech mid-narration
+    (re.compile(r'(\w{3,}):\s*"'), r'\1: ... "'),
+    # ── 3. Exclamation/question emphasis: "! " → "!! ", "? " → "?? " ──
+    (re.compile(r'([!?])\s'), r'\1\1 '),
+    # ── 4. Comma breathing: add commas at natural breath points ──
+    # Before subordinate conjunctions
+    (
+        re.compile(r'(\w{4,})\s+(wenn|als|weil|dass|aber|doch|denn|obwohl|damit|bevor|nachdem|während|sobald|ob|falls|solange)\s'),
+        r'\1, \2 ',
+    ),
+    # Before "und" / "oder" in longer clauses (only when preceded by 6+ chars to avoid short phrases)
+    (re.compile(r'(\w{6,})\s+(und|oder)\s+(\w{4,})'), r'\1, \2 \3'),
+    # ── 5. Interjection pauses ──
+    (re.compile(r'\b(' + _INTERJECTIONS + r')([,!]?\s)'), r'\1, ... '),
+    # ── 6. Number pronunciation ──
+    (re.compile(r'\b(\d+)\b'), lambda m: number_to_german(int(m.group(1)))),
+    # ── 7. Onomatopoeia emphasis ──
+    (_SOUND_WORD_RE, lambda m: _SOUND_WORDS[m.group(0)]),
+    # ── 8. Trailing ellipsis for suspense sentences ──
+    (re.compile(r'([.])(\n\n)'), r'\1 ...\2'),
+    # ── 9. Clean up artifacts ──
+    (re.compile(r',\s*,'), ','),
+    (re.compile(r'\.\s*,'), '.'),
+    (re.compile(r',\s*\.'), '.'),
+    (re.compile(r'\.{4,}'), '...'),   # normalize 4+ dots to 3
+    (re.compile(r'[ \t]+'), ' '),
+    (re.compile(r' *\n *'), '\n'),
+    (re.compile(r'\n{3,}'), '\n\n'),
+    (re.compile(r'\s+([.!?,])'), r'\1'),  # no space before punctuation
+)
 
-    # Chapter titles and section headers should become spoken sentence starts.
-    text = re.sub(r'(?im)^\s*(kapitel\s+\d+)\s*[:\-]\s*', r'\1. ', text)
-    text = re.sub(r'(?im)^\s*(szene\s+\d+)\s*[:\-]\s*', r'\1. ', text)
+_PUNCTUATION_BURSTS = {'!': '!!', '?': '??', '.': '...'}
 
+_ENHANCE_STEPS = (
+    # Parenthetical fragments usually sound better with short pauses.
+    (re.compile(r'\(([^)]+)\)'), r', \1,'),
+    # Chapter titles and section headers should become spoken sentence starts.
+    (re.compile(r'(?im)^\s*(kapitel\s+\d+)\s*[:\-]\s*'), r'\1. '),
+    (re.compile(r'(?im)^\s*(szene\s+\d+)\s*[:\-]\s*'), r'\1. '),
     # Semicolons are often swallowed in TTS, convert to clearer sentence breaks.
-    text = re.sub(r';\s*', '. ', text)
-
+    (re.compile(r';\s*'), '. '),
     # Protect spoken rhythm for common symbol patterns.
-    text = re.sub(r'\s*/\s*', ' oder ', text)
-    text = re.sub(r'\s*&\s*', ' und ', text)
-
+    (re.compile(r'\s*/\s*'), ' oder '),
+    (re.compile(r'\s*&\s*'), ' und '),
     # Normalize punctuation bursts.
-    text = re.sub(r'!{3,}', '!!', text)
-    text = re.sub(r'\?{3,}', '??', text)
-    text = re.sub(r'\.{5,}', '...', text)
-
+    (re.compile(r'!{3,}|\?{3,}|\.{5,}'), lambda m: _PUNCTUATION_BURSTS[m.group(0)[0]]),
     # Add a small pause before abrupt topic changes.
-    text = re.sub(r'([.!?])\s*(Doch|Aber|Plötzlich|Dann)\b', r'\1 ... \2', text)
+    (re.compile(r'([.!?])\s*(Doch|Aber|Plötzlich|Dann)\b'), r'\1 ... \2'),
+)
 
+def _run_normalization_steps(text, steps):
+    for pattern, replacement in steps:
+        if pattern is None:
+            text = text.translate(replacement)
+        else:
+            text = pattern.sub(replacement, text)
     return text
 
+def _enhance_story_text_for_tts(text):
+    return _run_normalization_steps(text, _ENHANCE_STEPS)
+
 def _derive_chunk_params(chunk, base_length, base_noise, base_noise_w):
-    normalized = chunk.strip()
+    return _prosody_from_features(_chunk_features(chunk), base_length, base_noise, base_noise_w)
+
+def _prosody_from_features(features, base_length, base_noise, base_noise_w):
+    """Per-chunk (length_scale, noise_scale, noise_w); depends only on the features and config."""
     length = base_length
     noise = base_noise
     noise_w = base_noise_w
 
     # Global emotion shaping.
-    emotion_length, emotion_noise, emotion_noise_w = _emotion_tuning_from_text(normalized)
-    length *= emotion_length
-    noise += emotion_noise
-    noise_w += emotion_noise_w
+    if ENABLE_EMOTION_VARIATION:
+        emotion = _emotion_from_features(features)
+        if emotion is not None:
+            emotion_length, emotion_noise, emotion_noise_w = _EMOTION_PROFILES[emotion]
+            length *= emotion_length
+            noise += emotion_noise
+            noise_w += emotion_noise_w
 
     if ENABLE_DYNAMIC_CHUNK_TUNING:
-        has_dialogue = '"' in normalized
-        has_exclamation = normalized.endswith('!!') or normalized.endswith('!')
-        has_question = normalized.endswith('?')
-        has_suspense = normalized.endswith('...') or normalized.count('...') > 0
-        is_short = len(normalized) < 70
+        has_exclamation = features.ends_exclamation
 
-        if has_dialogue:
+        if features.has_dialogue:
             length *= 1.03
             noise += 0.04
             noise_w += 0.04
@@ -483,34 +991,30 @@ def _derive_chunk_params(chunk, base_length, base_noise, base_noise_w):
             noise += 0.10
             noise_w += 0.08
 
-        if has_question:
+        if features.ends_question:
             length *= 1.00
             noise += 0.05
             noise_w += 0.04
 
-        if has_suspense:
+        if features.has_ellipsis:
             length *= 1.05
             noise -= 0.05
             noise_w -= 0.04
 
-        if is_short and not has_exclamation:
-            length *= 1.00
-
         # Long narrative chunks should not drift too slow.
-        if len(normalized) >= LONG_CHUNK_THRESHOLD and not has_exclamation:
+        if features.length >= LONG_CHUNK_THRESHOLD and not has_exclamation:
             length *= LONG_CHUNK_LENGTH_MULT
 
     # Character-based variation (deterministic per speaker).
-    if ENABLE_CHARACTER_VOICE_VARIATION:
-        speaker = _extract_speaker_hint(normalized)
-        if speaker:
-            if speaker in CHARACTER_VOICE_PROFILES:
-                char_length, char_noise, char_noise_w = CHARACTER_VOICE_PROFILES[speaker]
-            else:
-                char_length, char_noise, char_noise_w = _speaker_hash_profile(speaker)
-            length *= char_length
-            noise += char_noise
-            noise_w += char_noise_w
+    speaker = features.speaker
+    if speaker:
+        if speaker in CHARACTER_VOICE_PROFILES:
+            char_length, char_noise, char_noise_w = CHARACTER_VOICE_PROFILES[speaker]
+        else:
+            char_length, char_noise, char_noise_w = _speaker_hash_profile(speaker)
+        length *= char_length
+        noise += char_noise
+        noise_w += char_noise_w
 
     relative_min = base_length * MIN_RELATIVE_LENGTH_MULT
     relative_max = base_length * MAX_RELATIVE_LENGTH_MULT
@@ -525,57 +1029,8 @@ def _derive_chunk_params(chunk, base_length, base_noise, base_noise_w):
 
 def preprocess_text(text):
     """Normalize text for better TTS pronunciation."""
-    # ── Abbreviations ──
-    text = re.sub(r'\bz\.B\.\b', 'zum Beispiel', text)
-    text = re.sub(r'\bd\.h\.\b', 'das heißt', text)
-    text = re.sub(r'\bu\.a\.\b', 'unter anderem', text)
-    text = re.sub(r'\bbzw\.\b', 'beziehungsweise', text)
-    text = re.sub(r'\busw\.\b', 'und so weiter', text)
-    text = re.sub(r'\bu\.s\.w\.\b', 'und so weiter', text)
-    text = re.sub(r'\bca\.\b', 'circa', text)
-    text = re.sub(r'\bDr\.\b', 'Doktor', text)
-    text = re.sub(r'\bProf\.\b', 'Professor', text)
-    text = re.sub(r'\bHr\.\b', 'Herr', text)
-    text = re.sub(r'\bFr\.\b', 'Frau', text)
-    text = re.sub(r'\bNr\.\b', 'Nummer', text)
-    text = re.sub(r'\bSt\.\b', 'Sankt', text)
-    text = re.sub(r'\bStr\.\b', 'Straße', text)
-    text = re.sub(r'\bo\.ä\.\b', 'oder ähnliches', text)
-    text = re.sub(r'\bs\.o\.\b', 'siehe oben', text)
-    text = re.sub(r'\bggf\.\b', 'gegebenenfalls', text)
-    text = re.sub(r'\bevtl\.\b', 'eventuell', text)
-    text = re.sub(r'\bMio\.\b', 'Millionen', text)
-    text = re.sub(r'\bMrd\.\b', 'Milliarden', text)
-    # ── Time expressions: 14:30 → vierzehn Uhr dreißig ──
-    def time_to_german(m):
-        h = int(m.group(1))
-        mins = int(m.group(2))
-        result = number_to_german(h) + ' Uhr'
-        if mins > 0:
-            result += ' ' + number_to_german(mins)
-        return result
-    text = re.sub(r'\b(\d{1,2}):(\d{2})\b', time_to_german, text)
-    # ── Normalize German quotation marks to ASCII for consistent handling ──
-    text = text.replace('\u201e', '"')   # „ → "
-    text = text.replace('\u201c', '"')   # " → "
-    text = text.replace('\u201d', '"')   # " → "
-    text = text.replace('\u00bb', '"')   # » → "
-    text = text.replace('\u00ab', '"')   # « → "
-    text = text.replace('\u203a', '"')   # › → "
-    text = text.replace('\u2039', '"')   # ‹ → "
-    # ── Remove markdown artifacts ──
-    text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-    text = re.sub(r'\*(.+?)\*', r'\1', text)
-    text = re.sub(r'#{1,6}\s*', '', text)
-    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
-    # ── Scene transition markers → pause ──
-    text = re.sub(r'^[\*\-]{3,}\s*$', '...', text, flags=re.MULTILINE)
-    # ── Normalize dashes ──
-    text = text.replace('\u2014', ', ')  # em-dash
-    text = text.replace('\u2013', ', ')  # en-dash
-    # ── Whitespace cleanup ──
-    text = re.sub(r'\n+', '\n\n', text)
-    text = re.sub(r'[ \t]+', ' ', text)
+    text = _expand_abbreviations(text)
+    text = _run_normalization_steps(text, _PREPROCESS_STEPS)
     return text.strip()
 
 def prepare_for_tts(text):
@@ -584,98 +1039,7 @@ def prepare_for_tts(text):
     Adds micro-pauses via punctuation, expands difficult words, slows dialogue.
     The original text in the frontend stays unchanged — this only affects audio.
     """
-    # ── 1. Paragraph breaks → sentence-ending pause ──
-    # Piper ignores \n\n. Replace with period + newline so it creates a real pause.
-    # Do this FIRST so later rules operate on clean text.
-    text = re.sub(r'\n\n+', '.\n\n', text)
-    # Clean up double periods (but preserve intentional ellipses)
-    text = re.sub(r'\.{2}(?!\.)', '.', text)
-
-    # ── 2. Dialogue pauses: breathing room around quoted speech ──
-    # Insert pause before opening quote when preceded by sentence-ending punctuation
-    text = re.sub(r'([.!?])\s*"', r'\1 ... "', text)
-    # Pause after closing quote before speech attribution verbs
-    attribution_verbs = (
-        'sagte|rief|flüsterte|fragte|antwortete|meinte|murmelte|schrie|lachte|'
-        'erklärte|bat|dachte|brummte|seufzte|stöhnte|jubelte|wisperte|knurrte|'
-        'hauchte|schluchzte|jammerte|staunte|schnaubte|zischte|sang|brüllte'
-    )
-    text = re.sub(
-        r'([.!?])"\s*,?\s*(' + attribution_verbs + r')',
-        r'\1" ... \2', text
-    )
-    # Pause before opening quote when starting speech mid-narration
-    text = re.sub(r'(\w{3,}):\s*"', r'\1: ... "', text)
-
-    # ── 3. Exclamation/question emphasis ──
-    text = re.sub(r'!\s', '!! ', text)
-    text = re.sub(r'\?\s', '?? ', text)
-
-    # ── 4. Comma breathing: add commas at natural breath points ──
-    # Before subordinate conjunctions
-    text = re.sub(
-        r'(\w{4,})\s+(wenn|als|weil|dass|aber|doch|denn|obwohl|damit|bevor|nachdem|während|sobald|ob|falls|solange)\s',
-        r'\1, \2 ', text
-    )
-    # Before "und" / "oder" in longer clauses (only when preceded by 6+ chars to avoid short phrases)
-    text = re.sub(r'(\w{6,})\s+(und|oder)\s+(\w{4,})', r'\1, \2 \3', text)
-
-    # ── 5. Interjection pauses ──
-    # Common German interjections get a micro-pause after them
-    interjections = (
-        'Ach|Oh|Ah|Ooh|Wow|Hey|Hm|Hmm|Na|Naja|Tja|Aha|Ohje|Hoppla|'
-        'Hurra|Ups|Autsch|Aua|Igitt|Pfui|Juhu|Oje|Mensch|Mist|Donnerwetter'
-    )
-    text = re.sub(r'\b(' + interjections + r')([,!]?\s)', r'\1, ... ', text)
-
-    # ── 6. Number pronunciation ──
-    text = re.sub(r'\b(\d+)\b', lambda m: number_to_german(int(m.group(1))), text)
-
-    # ── 7. Onomatopoeia emphasis: stretch sound words for kids ──
-    sound_words = {
-        'Platsch': 'Plaatsch', 'platsch': 'plaatsch',
-        'Bumm': 'Buumm', 'bumm': 'buumm',
-        'Puff': 'Puuff', 'puff': 'puuff',
-        'Knall': 'Knaall', 'knall': 'knaall',
-        'Zisch': 'Ziisch', 'zisch': 'ziisch',
-        'Klopf': 'Kloopf', 'klopf': 'kloopf',
-        'Plopp': 'Ploopp', 'plopp': 'ploopp',
-        'Krach': 'Kraach', 'krach': 'kraach',
-        'Huiii': 'Huuiii',
-        'Pssst': 'Psssst',
-        'Huch': 'Huuch', 'huch': 'huuch',
-        'Wusch': 'Wuusch', 'wusch': 'wuusch',
-        'Schwupp': 'Schwuupp', 'schwupp': 'schwuupp',
-        'Rums': 'Ruums', 'rums': 'ruums',
-        'Piep': 'Pieep', 'piep': 'pieep',
-        'Miau': 'Miaauu', 'miau': 'miaauu',
-        'Wuff': 'Wuuff', 'wuff': 'wuuff',
-        'Brumm': 'Bruumm', 'brumm': 'bruumm',
-        'Ratsch': 'Raatsch', 'ratsch': 'raatsch',
-        'Klirr': 'Kliirr', 'klirr': 'kliirr',
-        'Kling': 'Kliing', 'kling': 'kliing',
-        'Dong': 'Doong', 'dong': 'doong',
-        'Tock': 'Toock', 'tock': 'toock',
-        'Tick': 'Tiick', 'tick': 'tiick',
-    }
-    for word, replacement in sound_words.items():
-        text = re.sub(r'\b' + re.escape(word) + r'\b', replacement, text)
-
-    # ── 8. Trailing ellipsis for suspense sentences ──
-    # "Er öffnete die Tür." at end of paragraph → add slight suspense if followed by paragraph break
-    text = re.sub(r'([.])(\n\n)', r'\1 ...\2', text)
-
-    # ── 9. Clean up artifacts ──
-    text = re.sub(r',\s*,', ',', text)
-    text = re.sub(r'\.\s*,', '.', text)
-    text = re.sub(r',\s*\.', '.', text)
-    text = re.sub(r'\.{4,}', '...', text)   # normalize 4+ dots to 3
-    text = re.sub(r'[ \t]+', ' ', text)
-    text = re.sub(r' *\n *', '\n', text)
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = re.sub(r'\s+([.!?,])', r'\1', text)  # no space before punctuation
-
-    return text.strip()
+    return _run_normalization_steps(text, _PREPARE_STEPS).strip()
 
 def number_to_german(n):
     """Convert small numbers to German words for natural TTS reading."""
@@ -716,87 +1080,902 @@ def number_to_german(n):
         return prefix + number_to_german(rest)
     return str(n)
 
-def generate_silence(duration_ms, sample_rate=22050, bits_per_sample=16, num_channels=1):
-    """Generate a WAV chunk of silence."""
-    num_samples = int(sample_rate * duration_ms / 1000)
+def _wav_header(data_size, sample_rate=22050, bits_per_sample=16, num_channels=1):
+    """Build a 44-byte PCM WAV header for data_size bytes of audio."""
     byte_rate = sample_rate * num_channels * (bits_per_sample // 8)
     block_align = num_channels * (bits_per_sample // 8)
-    data_size = num_samples * block_align
-    silence = b'\x00' * data_size
     header = struct.pack('<4sI4s', b'RIFF', 36 + data_size, b'WAVE')
     fmt_chunk = struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, num_channels,
                            sample_rate, byte_rate, block_align, bits_per_sample)
     data_header = struct.pack('<4sI', b'data', data_size)
-    return header + fmt_chunk + data_header + silence
+    return header + fmt_chunk + data_header
+
+def _stream_wav_header(sample_rate=22050):
+    """WAV header with open-ended RIFF/data sizes for audio whose length is not known yet."""
+    header = bytearray(_wav_header(0, sample_rate))
+    struct.pack_into('<I', header, 4, 0xFFFFFFFF)
+    struct.pack_into('<I', header, 40, 0xFFFFFFFF)
+    return bytes(header)
+
+def _silence_byte_count(duration_ms, sample_rate=MODEL_SAMPLE_RATE):
+    """Size in bytes of duration_ms of mono int16 silence."""
+    return int(sample_rate * duration_ms / 1000) * 2
+
+class SilenceBank:
+    """
+    Zero PCM for chunk gaps, allocated once per sample rate. Every gap, including
+    pause-scaled ones, is a read-only memoryview slice of the same buffer.
+    """
 
-def split_text_into_chunks(text, max_chars=MAX_CHUNK_CHARS):
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        durations = (
+            SILENCE_SCENE_MS, SILENCE_DIALOGUE_MS, SILENCE_EXCLAIM_MS, SILENCE_QUESTION_MS,
+            SILENCE_PERIOD_MS, SILENCE_COMMA_MS, SILENCE_DEFAULT_MS,
+        )
+        longest_ms = max(durations) * max(1.0, MAX_PAUSE_SCALE)
+        self._zeros = memoryview(bytes(_silence_byte_count(longest_ms, sample_rate)))
+        self._unscaled = {ms: self._zeros[:_silence_byte_count(ms, sample_rate)] for ms in durations}
+        # Replaced, never mutated, so lookups need no lock.
+        self._bytes = {}
+
+    def get(self, duration_ms, pause_scale=1.0):
+        if pause_scale == 1.0:
+            gap = self._unscaled.get(duration_ms)
+            if gap is not None:
+                return gap
+        scale = _clamp(pause_scale, MIN_PAUSE_SCALE, MAX_PAUSE_SCALE)
+        size = _silence_byte_count(duration_ms * scale, self.sample_rate)
+        if size <= len(self._zeros):
+            return self._zeros[:size]
+        return memoryview(bytes(size))
+
+    # Distinct gap sizes kept as bytes; pause_scale is free-form, so the set is bounded.
+    MAX_BYTES_ENTRIES = 64
+
+    def as_bytes(self, gap):
+        """Gap as an immutable bytes object shared across requests, for WSGI bodies that reject buffers."""
+        size = len(gap)
+        data = self._bytes.get(size)
+        if data is None:
+            data = bytes(size)
+            if len(self._bytes) < self.MAX_BYTES_ENTRIES:
+                self._bytes = {**self._bytes, size: data}
+        return data
+
+_silence_banks = {MODEL_SAMPLE_RATE: SilenceBank(MODEL_SAMPLE_RATE)}
+_silence_banks_lock = threading.Lock()
+
+def _get_silence_bank(sample_rate):
+    bank = _silence_banks.get(sample_rate)
+    if bank is None:
+        with _silence_banks_lock:
+            bank = _silence_banks.setdefault(sample_rate, SilenceBank(sample_rate))
+    return bank
+
+def split_text_into_chunks(text, max_chars=None):
     """
     Split text into chunks optimized for Piper TTS.
     - Keeps sentence boundaries so punctuation can become audible pauses.
     - Splits overlong sentences without breaking words.
     - Separates dialogue/narration transitions for better expressiveness.
+    Runs in linear time: sentences are packed greedily with a running length, and
+    pieces are joined once per chunk instead of growing a string sentence by sentence.
     """
-    paragraphs = text.split('\n\n')
+    if max_chars is None:
+        max_chars = MAX_CHUNK_CHARS
+    sentence_limit = max(1, MAX_SENTENCES_PER_CHUNK)
     chunks = []
 
-    for para in paragraphs:
+    for para in text.split('\n\n'):
         para = para.strip()
         if not para:
             continue
 
-        sentences = _split_sentences_preserve_quotes(para)
-        normalized_sentences = []
-        for sentence in sentences:
-            if not sentence or not sentence.strip():
-                continue
-            normalized_sentences.extend(_split_overlong_sentence(sentence, max_chars))
-
-        current_chunk = ''
-        current_sentence_count = 0
+        current = []
+        current_len = 0
         current_has_dialogue = False
 
-        for sentence in normalized_sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-
-            has_dialogue = '"' in sentence
-            if not current_chunk:
-                current_chunk = sentence
-                current_sentence_count = 1
+        for raw_sentence in _split_sentences_preserve_quotes(para):
+            for sentence in _split_overlong_sentence(raw_sentence, max_chars):
+                has_dialogue = '"' in sentence
+                if current:
+                    would_exceed = current_len + len(sentence) + 1 > max_chars
+                    sentence_limit_hit = len(current) >= sentence_limit
+                    dialogue_boundary = has_dialogue != current_has_dialogue and current_len > 40
+                    if not (would_exceed or sentence_limit_hit or dialogue_boundary):
+                        current.append(sentence)
+                        current_len += len(sentence) + 1
+                        current_has_dialogue = current_has_dialogue or has_dialogue
+                        continue
+                    chunks.append(' '.join(current))
+                current = [sentence]
+                current_len = len(sentence)
                 current_has_dialogue = has_dialogue
-                continue
 
-            would_exceed = len(current_chunk) + len(sentence) + 1 > max_chars
-            sentence_limit_hit = current_sentence_count >= max(1, MAX_SENTENCES_PER_CHUNK)
-            dialogue_boundary = has_dialogue != current_has_dialogue and len(current_chunk) > 40
+        if current:
+            chunks.append(' '.join(current))
 
-            if would_exceed or sentence_limit_hit or dialogue_boundary:
-                chunks.append(current_chunk.strip())
-                current_chunk = sentence
-                current_sentence_count = 1
-                current_has_dialogue = has_dialogue
-            else:
-                current_chunk = (current_chunk + ' ' + sentence).strip()
-                current_sentence_count += 1
-                current_has_dialogue = current_has_dialogue or has_dialogue
+    return chunks
 
-        if current_chunk:
-            chunks.append(current_chunk.strip())
 
-    return chunks
+def _read_wav_file_pcm(path):
+    """Read only the PCM payload of a WAV file written by Piper."""
+    with open(path, 'rb') as f:
+        header = f.read(44)
+        # Piper always writes the canonical 44-byte header; anything else gets parsed properly.
+        if len(header) == 44 and header[:4] == b'RIFF' and header[36:40] == b'data':
+            return f.read()
+        f.seek(0)
+        data = f.read()
+    data_offset = data.find(b'data')
+    if data_offset == -1:
+        return b''
+    data_size = struct.unpack_from('<I', data, data_offset + 4)[0]
+    return data[data_offset + 8:data_offset + 8 + data_size]
+
+
+class PiperWorker:
+    """One long-lived Piper process fed with JSON lines over stdin."""
+
+    def __init__(self, worker_id, model_path=MODEL_PATH):
+        self.worker_id = worker_id
+        self.model_path = model_path
+        self.proc = None
+        self.jobs_done = 0
+        self.output_dir = None
+        self._stderr_tail = deque(maxlen=20)
+
+    def start(self):
+        self.output_dir = tempfile.mkdtemp(prefix=f"piper-worker-{self.worker_id}-")
+        cmd = [
+            PIPER_BINARY,
+            "--model", self.model_path,
+            "--json-input",
+            "--output_dir", self.output_dir,
+            "--length_scale", str(DEFAULT_LENGTH_SCALE),
+            "--noise_scale", str(DEFAULT_NOISE_SCALE),
+            "--noise_w", str(DEFAULT_NOISE_W),
+        ]
+        self.proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self.jobs_done = 0
+        self._stderr_tail.clear()
+        # Piper logs every utterance; drain stderr so the pipe never fills up.
+        threading.Thread(
+            target=self._drain_stderr,
+            args=(self.proc.stderr,),
+            name=f"piper-worker-{self.worker_id}-stderr",
+            daemon=True,
+        ).start()
+        print(f"Piper worker {self.worker_id}: started (pid={self.proc.pid})", file=sys.stderr)
+
+    def _drain_stderr(self, stream):
+        for raw_line in iter(stream.readline, b''):
+            self._stderr_tail.append(raw_line.decode('utf-8', errors='replace').rstrip())
+
+    def is_alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def stop(self):
+        proc = self.proc
+        self.proc = None
+        if proc is not None:
+            try:
+                proc.stdin.close()
+            except Exception:
+                pass
+            try:
+                proc.wait(timeout=2)
+            except Exception:
+                proc.kill()
+                proc.wait()
+        if self.output_dir:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            self.output_dir = None
+
+    def _error_detail(self):
+        return " | ".join(self._stderr_tail) or "no stderr output"
+
+    def synthesize(self, text, length_scale, noise_scale, noise_w, speaker_id=None):
+        output_file = os.path.join(self.output_dir, f"{uuid.uuid4().hex}.wav")
+        request_line = {
+            "text": text,
+            "output_file": output_file,
+            "length_scale": length_scale,
+            "noise_scale": noise_scale,
+            "noise_w": noise_w,
+        }
+        if speaker_id is not None:
+            request_line["speaker_id"] = speaker_id
+        line = json.dumps(request_line, ensure_ascii=False)
+
+        try:
+            self.proc.stdin.write(line.encode('utf-8') + b'\n')
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise RuntimeError(f"Piper worker {self.worker_id} stdin closed: {e}; {self._error_detail()}")
+
+        ready, _, _ = select.select([self.proc.stdout], [], [], PIPER_WORKER_TIMEOUT_SECONDS)
+        if not ready:
+            raise RuntimeError(f"Piper worker {self.worker_id} timed out after {PIPER_WORKER_TIMEOUT_SECONDS:.0f}s")
+        reply = self.proc.stdout.readline().decode('utf-8', errors='replace').strip()
+        if not reply:
+            raise RuntimeError(f"Piper worker {self.worker_id} exited: {self._error_detail()}")
+
+        # Piper answers with the path it actually wrote to.
+        try:
+            data = _read_wav_file_pcm(reply)
+        finally:
+            try:
+                os.remove(reply)
+            except OSError:
+                pass
+
+        self.jobs_done += 1
+        return data
+
+
+class PiperWorkerPool:
+    """Fixed-size pool of PiperWorker processes for one model, restarted on failure."""
+
+    def __init__(self, size, max_jobs, model_path=MODEL_PATH, label=''):
+        self.size = max(1, size)
+        self.max_jobs = max(1, max_jobs)
+        self._idle = queue.Queue()
+        self._workers = []
+        self._restarts = 0
+        self._lock = threading.Lock()
+        for worker_id in range(self.size):
+            worker = PiperWorker(f"{label}{worker_id}", model_path)
+            self._workers.append(worker)
+            self._idle.put(worker)
+
+    def _ensure_ready(self, worker):
+        if worker.is_alive() and worker.jobs_done < self.max_jobs:
+            return
+        if worker.proc is not None:
+            reason = "recycled" if worker.is_alive() else "crashed"
+            print(f"Piper worker {worker.worker_id}: {reason} after {worker.jobs_done} jobs", file=sys.stderr)
+            with self._lock:
+                self._restarts += 1
+        worker.stop()
+        worker.start()
+
+    def warm(self):
+        """Start every worker now so the first requests do not pay model load time."""
+        workers = []
+        while len(workers) < self.size:
+            workers.append(self._idle.get())
+        try:
+            for worker in workers:
+                try:
+                    self._ensure_ready(worker)
+                except Exception as e:
+                    print(f"Piper worker {worker.worker_id}: warm start failed: {e}", file=sys.stderr)
+        finally:
+            for worker in workers:
+                self._idle.put(worker)
+
+    def synthesize(self, text, length_scale, noise_scale, noise_w, speaker_id=None):
+        worker = self._idle.get()
+        try:
+            last_error = None
+            # One retry on a fresh process covers crashes caused by a dying worker.
+            for _attempt in range(2):
+                self._ensure_ready(worker)
+                try:
+                    return worker.synthesize(text, length_scale, noise_scale, noise_w, speaker_id)
+                except Exception as e:
+                    last_error = e
+                    print(f"Piper worker {worker.worker_id}: {e}", file=sys.stderr)
+                    worker.stop()
+            raise RuntimeError(f"Piper error: {last_error}")
+        finally:
+            self._idle.put(worker)
+
+    def stats(self):
+        with self._lock:
+            restarts = self._restarts
+        return {
+            'size': self.size,
+            'alive': sum(1 for w in self._workers if w.is_alive()),
+            'idle': self._idle.qsize(),
+            'restarts': restarts,
+        }
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.stop()
+
+
+# ── Startup auto-tuning ───────────────────────────────────────────────────────
+# Fixed probe: narration, dialogue and one long sentence, so chunk size changes the split.
+_AUTO_TUNE_PROBE_TEXT = (
+    "Am Abend zog ein Gewitter über das Tal. Emma saß am Fenster und zählte die Sekunden zwischen Blitz "
+    "und Donner, während der kleine Drache Funkel unter der Decke zitterte. \"Es ist noch weit weg\", "
+    "flüsterte sie, \"mindestens fünf Kilometer.\" Funkel lugte hervor und fragte leise, ob Gewitter "
+    "auch Drachen fressen könnten, und Emma lachte so sehr, dass sie fast vom Stuhl fiel, denn noch nie "
+    "hatte sie gehört, dass ein Gewitter irgendjemanden gefressen hätte, schon gar keinen Drachen, der "
+    "Feuer speien und über die höchsten Berge des ganzen Landes fliegen konnte. Draußen rauschte der "
+    "Regen. \"Morgen\", sagte Emma, \"gehen wir zum Fluss und schauen, wie hoch das Wasser steht.\" "
+    "Funkel nickte, gähnte und schlief ein, noch bevor der nächste Donner kam."
+)
+# Bump when the probe or the selection rule changes, so cached calibrations are redone.
+_AUTO_TUNE_VERSION = 1
+# A smaller parallelism or larger chunk size is preferred unless the alternative is this much faster.
+_AUTO_TUNE_TOLERANCE = 0.05
+
+def _auto_tune_host_key():
+    """Everything a calibration depends on; a cached result is reused only if this matches."""
+    cpu_model = ''
+    try:
+        with open('/proc/cpuinfo', 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    cpu_model = line.split(':', 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    model_stat = os.stat(MODEL_PATH)
+    return {
+        'version': _AUTO_TUNE_VERSION,
+        'cpus': AUTO_TUNE_MAX_PARALLEL,
+        'cpu_model': cpu_model or platform.processor(),
+        'model_bytes': model_stat.st_size,
+        'model_mtime': int(model_stat.st_mtime),
+        'quality_mode': PIPER_QUALITY_MODE,
+        'min_chunk_chars': AUTO_TUNE_MIN_CHUNK_CHARS,
+    }
+
+def _auto_tune_rtf(pool, parallel, max_chars):
+    """Real-time factor (wall seconds per audio second) of the probe at one setting."""
+    text = _enhance_story_text_for_tts(prepare_for_tts(preprocess_text(_AUTO_TUNE_PROBE_TEXT)))
+    chunks = split_text_into_chunks(text, max_chars)
+    params = [_derive_chunk_params(c, DEFAULT_LENGTH_SCALE, DEFAULT_NOISE_SCALE, DEFAULT_NOISE_W) for c in chunks]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        pcm = list(executor.map(lambda i: pool.synthesize(chunks[i], *params[i]), range(len(chunks))))
+    wall = time.perf_counter() - start
+    return wall / (sum(len(p) for p in pcm) / 2 / MODEL_SAMPLE_RATE)
+
+def _auto_tune_pick(measurements, key, prefer_low):
+    """Best measured value of `key`, preferring the cheaper/higher-quality end within the tolerance."""
+    best_rtf = min(m['rtf'] for m in measurements)
+    eligible = [m[key] for m in measurements if m['rtf'] <= best_rtf * (1 + _AUTO_TUNE_TOLERANCE)]
+    return min(eligible) if prefer_low else max(eligible)
+
+def _auto_tune_calibrate():
+    """Measure the probe over parallelism, then chunk sizes at the best parallelism."""
+    started = time.perf_counter()
+    parallel_options = sorted(
+        {p for p in (1, 2, 4, 8, 16, 32) if p <= AUTO_TUNE_MAX_PARALLEL} | {max(1, AUTO_TUNE_MAX_PARALLEL)}
+    )
+    preset_chars = max(AUTO_TUNE_MIN_CHUNK_CHARS, _QUALITY['max_chunk_chars'])
+    chunk_options = sorted(
+        {max(AUTO_TUNE_MIN_CHUNK_CHARS, int(preset_chars * f)) for f in (1.0, 0.75, 0.5)}, reverse=True
+    )
+
+    # Only as many Piper processes as the setting being measured are alive at any time.
+    pools = {}
+
+    def pool_for(parallel):
+        pool = pools.get(parallel)
+        if pool is None:
+            for old in pools.values():
+                old.shutdown()
+            pools.clear()
+            pool = pools[parallel] = PiperWorkerPool(parallel, PIPER_WORKER_MAX_JOBS, label='tune-')
+            pool.warm()
+            # One short utterance per worker so first-call setup is not measured.
+            with ThreadPoolExecutor(max_workers=pool.size) as executor:
+                list(executor.map(lambda _: pool.synthesize("Hallo.", DEFAULT_LENGTH_SCALE, DEFAULT_NOISE_SCALE,
+                                                              DEFAULT_NOISE_W), range(pool.size)))
+        return pool
+
+    try:
+        measurements = []
+
+        slowest = [0.0]
+
+        def measure(parallel, max_chars):
+            if measurements and time.perf_counter() - started + slowest[0] > AUTO_TUNE_BUDGET_SECONDS:
+                return
+            pool = pool_for(parallel)
+            measure_started = time.perf_counter()
+            rtf = _auto_tune_rtf(pool, parallel, max_chars)
+            slowest[0] = max(slowest[0], time.perf_counter() - measure_started)
+            measurements.append({'max_parallel': parallel, 'max_chunk_chars': max_chars, 'rtf': round(rtf, 4)})
+            print(f"Auto-tune: max_parallel={parallel}, max_chunk_chars={max_chars}: rtf={rtf:.3f}", file=sys.stderr)
+
+        for parallel in parallel_options:
+            measure(parallel, chunk_options[0])
+        best_parallel = _auto_tune_pick(measurements, 'max_parallel', prefer_low=True)
+        for max_chars in chunk_options[1:]:
+            measure(best_parallel, max_chars)
+        best_chars = _auto_tune_pick(
+            [m for m in measurements if m['max_parallel'] == best_parallel], 'max_chunk_chars', prefer_low=False
+        )
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+
+    # Async jobs only feed the shared scheduler; keep the preset's ratio of jobs to synthesis slots.
+    job_workers = max(1, round(_QUALITY['job_workers'] * best_parallel / _QUALITY['max_parallel']))
+    return {
+        'settings': {'max_parallel': best_parallel, 'max_chunk_chars': best_chars, 'job_workers': job_workers},
+        'measurements': measurements,
+        'seconds': round(time.perf_counter() - started, 1),
+    }
+
+def _auto_tune():
+    """Calibrated (or cached) settings for this host; never raises, falls back to the preset."""
+    try:
+        host = _auto_tune_host_key()
+        try:
+            with open(AUTO_TUNE_CACHE_PATH, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('host') == host:
+                cached['source'] = 'cache'
+                return cached
+        except (OSError, ValueError):
+            pass
+
+        if os.path.dirname(os.path.abspath(AUTO_TUNE_CACHE_PATH)) == os.path.abspath(tempfile.gettempdir()):
+            print(
+                f"WARNING: AUTO_TUNE_CACHE_PATH={AUTO_TUNE_CACHE_PATH} is not persistent; "
+                "point it at a volume or every deploy calibrates again",
+                file=sys.stderr,
+            )
+        result = _auto_tune_calibrate()
+        result['host'] = host
+        try:
+            tmp_path = f"{AUTO_TUNE_CACHE_PATH}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2)
+            os.replace(tmp_path, AUTO_TUNE_CACHE_PATH)
+        except OSError as e:
+            print(f"WARNING: could not write auto-tune cache {AUTO_TUNE_CACHE_PATH}: {e}", file=sys.stderr)
+        result['source'] = 'calibrated'
+        return result
+    except Exception as e:
+        print(f"WARNING: auto-tune failed, using preset values: {e}", file=sys.stderr)
+        return {'source': 'failed', 'error': str(e)}
+
+_auto_tune_result = None
+if AUTO_TUNE and TTS_ENGINE == 'piper' and PIPER_WORKER_POOL:
+    _auto_tune_result = _auto_tune()
+    _tuned = _auto_tune_result.get('settings')
+    if _tuned:
+        # Explicit environment settings win over calibration.
+        overridden = [name for name in ('MAX_PARALLEL_PIPER', 'MAX_CHUNK_CHARS', 'JOB_EXECUTOR_WORKERS')
+                      if name in os.environ]
+        _auto_tune_result['env_overrides'] = overridden
+        if 'MAX_PARALLEL_PIPER' not in overridden:
+            MAX_PARALLEL_PIPER = _tuned['max_parallel']
+        if 'MAX_CHUNK_CHARS' not in overridden:
+            MAX_CHUNK_CHARS = _tuned['max_chunk_chars']
+        if 'JOB_EXECUTOR_WORKERS' not in overridden:
+            JOB_EXECUTOR_WORKERS = _tuned['job_workers']
+        print(
+            f"Auto-tune ({_auto_tune_result['source']}): max_parallel={MAX_PARALLEL_PIPER}, "
+            f"max_chunk_chars={MAX_CHUNK_CHARS}, job_workers={JOB_EXECUTOR_WORKERS}",
+            file=sys.stderr,
+        )
+elif AUTO_TUNE:
+    print("WARNING: AUTO_TUNE needs TTS_ENGINE=piper with PIPER_WORKER_POOL; using preset values", file=sys.stderr)
+
+_job_executor = ThreadPoolExecutor(max_workers=JOB_EXECUTOR_WORKERS, thread_name_prefix="tts-job")
 
+_piper_pool = PiperWorkerPool(MAX_PARALLEL_PIPER, PIPER_WORKER_MAX_JOBS) if PIPER_WORKER_POOL else None
+if _piper_pool is not None:
+    atexit.register(_piper_pool.shutdown)
+
+
+_model_fingerprints = {}
+_model_fingerprint_lock = threading.Lock()
+
+def _model_fingerprint(model_path=MODEL_PATH):
+    """sha256 of a voice model or config file, computed once per path on first use."""
+    fingerprint = _model_fingerprints.get(model_path)
+    if fingerprint is None:
+        with _model_fingerprint_lock:
+            fingerprint = _model_fingerprints.get(model_path)
+            if fingerprint is None:
+                digest = hashlib.sha256()
+                try:
+                    with open(model_path, 'rb') as f:
+                        for block in iter(lambda: f.read(1 << 20), b''):
+                            digest.update(block)
+                except OSError:
+                    digest.update(model_path.encode('utf-8'))
+                fingerprint = _model_fingerprints[model_path] = digest.hexdigest()
+    return fingerprint
+
+
+class PhonemeCache:
+    """
+    Bounded LRU of sentence -> phoneme ids, optionally backed by a SQLite file.
+    New entries reach SQLite in batches from a background writer, so put() never
+    waits on a disk commit.
+    """
+
+    FLUSH_BATCH = 64
+    FLUSH_INTERVAL_SECONDS = 2.0
+
+    def __init__(self, max_entries, db_path=''):
+        self.max_entries = max(0, max_entries)
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_wanted = threading.Event()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = None
+        self._writer_db = None
+        self._db_path = db_path
+        self._readers = threading.local()
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                # WAL lets lookups read while the writer commits a batch.
+                self._db.execute('PRAGMA journal_mode=WAL')
+                self._db.execute(
+                    'CREATE TABLE IF NOT EXISTS phoneme_cache (key TEXT PRIMARY KEY, ids TEXT NOT NULL)'
+                )
+                self._db.commit()
+                self._writer_db = sqlite3.connect(db_path, check_same_thread=False)
+            except sqlite3.Error as e:
+                print(f"WARNING: Phoneme cache DB disabled ({db_path}): {e}", file=sys.stderr)
+                self._db = None
+                self._writer_db = None
+        if self._writer_db is not None:
+            threading.Thread(target=self._writer, name="phoneme-cache-writer", daemon=True).start()
+            atexit.register(self.flush)
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            if self._db is None:
+                self.misses += 1
+                return None
+            value = self._pending.get(key)
+
+        if value is None:
+            # Disk read without the lock, so other lookups are not serialized behind it.
+            try:
+                row = self._read(key)
+            except sqlite3.Error as e:
+                print(f"Phoneme cache read failed: {e}", file=sys.stderr)
+                row = None
+            if row is not None:
+                value = json.loads(row[0])
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self._remember(key, value)
+            self.disk_hits += 1
+            return value
+
+    def _read(self, key):
+        # One SQLite connection per thread: a shared one would serialize reads again.
+        db = getattr(self._readers, 'db', None)
+        if db is None:
+            db = self._readers.db = sqlite3.connect(self._db_path)
+        return db.execute('SELECT ids FROM phoneme_cache WHERE key = ?', (key,)).fetchone()
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._pending[key] = value
+                if len(self._pending) >= self.FLUSH_BATCH:
+                    self._flush_wanted.set()
+
+    def _writer(self):
+        while True:
+            self._flush_wanted.wait(self.FLUSH_INTERVAL_SECONDS)
+            self._flush_wanted.clear()
+            self.flush()
+
+    def flush(self):
+        """Write pending entries to SQLite in one transaction."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            try:
+                self._writer_db.executemany(
+                    'INSERT OR REPLACE INTO phoneme_cache (key, ids) VALUES (?, ?)',
+                    [(key, json.dumps(value, separators=(',', ':'))) for key, value in batch.items()],
+                )
+                self._writer_db.commit()
+            except sqlite3.Error as e:
+                print(f"Phoneme cache write failed ({len(batch)} entries): {e}", file=sys.stderr)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'disk': self._db is not None,
+            }
+
+
+_phoneme_cache = PhonemeCache(PHONEME_CACHE_SIZE, PHONEME_CACHE_DB)
+
+
+class OnnxSynthesisEngine:
+    """
+    In-process Piper voice: espeak phonemization plus VITS inference through onnxruntime.
+    Sentences that share the same prosody are batched into one inference call. Piper voice
+    exports do not report per-row audio lengths, so without that output only sentences of
+    equal phoneme length share a batch: no row is padded, and a chunk's audio never depends
+    on which other chunks it was batched with.
+    """
 
-def generate_wav_chunk(text, length_scale=1.0, noise_scale=0.667, noise_w=0.8):
-    """Generate WAV audio for a single text chunk using Piper."""
+    def __init__(self, model_path, config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            self.config = json.load(f)
+        self.sample_rate = int(self.config.get('audio', {}).get('sample_rate', 22050))
+        self.espeak_voice = self.config.get('espeak', {}).get('voice', 'de')
+        self.num_speakers = int(self.config.get('num_speakers', 1))
+        self.phoneme_id_map = self.config['phoneme_id_map']
+        self.pad_id = self.phoneme_id_map.get('_', [0])[0]
+        # Replacing the model or its phoneme map must not reuse persisted phoneme ids.
+        self.cache_prefix = f"{_model_fingerprint(model_path)}|{_model_fingerprint(config_path)}|"
+
+        options = ort.SessionOptions()
+        if ONNX_INTRA_OP_THREADS > 0:
+            options.intra_op_num_threads = ONNX_INTRA_OP_THREADS
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=['CPUExecutionProvider'],
+        )
+        # Some exports return per-row sample counts as a second output; then rows may be padded.
+        self.has_output_lengths = len(self.session.get_outputs()) > 1
+        self.sentence_silence = np.zeros(
+            max(0, int(ONNX_SENTENCE_SILENCE_SECONDS * self.sample_rate)), dtype=np.int16
+        )
+
+    def phoneme_ids(self, text):
+        """Phoneme-id lists for every sentence of text; repeated sentences come from the cache."""
+        sentences = []
+        for sentence in _split_sentences_preserve_quotes(text):
+            normalized = ' '.join(sentence.split())
+            if not normalized:
+                continue
+            key = self.cache_prefix + normalized
+            ids = _phoneme_cache.get(key)
+            if ids is None:
+                ids = self._phonemize(normalized)
+                _phoneme_cache.put(key, ids)
+            sentences.extend(ids)
+        return sentences
+
+    def _phonemize(self, text):
+        """Phonemize text and map it to one phoneme-id list per sentence (same layout as Piper)."""
+        id_map = self.phoneme_id_map
+        sentences = []
+        for phonemes in phonemize_espeak(text, self.espeak_voice):
+            ids = list(id_map['^'])
+            for phoneme in phonemes:
+                if phoneme not in id_map:
+                    continue
+                ids.extend(id_map[phoneme])
+                ids.extend(id_map['_'])
+            ids.extend(id_map['$'])
+            sentences.append(ids)
+        return sentences
+
+    def _infer(self, id_lists, length_scale, noise_scale, noise_w, speaker_id=None):
+        lengths = [len(ids) for ids in id_lists]
+        max_len = max(lengths)
+        batch = np.full((len(id_lists), max_len), self.pad_id, dtype=np.int64)
+        for row, ids in enumerate(id_lists):
+            batch[row, :len(ids)] = ids
+
+        inputs = {
+            'input': batch,
+            'input_lengths': np.array(lengths, dtype=np.int64),
+            'scales': np.array([noise_scale, length_scale, noise_w], dtype=np.float32),
+        }
+        if self.num_speakers > 1:
+            inputs['sid'] = np.full(len(id_lists), speaker_id or 0, dtype=np.int64)
+
+        outputs = self.session.run(None, inputs)
+        audio = outputs[0].reshape(len(id_lists), -1)
+        if self.has_output_lengths:
+            sample_counts = np.asarray(outputs[1]).reshape(-1)
+        elif min(lengths) != max_len:
+            raise ValueError("padded batch needs a model with per-row output lengths")
+
+        results = []
+        for row in range(len(id_lists)):
+            samples = audio[row]
+            if self.has_output_lengths:
+                samples = samples[:int(sample_counts[row])]
+            # Same per-utterance peak scaling Piper applies before writing int16.
+            scale = 32767.0 / max(0.01, float(np.max(np.abs(samples))) if samples.size else 0.01)
+            results.append(np.clip(samples * scale, -32767.0, 32767.0).astype(np.int16))
+        return results
+
+    def synthesize_many(self, chunks, chunk_params, speaker_id=None):
+        """Synthesize chunks to int16 arrays, batching sentences with identical prosody."""
+        sentence_audio = {}
+        groups = {}
+        chunk_sentences = []
+        for chunk_index, chunk in enumerate(chunks):
+            params = tuple(round(float(v), 3) for v in chunk_params[chunk_index])
+            ids_per_sentence = self.phoneme_ids(chunk)
+            keys = []
+            for sentence_index, ids in enumerate(ids_per_sentence):
+                key = (chunk_index, sentence_index)
+                groups.setdefault(params, []).append((key, ids))
+                keys.append(key)
+            chunk_sentences.append(keys)
+
+        batch_size = max(1, ONNX_BATCH_SIZE)
+        for params, entries in groups.items():
+            # Similar lengths in one batch keep padding (and wasted compute) small.
+            entries.sort(key=lambda entry: len(entry[1]))
+            length_scale, noise_scale, noise_w = params
+            for batch in self._batches(entries, batch_size):
+                outputs = self._infer([ids for _key, ids in batch], length_scale, noise_scale, noise_w, speaker_id)
+                for (key, _ids), samples in zip(batch, outputs):
+                    sentence_audio[key] = samples
+
+        results = []
+        for keys in chunk_sentences:
+            parts = []
+            for key in keys:
+                parts.append(sentence_audio[key])
+                parts.append(self.sentence_silence)
+            results.append(np.concatenate(parts) if parts else np.zeros(0, dtype=np.int16))
+        return results
+
+    def _batches(self, entries, batch_size):
+        """Consecutive batches of length-sorted entries; same-length only unless rows can be trimmed exactly."""
+        batch = []
+        for entry in entries:
+            if batch and (len(batch) >= batch_size or
+                          (not self.has_output_lengths and len(entry[1]) != len(batch[0][1]))):
+                yield batch
+                batch = []
+            batch.append(entry)
+        if batch:
+            yield batch
+
+
+_onnx_engine = None
+if TTS_ENGINE == 'onnx':
+    if ort is None or phonemize_espeak is None:
+        print("WARNING: TTS_ENGINE=onnx requires onnxruntime and piper-phonemize (requirements-onnx.txt); using piper", file=sys.stderr)
+    else:
+        try:
+            _onnx_engine = OnnxSynthesisEngine(MODEL_PATH, MODEL_CONFIG_PATH)
+            print(f"ONNX engine loaded (sample_rate={_onnx_engine.sample_rate})", file=sys.stderr)
+        except Exception as e:
+            print(f"WARNING: ONNX engine failed to load, using piper: {e}", file=sys.stderr)
+
+def _output_sample_rate():
+    """Sample rate of the audio the active engine produces."""
+    return _onnx_engine.sample_rate if _onnx_engine is not None else MODEL_SAMPLE_RATE
+
+def _read_speaker_id_map(config_path):
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return {str(name): int(sid) for name, sid in json.load(f).get('speaker_id_map', {}).items()}
+    except Exception:
+        return {}
+
+def _parse_emotional_speakers(raw, speaker_id_map):
+    """Parse "emotion:speaker,..." into { emotion: speaker_id } for speakers the model knows."""
+    speakers = {}
+    for entry in raw.split(','):
+        if ':' not in entry:
+            continue
+        emotion, speaker = (part.strip() for part in entry.split(':', 1))
+        if speaker in speaker_id_map:
+            speakers[emotion.lower()] = speaker_id_map[speaker]
+        else:
+            print(f"WARNING: emotional model has no speaker '{speaker}' (for {emotion})", file=sys.stderr)
+    return speakers
+
+# emotion -> speaker id of the emotional model; empty when that voice is unavailable.
+_emotion_speakers = {}
+_emotional_onnx_engine = None
+_emotional_pool = None
+if ENABLE_EMOTIONAL_VOICE and os.path.exists(EMOTIONAL_MODEL_PATH):
+    emotional_rate = _read_model_sample_rate(EMOTIONAL_MODEL_CONFIG_PATH)
+    if emotional_rate != _output_sample_rate():
+        print(
+            f"WARNING: emotional voice disabled: sample rate {emotional_rate} != narrator {_output_sample_rate()}",
+            file=sys.stderr,
+        )
+    else:
+        speakers = _parse_emotional_speakers(
+            EMOTIONAL_SPEAKERS_RAW, _read_speaker_id_map(EMOTIONAL_MODEL_CONFIG_PATH)
+        )
+        if speakers and _onnx_engine is not None:
+            try:
+                _emotional_onnx_engine = OnnxSynthesisEngine(EMOTIONAL_MODEL_PATH, EMOTIONAL_MODEL_CONFIG_PATH)
+            except Exception as e:
+                print(f"WARNING: emotional ONNX engine failed to load: {e}", file=sys.stderr)
+                speakers = {}
+        elif speakers and PIPER_WORKER_POOL:
+            _emotional_pool = PiperWorkerPool(
+                EMOTIONAL_MAX_PARALLEL, PIPER_WORKER_MAX_JOBS, EMOTIONAL_MODEL_PATH, label='emotional-'
+            )
+            atexit.register(_emotional_pool.shutdown)
+        _emotion_speakers = speakers
+        if speakers:
+            print(f"Emotional voice enabled: {speakers} (max_parallel={EMOTIONAL_MAX_PARALLEL})", file=sys.stderr)
+
+def _warm_piper_pools():
+    for pool in (_piper_pool, _emotional_pool):
+        if pool is not None:
+            pool.warm()
+
+# Both voices stay resident: start their Piper processes now instead of on the first chunk.
+if _onnx_engine is None:
+    threading.Thread(target=_warm_piper_pools, name="piper-warm", daemon=True).start()
+
+# A balanced quoted span ("...", „...“ or »...«). A stray quote left at a chunk edge by the
+# chunker is narration, not dialogue.
+_QUOTED_SPAN_RE = re.compile(r'"([^"]+)"|\u201e([^\u201c\u201d"]+)[\u201c\u201d]|\u00bb([^\u00ab]+)\u00ab')
+
+def _quoted_speech(chunk):
+    """Text inside the chunk's balanced quotes, joined with spaces; empty if there is none."""
+    return ' '.join(
+        span.strip() for match in _QUOTED_SPAN_RE.finditer(chunk) for span in match.groups() if span
+    ).strip()
+
+def _chunk_voice(chunk):
+    """Emotional-model speaker id for a dialogue chunk whose quoted speech has a mapped emotion; None means narrator."""
+    if not _emotion_speakers:
+        return None
+    speech = _quoted_speech(chunk)
+    if not speech:
+        return None
+    return _emotion_speakers.get(_emotion_from_features(_chunk_features(speech)))
+
+def _generate_pcm_chunk_subprocess(text, length_scale, noise_scale, noise_w, model_path=MODEL_PATH, speaker_id=None):
+    """Generate raw PCM for a single text chunk with a one-shot Piper process."""
     cmd = [
         PIPER_BINARY,
-        "--model", MODEL_PATH,
-        "--output_file", "-",
+        "--model", model_path,
+        "--output_raw",
         "--length_scale", str(length_scale),
         "--noise_scale", str(noise_scale),
         "--noise_w", str(noise_w)
     ]
+    if speaker_id is not None:
+        cmd += ["--speaker", str(speaker_id)]
 
     proc = subprocess.Popen(
         cmd,
@@ -804,7 +1983,11 @@ def generate_wav_chunk(text, length_scale=1.0, noise_scale=0.667, noise_w=0.8):
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE
     )
-    stdout, stderr = proc.communicate(input=text.encode('utf-8'))
+    _metrics.inc('piper_oneshot_running')
+    try:
+        stdout, stderr = proc.communicate(input=text.encode('utf-8'))
+    finally:
+        _metrics.inc('piper_oneshot_running', -1)
 
     if proc.returncode != 0:
         error_msg = stderr.decode('utf-8')
@@ -812,122 +1995,536 @@ def generate_wav_chunk(text, length_scale=1.0, noise_scale=0.667, noise_w=0.8):
 
     return stdout
 
-def concatenate_wav(wav_chunks):
-    """Concatenate multiple WAV byte arrays into a single WAV file."""
-    if len(wav_chunks) == 1:
-        return wav_chunks[0]
 
-    all_audio_data = []
-    sample_rate = None
-    num_channels = None
-    bits_per_sample = None
+class ChunkAudioCache:
+    """
+    Chunk PCM keyed by sha256(chunk text, rounded prosody, engine, model hash).
+    Memory tier is an LRU bounded by bytes; the optional disk tier evicts least
+    recently used files once it grows past its byte budget.
+    """
 
-    for wav_bytes in wav_chunks:
-        if len(wav_bytes) < 44:
-            continue
+    def __init__(self, memory_bytes, disk_dir='', disk_bytes=0):
+        self.memory_limit = max(0, memory_bytes)
+        self.disk_limit = max(0, disk_bytes)
+        self.disk_dir = disk_dir if disk_dir and self.disk_limit > 0 else ''
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_writing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        if self.disk_dir:
+            self._load_disk_index()
+
+    @property
+    def enabled(self):
+        return self.memory_limit > 0 or bool(self.disk_dir)
+
+    def _load_disk_index(self):
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.disk_dir):
+                path = os.path.join(self.disk_dir, name)
+                if name.endswith('.tmp'):
+                    # Left behind by a write that was interrupted before its rename.
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                if not name.endswith('.pcm'):
+                    continue
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+            for _mtime, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+        except OSError as e:
+            print(f"WARNING: Chunk cache disk tier disabled ({self.disk_dir}): {e}", file=sys.stderr)
+            self.disk_dir = ''
+            return
+        # The budget may have shrunk since the files were written.
+        self._remove_disk_files(self._evict_disk())
+
+    def _evict_disk(self):
+        """Pop least recently used disk entries past the byte budget and return their keys."""
+        evicted = []
+        while self._disk_bytes > self.disk_limit and len(self._disk) > 1:
+            old_key, old_size = self._disk.popitem(last=False)
+            self._disk_bytes -= old_size
+            evicted.append(old_key)
+        return evicted
+
+    def _remove_disk_files(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def key(self, text, params):
+        length_scale, noise_scale, noise_w = params
+        engine = 'onnx' if _onnx_engine is not None else 'piper'
+        speaker_id = _chunk_voice(text)
+        if speaker_id is None:
+            raw = f"{_model_fingerprint()}|{engine}|{length_scale:.3f}|{noise_scale:.3f}|{noise_w:.3f}|{text}"
+        else:
+            raw = (
+                f"{_model_fingerprint(EMOTIONAL_MODEL_PATH)}|{engine}|speaker={speaker_id}|"
+                f"{length_scale:.3f}|{noise_scale:.3f}|{noise_w:.3f}|{text}"
+            )
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + '.pcm')
+
+    def _remember(self, key, pcm):
+        if len(pcm) > self.memory_limit:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = pcm
+        self._memory_bytes += len(pcm)
+        while self._memory_bytes > self.memory_limit:
+            _old_key, old_pcm = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_pcm)
+
+    def get(self, text, params):
+        if not self.enabled:
+            return None
+        key = self.key(text, params)
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.bytes_saved += len(pcm)
+                return pcm
+            on_disk = key in self._disk
+            if on_disk:
+                self._disk.move_to_end(key)
+
+        if on_disk:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    pcm = f.read()
+                os.utime(self._disk_path(key))
+            except OSError:
+                pcm = None
+            if pcm is not None:
+                with self._lock:
+                    self._remember(key, pcm)
+                    self.disk_hits += 1
+                    self.bytes_saved += len(pcm)
+                return pcm
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text, params, pcm):
+        if not self.enabled or not pcm:
+            return
+        key = self.key(text, params)
+        with self._lock:
+            self._remember(key, pcm)
+            # Concurrent puts of the same chunk: only the first writes and counts it.
+            if not self.disk_dir or key in self._disk or key in self._disk_writing:
+                return
+            self._disk_writing.add(key)
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(pcm)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Chunk cache write failed: {e}", file=sys.stderr)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            with self._lock:
+                self._disk_writing.discard(key)
+            return
+
+        with self._lock:
+            self._disk_writing.discard(key)
+            self._disk_bytes += len(pcm) - self._disk.pop(key, 0)
+            self._disk[key] = len(pcm)
+            evicted = self._evict_disk()
+        self._remove_disk_files(evicted)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_bytes,
+            }
+
+
+_chunk_cache = ChunkAudioCache(
+    CHUNK_CACHE_MEMORY_MB * 1024 * 1024,
+    CHUNK_CACHE_DIR,
+    CHUNK_CACHE_DISK_MB * 1024 * 1024,
+)
 
-        # Parse WAV header (44 bytes for standard PCM WAV)
-        # Bytes 22-23: num channels
-        # Bytes 24-27: sample rate
-        # Bytes 34-35: bits per sample
-        # Bytes 36-39: "data"
-        # Bytes 40-43: data size
-        channels = struct.unpack_from('<H', wav_bytes, 22)[0]
-        rate = struct.unpack_from('<I', wav_bytes, 24)[0]
-        bps = struct.unpack_from('<H', wav_bytes, 34)[0]
-
-        if sample_rate is None:
-            sample_rate = rate
-            num_channels = channels
-            bits_per_sample = bps
-
-        # Find the data chunk - search for "data" marker
-        data_offset = wav_bytes.find(b'data')
-        if data_offset == -1:
-            continue
-        data_size = struct.unpack_from('<I', wav_bytes, data_offset + 4)[0]
-        audio_start = data_offset + 8
-        all_audio_data.append(wav_bytes[audio_start:audio_start + data_size])
 
-    if not all_audio_data:
-        return wav_chunks[0] if wav_chunks else b''
+def _synthesize_pcm_chunk(text, length_scale, noise_scale, noise_w):
+    """Synthesize one chunk with the active engine and voice, bypassing the chunk cache."""
+    speaker_id = _chunk_voice(text)
+    start = time.perf_counter()
+    if speaker_id is not None:
+        params = (length_scale, noise_scale, noise_w)
+        if _emotional_onnx_engine is not None:
+            pcm = _emotional_onnx_engine.synthesize_many([text], [params], speaker_id)[0].tobytes()
+        elif _emotional_pool is not None:
+            pcm = _emotional_pool.synthesize(text, length_scale, noise_scale, noise_w, speaker_id)
+        else:
+            pcm = _generate_pcm_chunk_subprocess(text, length_scale, noise_scale, noise_w, EMOTIONAL_MODEL_PATH, speaker_id)
+    elif _onnx_engine is not None:
+        pcm = _onnx_engine.synthesize_many([text], [(length_scale, noise_scale, noise_w)])[0].tobytes()
+    elif _piper_pool is not None:
+        pcm = _piper_pool.synthesize(text, length_scale, noise_scale, noise_w)
+    else:
+        pcm = _generate_pcm_chunk_subprocess(text, length_scale, noise_scale, noise_w)
+    seconds = time.perf_counter() - start
+    _metrics.observe('chunk_synth', seconds)
+    _chunk_cost_model.observe(len(text), length_scale, seconds)
+    return pcm
+
+def _synthesize_batch(engine, texts, chunk_params, speaker_id=None):
+    """OnnxSynthesisEngine.synthesize_many, timed as one batch_synth sample."""
+    with _timed('batch_synth'):
+        return engine.synthesize_many(texts, chunk_params, speaker_id)
+
+def generate_pcm_chunk(text, length_scale=1.0, noise_scale=0.667, noise_w=0.8):
+    """Generate raw int16 PCM for a single text chunk, served from the chunk cache when possible."""
+    params = (length_scale, noise_scale, noise_w)
+    pcm = _chunk_cache.get(text, params)
+    if pcm is None:
+        pcm = _synthesize_pcm_chunk(text, length_scale, noise_scale, noise_w)
+        _chunk_cache.put(text, params, pcm)
+    return pcm
+
+# Priority classes for chunk synthesis, highest first.
+PRIORITY_SYNC = 'sync'
+PRIORITY_ASYNC = 'async'
+PRIORITY_BATCH = 'batch'
+PRIORITY_CLASSES = (PRIORITY_SYNC, PRIORITY_ASYNC, PRIORITY_BATCH)
+
+class ChunkScheduler:
+    """
+    Process-wide executor for chunk synthesis. A fixed set of threads is the hard cap on
+    concurrent synthesis; higher priority classes are always served first, and the jobs
+    inside a class take turns one chunk at a time, so a long chapter cannot hold every
+    slot while a short request waits.
+    """
+
+    def __init__(self, concurrency, classes=PRIORITY_CLASSES, name="tts-synth"):
+        self.concurrency = max(1, concurrency)
+        self._classes = classes
+        self._cond = threading.Condition()
+        self._job_ids = itertools.count(1)
+        self._ready = {name: deque() for name in classes}
+        self._tasks = {}
+        self._queued = {name: 0 for name in classes}
+        self._running = 0
+        for i in range(self.concurrency):
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True).start()
+
+    def new_job(self):
+        """Token grouping one request's chunks for round-robin."""
+        return next(self._job_ids)
+
+    def submit(self, priority, job, fn, *args):
+        future = Future()
+        key = (priority, job)
+        with self._cond:
+            tasks = self._tasks.get(key)
+            if tasks is None:
+                tasks = self._tasks[key] = deque()
+                self._ready[priority].append(key)
+            tasks.append((future, fn, args, time.perf_counter()))
+            self._queued[priority] += 1
+            self._cond.notify()
+        return future
+
+    def _next_task(self):
+        for name in self._classes:
+            ready = self._ready[name]
+            if not ready:
+                continue
+            key = ready.popleft()
+            tasks = self._tasks[key]
+            task = tasks.popleft()
+            self._queued[name] -= 1
+            if tasks:
+                ready.append(key)
+            else:
+                del self._tasks[key]
+            return task
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                task = self._next_task()
+                while task is None:
+                    self._cond.wait()
+                    task = self._next_task()
+                self._running += 1
+            future, fn, args, queued_at = task
+            _metrics.observe('queue_wait', time.perf_counter() - queued_at)
+            try:
+                # Cancelled while queued (e.g. a stream client went away): skip it.
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = fn(*args)
+                    except BaseException as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            finally:
+                with self._cond:
+                    self._running -= 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                'concurrency': self.concurrency,
+                'running': self._running,
+                'queued': dict(self._queued),
+                'jobs': {name: len(self._ready[name]) for name in self._classes},
+            }
+
+class ChunkCostModel:
+    """
+    Online least-squares estimate of a chunk's synthesis seconds from its character count and
+    length_scale: cost = a + b * chars + c * chars * length_scale (text encoding grows with the
+    characters, decoding with the audio length). Observations decay so the fit tracks the
+    host's current speed. Until enough chunks were timed, chars * length_scale is the estimate,
+    which already ranks chunks sensibly.
+    """
+
+    MIN_OBSERVATIONS = 8
+
+    def __init__(self, decay=0.995):
+        self.decay = decay
+        self._lock = threading.Lock()
+        self._xtx = np.zeros((3, 3))
+        self._xty = np.zeros(3)
+        self._observations = 0
+        self._coefficients = None
+
+    @staticmethod
+    def _features(chars, length_scale):
+        return np.array((1.0, chars, chars * length_scale))
+
+    def observe(self, chars, length_scale, seconds):
+        x = self._features(chars, length_scale)
+        with self._lock:
+            self._xtx *= self.decay
+            self._xty *= self.decay
+            self._xtx += np.outer(x, x)
+            self._xty += x * seconds
+            self._observations += 1
+            if self._observations < self.MIN_OBSERVATIONS:
+                return
+            # A tiny ridge keeps the solve stable while all chunks still look alike.
+            ridge = 1e-9 * np.trace(self._xtx) * np.eye(3)
+            try:
+                coefficients = np.linalg.solve(self._xtx + ridge, self._xty)
+            except np.linalg.LinAlgError:
+                return
+            # Costs must grow with length; otherwise keep the previous fit.
+            if coefficients[1] + coefficients[2] > 0 and coefficients[2] >= 0:
+                self._coefficients = coefficients
+
+    def predict(self, chars, length_scale):
+        coefficients = self._coefficients
+        if coefficients is None:
+            return chars * length_scale
+        return float(coefficients @ self._features(chars, length_scale))
+
+    def stats(self):
+        coefficients = self._coefficients
+        return {
+            'observations': self._observations,
+            'coefficients': [round(float(c), 9) for c in coefficients] if coefficients is not None else None,
+        }
 
-    # Combine all audio data
-    combined_data = b''.join(all_audio_data)
-    total_data_size = len(combined_data)
+_chunk_cost_model = ChunkCostModel()
 
-    # Build new WAV file
-    byte_rate = sample_rate * num_channels * (bits_per_sample // 8)
-    block_align = num_channels * (bits_per_sample // 8)
+def _longest_first(indices, chunks, chunk_params):
+    """indices reordered by predicted synthesis cost, most expensive first (stable for ties)."""
+    if not ENABLE_LONGEST_CHUNK_FIRST:
+        return indices
+    return sorted(indices, key=lambda idx: -_chunk_cost_model.predict(len(chunks[idx]), chunk_params[idx][0]))
 
-    header = struct.pack('<4sI4s', b'RIFF', 36 + total_data_size, b'WAVE')
-    fmt_chunk = struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, num_channels,
-                           sample_rate, byte_rate, block_align, bits_per_sample)
-    data_header = struct.pack('<4sI', b'data', total_data_size)
+_scheduler = ChunkScheduler(MAX_PARALLEL_PIPER)
+# Emotional-voice chunks get their own slots, so dialogue never takes narration capacity.
+_emotional_scheduler = ChunkScheduler(EMOTIONAL_MAX_PARALLEL, name="tts-emotional") if _emotion_speakers else None
 
-    return header + fmt_chunk + data_header + combined_data
+def _scheduler_for(chunk):
+    return _emotional_scheduler if _chunk_voice(chunk) is not None else _scheduler
 
-def _postprocess_output_wav(wav_bytes):
+def _assemble_wav(pcm_chunks, chunks, sample_rate=MODEL_SAMPLE_RATE, pause_scale=1.0):
+    """
+    Write header, chunk PCM and gaps into one buffer sized up front, normalize it in place
+    and return it as a BytesIO ready for send_file. Entries of pcm_chunks are released as
+    they are copied so peak memory stays close to the output size.
+    """
+    start = time.perf_counter()
+    gap_sizes = [
+        len(_get_silence_between(chunks[i], chunks[i + 1], sample_rate, pause_scale))
+        for i in range(len(pcm_chunks) - 1)
+    ]
+    data_size = sum(len(pcm) for pcm in pcm_chunks) + sum(gap_sizes)
+    _metrics.inc('audio_seconds', data_size / 2 / sample_rate)
+
+    out = io.BytesIO()
+    # Growing a fresh BytesIO past its end allocates exactly once and zero-fills, so gaps need no writes.
+    out.seek(44 + data_size - 1)
+    out.write(b'\x00')
+
+    view = out.getbuffer()
+    try:
+        view[:44] = _wav_header(data_size, sample_rate)
+        position = 44
+        for i in range(len(pcm_chunks)):
+            pcm = pcm_chunks[i]
+            view[position:position + len(pcm)] = pcm
+            position += len(pcm)
+            pcm_chunks[i] = None
+            if i < len(gap_sizes):
+                position += gap_sizes[i]
+        _metrics.observe('concat', time.perf_counter() - start)
+        with _timed('normalize'):
+            _postprocess_output_pcm(view[44:], sample_rate)
+    finally:
+        view.release()
+
+    out.seek(0)
+    return out
+
+# Samples per vectorized normalization step; bounds the float64 scratch buffer to ~8 MB.
+_NORMALIZE_BLOCK_SAMPLES = 1 << 20
+
+def _scale_pcm_block(samples, gain, ramp=None):
+    """Scale int16 samples exactly like int(value * gain), optional fade ramp, then clip."""
+    block = samples.astype(np.float64)
+    block *= gain
+    np.trunc(block, out=block)
+    if ramp is not None:
+        block *= ramp
+        np.trunc(block, out=block)
+    np.clip(block, -32768, 32767, out=block)
+    return block.astype(np.int16)
+
+def _postprocess_output_pcm(pcm_buffer, sample_rate=MODEL_SAMPLE_RATE):
+    """Peak-normalize and edge-fade a writable int16 PCM buffer in place."""
     if not ENABLE_OUTPUT_NORMALIZATION:
-        return wav_bytes
-    if len(wav_bytes) < 44:
-        return wav_bytes
-
-    data_offset = wav_bytes.find(b'data')
-    if data_offset == -1 or data_offset + 8 > len(wav_bytes):
-        return wav_bytes
-
-    data_size = struct.unpack_from('<I', wav_bytes, data_offset + 4)[0]
-    audio_start = data_offset + 8
-    audio_end = audio_start + data_size
-    if audio_end > len(wav_bytes):
-        return wav_bytes
-
-    pcm = bytearray(wav_bytes[audio_start:audio_end])
-    sample_count = len(pcm) // 2
-    if sample_count <= 0:
-        return wav_bytes
+        return
 
-    max_abs = 0
-    for i in range(0, len(pcm), 2):
-        value = struct.unpack_from('<h', pcm, i)[0]
-        abs_value = abs(value)
-        if abs_value > max_abs:
-            max_abs = abs_value
+    sample_count = len(pcm_buffer) // 2
+    if sample_count <= 0:
+        return
 
+    samples = np.frombuffer(pcm_buffer, dtype='<i2', count=sample_count)
+    max_abs = max(int(samples.max()), -int(samples.min()))
     if max_abs == 0:
-        return wav_bytes
+        return
 
     target_peak = _clamp(OUTPUT_TARGET_PEAK, 0.10, 0.99)
     target_amplitude = int(32767 * target_peak)
     gain = target_amplitude / max_abs
     gain = _clamp(gain, 0.60, 2.50)
 
-    sample_rate = 22050
-    if len(wav_bytes) >= 28:
-        sample_rate = struct.unpack_from('<I', wav_bytes, 24)[0]
-
     fade_samples = int(max(0, OUTPUT_EDGE_FADE_MS) * sample_rate / 1000)
     fade_samples = min(fade_samples, sample_count // 2)
 
-    for sample_index in range(sample_count):
-        raw_value = struct.unpack_from('<h', pcm, sample_index * 2)[0]
-        scaled = int(raw_value * gain)
+    # Every block is copied to float64 before it is written back, so in-place is safe.
+    body_start, body_end = 0, sample_count
+    if fade_samples > 0:
+        ramp = np.arange(fade_samples, dtype=np.float64) / fade_samples
+        samples[:fade_samples] = _scale_pcm_block(samples[:fade_samples], gain, ramp)
+        samples[-fade_samples:] = _scale_pcm_block(samples[-fade_samples:], gain, ramp[::-1])
+        body_start, body_end = fade_samples, sample_count - fade_samples
 
-        if fade_samples > 0:
-            if sample_index < fade_samples:
-                scaled = int(scaled * (sample_index / fade_samples))
-            elif sample_index >= (sample_count - fade_samples):
-                tail_pos = sample_count - sample_index - 1
-                scaled = int(scaled * (tail_pos / fade_samples))
+    for start in range(body_start, body_end, _NORMALIZE_BLOCK_SAMPLES):
+        end = min(start + _NORMALIZE_BLOCK_SAMPLES, body_end)
+        samples[start:end] = _scale_pcm_block(samples[start:end], gain)
 
-        scaled = max(-32768, min(32767, scaled))
-        struct.pack_into('<h', pcm, sample_index * 2, scaled)
-
-    return wav_bytes[:audio_start] + bytes(pcm) + wav_bytes[audio_end:]
+def _scale_stream_chunk(pcm, sample_rate, gain=1.0, fade_in=False, fade_out=False):
+    """
+    Scale one streamed chunk and apply the output edge fades with the same arithmetic as
+    _postprocess_output_pcm, so equal gains give byte-identical audio.
+    """
+    if gain == 1.0 and not (fade_in or fade_out):
+        return pcm
+    samples = np.frombuffer(pcm, dtype='<i2', count=len(pcm) // 2).copy()
+    fade_samples = int(max(0, OUTPUT_EDGE_FADE_MS) * sample_rate / 1000)
+    fade_samples = min(fade_samples, len(samples) // 2)
+    body_start, body_end = 0, len(samples)
+    if fade_samples > 0 and (fade_in or fade_out):
+        ramp = np.arange(fade_samples, dtype=np.float64) / fade_samples
+        if fade_in:
+            samples[:fade_samples] = _scale_pcm_block(samples[:fade_samples], gain, ramp)
+            body_start = fade_samples
+        if fade_out:
+            samples[-fade_samples:] = _scale_pcm_block(samples[-fade_samples:], gain, ramp[::-1])
+            body_end = len(samples) - fade_samples
+    if gain != 1.0:
+        for start in range(body_start, body_end, _NORMALIZE_BLOCK_SAMPLES):
+            end = min(start + _NORMALIZE_BLOCK_SAMPLES, body_end)
+            samples[start:end] = _scale_pcm_block(samples[start:end], gain)
+    return samples.tobytes() + pcm[len(samples) * 2:]
+
+class StreamNormalizer:
+    """
+    Chunk-by-chunk counterpart of _postprocess_output_pcm for progressive delivery.
+    Each chunk is scaled to the target peak relative to the loudest sample seen so far,
+    the chunk itself included (one chunk of look-ahead), so output never exceeds the
+    target. The gain therefore only moves down, and only between chunks, where the
+    silence gaps hide the step; once the loudest chunk has gone out it is exactly the
+    gain the whole-file path would have used.
+    """
 
-def _get_silence_between(chunk_a, chunk_b):
-    """Determine silence duration between two chunks based on content."""
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.peak = 0
+        self.gain = 1.0
+
+    def process(self, pcm, fade_in=False, fade_out=False):
+        if not ENABLE_OUTPUT_NORMALIZATION:
+            return pcm
+        if STREAM_NORMALIZATION != 'off':
+            samples = np.frombuffer(pcm, dtype='<i2', count=len(pcm) // 2)
+            if samples.size:
+                self.peak = max(self.peak, int(samples.max()), -int(samples.min()))
+            if self.peak:
+                target_amplitude = int(32767 * _clamp(OUTPUT_TARGET_PEAK, 0.10, 0.99))
+                self.gain = _clamp(target_amplitude / self.peak, 0.60, 2.50)
+        return _scale_stream_chunk(pcm, self.sample_rate, self.gain, fade_in, fade_out)
+
+def _get_silence_ms_between(chunk_a, chunk_b):
+    """Determine silence duration (ms) between two chunks based on content."""
     has_dialogue_a = '"' in chunk_a
     has_dialogue_b = '"' in chunk_b
 
@@ -937,28 +2534,33 @@ def _get_silence_between(chunk_a, chunk_b):
 
     # Scene/paragraph boundary: longer pause
     if tail.endswith('...'):
-        return generate_silence(SILENCE_SCENE_MS)
+        return SILENCE_SCENE_MS
 
     # Dialogue transition
     if has_dialogue_a != has_dialogue_b:
-        return generate_silence(SILENCE_DIALOGUE_MS)
+        return SILENCE_DIALOGUE_MS
 
     # Sentence punctuation
     if tail.endswith('!!') or tail.endswith('!'):
-        return generate_silence(SILENCE_EXCLAIM_MS)
+        return SILENCE_EXCLAIM_MS
     if tail.endswith('??') or tail.endswith('?'):
-        return generate_silence(SILENCE_QUESTION_MS)
+        return SILENCE_QUESTION_MS
     if tail.endswith('.'):
-        return generate_silence(SILENCE_PERIOD_MS)
+        return SILENCE_PERIOD_MS
     if tail.endswith(',') or tail.endswith(':') or tail.endswith(';'):
-        return generate_silence(SILENCE_COMMA_MS)
+        return SILENCE_COMMA_MS
 
     # Default fallback
-    return generate_silence(SILENCE_DEFAULT_MS)
+    return SILENCE_DEFAULT_MS
 
+def _get_silence_between(chunk_a, chunk_b, sample_rate=MODEL_SAMPLE_RATE, pause_scale=1.0):
+    """Precomputed silence PCM (read-only memoryview) between two chunks."""
+    return _get_silence_bank(sample_rate).get(_get_silence_ms_between(chunk_a, chunk_b), pause_scale)
 
-def _do_generate(text, length_scale, noise_scale, noise_w):
-    """Core generation logic — called synchronously or in a job thread."""
+def _prepare_chunks(text, length_scale, noise_scale, noise_w):
+    """Run the text front-end and return (chunks, smoothed per-chunk prosody)."""
+    start = time.perf_counter()
+    _metrics.inc('chars', len(text))
     text = preprocess_text(text)
     text = prepare_for_tts(text)
     text = _enhance_story_text_for_tts(text)
@@ -994,46 +2596,378 @@ def _do_generate(text, length_scale, noise_scale, noise_w):
         chunk_params.append((smoothed_length, smoothed_noise, smoothed_noise_w))
         prev_length, prev_noise, prev_noise_w = smoothed_length, smoothed_noise, smoothed_noise_w
 
-    wav_results = [None] * len(chunks)
-    workers = min(MAX_PARALLEL_PIPER, len(chunks))
+    _metrics.observe('text_prep', time.perf_counter() - start)
+    return chunks, chunk_params
 
-    if workers <= 1:
+def _do_generate(text, length_scale, noise_scale, noise_w, pause_scale=1.0, progress=None,
+                 priority=PRIORITY_SYNC):
+    """
+    Core generation logic — called synchronously or in a job thread.
+    Chunk synthesis runs on the shared scheduler in the given priority class, most
+    expensive chunks first (see ENABLE_LONGEST_CHUNK_FIRST); assembly is in text order.
+    progress(chunks_done, chunks_total, audio_bytes), if given, is called from this thread
+    once cached chunks are resolved and again after every synthesized chunk.
+    """
+    chunks, chunk_params = _prepare_chunks(text, length_scale, noise_scale, noise_w)
+
+    # Resolve cached chunks first so only misses reach the synthesis engine.
+    pcm_results = [None] * len(chunks)
+    pending = []
+    for idx in range(len(chunks)):
+        pcm_results[idx] = _chunk_cache.get(chunks[idx], chunk_params[idx])
+        if pcm_results[idx] is None:
+            pending.append(idx)
+    if len(pending) < len(chunks):
+        print(f"  Chunk cache: {len(chunks) - len(pending)}/{len(chunks)} hits", file=sys.stderr)
+
+    chunks_done = len(chunks) - len(pending)
+    audio_bytes = sum(len(pcm) for pcm in pcm_results if pcm is not None)
+
+    def chunk_finished(idx):
+        nonlocal chunks_done, audio_bytes
+        chunks_done += 1
+        audio_bytes += len(pcm_results[idx])
+        if progress is not None:
+            progress(chunks_done, len(chunks), audio_bytes)
+
+    if progress is not None:
+        progress(chunks_done, len(chunks), audio_bytes)
+
+    job = _scheduler.new_job()
+
+    if _onnx_engine is not None:
+        start = time.time()
+        voices = {}
+        for idx in pending:
+            voices.setdefault(_chunk_voice(chunks[idx]), []).append(idx)
+        # Windows of a few batches still group equal prosody but let progress advance.
+        window = max(1, ONNX_BATCH_SIZE) * 4
+        windows = []
+        for speaker_id, voice_pending in voices.items():
+            engine, scheduler = _onnx_engine, _scheduler
+            if speaker_id is not None:
+                engine, scheduler = _emotional_onnx_engine, _emotional_scheduler
+            for offset in range(0, len(voice_pending), window):
+                indices = voice_pending[offset:offset + window]
+                windows.append((indices, scheduler.submit(
+                    priority, job, _synthesize_batch, engine,
+                    [chunks[idx] for idx in indices], [chunk_params[idx] for idx in indices], speaker_id,
+                )))
+        try:
+            for indices, future in windows:
+                synthesized = future.result()
+                for idx, pcm in zip(indices, synthesized):
+                    pcm_results[idx] = pcm.tobytes()
+                    _chunk_cache.put(chunks[idx], chunk_params[idx], pcm_results[idx])
+                    chunk_finished(idx)
+        finally:
+            for _indices, future in windows:
+                future.cancel()
+        print(f"  ONNX synthesis: {len(pending)} chunks in {time.time() - start:.1f}s", file=sys.stderr)
+        return _assemble_wav(pcm_results, chunks, _onnx_engine.sample_rate, pause_scale)
+
+    def gen_chunk(idx):
+        cs = time.time()
+        chunk_length, chunk_noise, chunk_noise_w = chunk_params[idx]
+        if DEBUG_TTS_PROSODY:
+            print(
+                f"  Prosody chunk {idx+1}/{len(chunks)}: len_scale={chunk_length:.3f}, noise={chunk_noise:.3f}, noise_w={chunk_noise_w:.3f}",
+                file=sys.stderr,
+            )
+        data = _synthesize_pcm_chunk(chunks[idx], chunk_length, chunk_noise, chunk_noise_w)
+        _chunk_cache.put(chunks[idx], chunk_params[idx], data)
+        ct = time.time() - cs
+        print(f"  Chunk {idx+1}/{len(chunks)}: {len(chunks[idx])} chars -> {len(data)} bytes ({ct:.1f}s)", file=sys.stderr)
+        return idx, data
+
+    futures = [
+        _scheduler_for(chunks[i]).submit(priority, job, gen_chunk, i)
+        for i in _longest_first(pending, chunks, chunk_params)
+    ]
+    try:
+        for future in as_completed(futures):
+            idx, data = future.result()
+            pcm_results[idx] = data
+            chunk_finished(idx)
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return _assemble_wav(pcm_results, chunks, MODEL_SAMPLE_RATE, pause_scale)
+
+def _iter_pcm_in_order(chunks, chunk_params, priority=PRIORITY_SYNC):
+    """
+    Yield each chunk's PCM in text order as soon as it and all earlier chunks are ready.
+    Later chunks render in parallel on the shared scheduler, but never more than
+    STREAM_LOOKAHEAD_CHUNKS beyond its concurrency ahead of the consumer, so a slow
+    reader throttles synthesis.
+    """
+    window = _scheduler.concurrency + max(0, STREAM_LOOKAHEAD_CHUNKS)
+    job = _scheduler.new_job()
+    futures = deque()
+    submitted = 0
+    try:
         for idx in range(len(chunks)):
-            chunk_length, chunk_noise, chunk_noise_w = chunk_params[idx]
-            if DEBUG_TTS_PROSODY:
-                print(
-                    f"  Prosody chunk {idx+1}/{len(chunks)}: len_scale={chunk_length:.3f}, noise={chunk_noise:.3f}, noise_w={chunk_noise_w:.3f}",
-                    file=sys.stderr,
-                )
-            wav_results[idx] = generate_wav_chunk(chunks[idx], chunk_length, chunk_noise, chunk_noise_w)
-    else:
-        def gen_chunk(idx):
-            cs = time.time()
-            chunk_length, chunk_noise, chunk_noise_w = chunk_params[idx]
-            if DEBUG_TTS_PROSODY:
-                print(
-                    f"  Prosody chunk {idx+1}/{len(chunks)}: len_scale={chunk_length:.3f}, noise={chunk_noise:.3f}, noise_w={chunk_noise_w:.3f}",
-                    file=sys.stderr,
-                )
-            data = generate_wav_chunk(chunks[idx], chunk_length, chunk_noise, chunk_noise_w)
-            ct = time.time() - cs
-            print(f"  Chunk {idx+1}/{len(chunks)}: {len(chunks[idx])} chars -> {len(data)} bytes ({ct:.1f}s)", file=sys.stderr)
-            return idx, data
-
-        with ThreadPoolExecutor(max_workers=workers) as pool:
-            futures = [pool.submit(gen_chunk, i) for i in range(len(chunks))]
-            for future in as_completed(futures):
-                idx, data = future.result()
-                wav_results[idx] = data
-
-    wav_chunks = []
-    for i, wav_data in enumerate(wav_results):
-        wav_chunks.append(wav_data)
-        if i < len(wav_results) - 1:
-            silence = _get_silence_between(chunks[i], chunks[i + 1])
-            wav_chunks.append(silence)
-
-    return _postprocess_output_wav(concatenate_wav(wav_chunks))
+            while submitted < len(chunks) and submitted < idx + window:
+                chunk_length, chunk_noise, chunk_noise_w = chunk_params[submitted]
+                futures.append(_scheduler_for(chunks[submitted]).submit(
+                    priority, job, generate_pcm_chunk, chunks[submitted], chunk_length, chunk_noise, chunk_noise_w
+                ))
+                submitted += 1
+            yield futures.popleft().result()
+    finally:
+        # Client gone or failure: drop chunks that have not started yet.
+        for future in futures:
+            future.cancel()
+
+def _stream_pcm(chunks, chunk_params, sample_rate=MODEL_SAMPLE_RATE, pause_scale=1.0):
+    """Generate chunk PCM (bytes) and silence gaps (shared read-only memoryviews) in text order."""
+    last = len(chunks) - 1
+    normalizer = StreamNormalizer(sample_rate)
+    for idx, pcm in enumerate(_iter_pcm_in_order(chunks, chunk_params)):
+        gap = _get_silence_between(chunks[idx], chunks[idx + 1], sample_rate, pause_scale) if idx < last else b''
+        _metrics.inc('audio_seconds', (len(pcm) + len(gap)) / 2 / sample_rate)
+        yield normalizer.process(pcm, fade_in=idx == 0, fade_out=idx == last)
+        if gap:
+            yield gap
+
+def _stream_wav(chunks, chunk_params, sample_rate=MODEL_SAMPLE_RATE, pause_scale=1.0):
+    """Generate an open-ended WAV: header, then chunk PCM and silence gaps in order."""
+    yield _stream_wav_header(sample_rate)
+    # WSGI servers (gunicorn) only accept bytes; gaps become the bank's shared bytes, not copies.
+    bank = _get_silence_bank(sample_rate)
+    for piece in _stream_pcm(chunks, chunk_params, sample_rate, pause_scale):
+        yield bank.as_bytes(piece) if isinstance(piece, memoryview) else piece
+
+# ── Output encoding ───────────────────────────────────────────────────────────
+# output_format -> (mimetype, file extension, ffmpeg codec/container arguments)
+OUTPUT_FORMATS = {
+    'wav': ('audio/wav', 'wav', None),
+    'opus': ('audio/ogg', 'ogg', ['-c:a', 'libopus', '-b:a', OPUS_BITRATE, '-application', 'voip', '-f', 'ogg']),
+    'mp3': ('audio/mpeg', 'mp3', ['-c:a', 'libmp3lame', '-b:a', MP3_BITRATE, '-f', 'mp3']),
+    'flac': ('audio/flac', 'flac', ['-c:a', 'flac', '-f', 'flac']),
+}
+
+def _parse_output_format(raw):
+    """Return a key of OUTPUT_FORMATS, or None if raw names an unsupported format."""
+    output_format = (raw or 'wav').strip().lower()
+    return output_format if output_format in OUTPUT_FORMATS else None
+
+class AudioEncoder:
+    """One ffmpeg process turning mono int16 PCM on stdin into a compressed stream on stdout."""
+
+    def __init__(self, output_format, sample_rate):
+        self.output_format = output_format
+        cmd = [
+            FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error', '-nostdin',
+            '-f', 's16le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0',
+        ] + OUTPUT_FORMATS[output_format][2] + ['pipe:1']
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._output = queue.Queue()
+        self._stderr_tail = deque(maxlen=20)
+        # Drain stdout continuously so ffmpeg never blocks on a full pipe while we are feeding stdin.
+        threading.Thread(target=self._read_stdout, name="ffmpeg-stdout", daemon=True).start()
+        threading.Thread(target=self._drain_stderr, name="ffmpeg-stderr", daemon=True).start()
+
+    def _read_stdout(self):
+        stream = self.proc.stdout
+        while True:
+            data = stream.read1(65536)
+            if not data:
+                break
+            self._output.put(data)
+        self._output.put(None)
+
+    def _drain_stderr(self):
+        for raw_line in iter(self.proc.stderr.readline, b''):
+            self._stderr_tail.append(raw_line.decode('utf-8', errors='replace').rstrip())
+
+    def is_alive(self):
+        return self.proc.poll() is None
+
+    def _error(self, message):
+        detail = ' | '.join(self._stderr_tail)
+        return RuntimeError(f"ffmpeg {self.output_format} encoder {message}: {detail}")
+
+    def write(self, pcm):
+        try:
+            self.proc.stdin.write(pcm)
+            # Hand small pieces (gaps, short chunks) to ffmpeg now, not on the next write.
+            self.proc.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            raise self._error("exited early")
+
+    def read_available(self):
+        """Encoded bytes produced so far, without waiting."""
+        parts = []
+        while True:
+            try:
+                data = self._output.get_nowait()
+            except queue.Empty:
+                break
+            if data is None:
+                # Keep the end marker for finish().
+                self._output.put(None)
+                break
+            parts.append(data)
+        return b''.join(parts)
+
+    def finish(self):
+        """Close stdin and return the remaining encoded bytes once ffmpeg exits."""
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        parts = []
+        while True:
+            data = self._output.get()
+            if data is None:
+                break
+            parts.append(data)
+        if self.proc.wait() != 0:
+            raise self._error(f"failed (exit {self.proc.returncode})")
+        return b''.join(parts)
+
+    def abort(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+
+_warm_encoders = {}
+# Formats whose spare is being started, so concurrent takes do not start one each.
+_warm_encoders_starting = set()
+_warm_encoders_lock = threading.Lock()
+
+def _start_warm_encoder(output_format, sample_rate):
+    key = (output_format, sample_rate)
+    try:
+        encoder = AudioEncoder(output_format, sample_rate)
+    except OSError as e:
+        print(f"WARNING: could not start ffmpeg: {e}", file=sys.stderr)
+        encoder = None
+    with _warm_encoders_lock:
+        _warm_encoders_starting.discard(key)
+        previous = _warm_encoders.get(key)
+        if encoder is not None:
+            _warm_encoders[key] = encoder
+    if previous is not None and encoder is not None:
+        previous.abort()
+
+def _take_encoder(output_format, sample_rate):
+    """An ffmpeg encoder ready for input: the warm spare if there is one, otherwise a new process."""
+    encoder = None
+    if FFMPEG_WARM_ENCODERS:
+        key = (output_format, sample_rate)
+        with _warm_encoders_lock:
+            encoder = _warm_encoders.pop(key, None)
+            # Refill only an empty slot (spare consumed, dead, or first use of this format)
+            # that no other take is already refilling.
+            refill = key not in _warm_encoders_starting
+            if refill:
+                _warm_encoders_starting.add(key)
+        if refill:
+            threading.Thread(
+                target=_start_warm_encoder, args=key, name="ffmpeg-warm", daemon=True
+            ).start()
+    if encoder is not None and not encoder.is_alive():
+        encoder.abort()
+        encoder = None
+    if encoder is None:
+        encoder = AudioEncoder(output_format, sample_rate)
+    return encoder
+
+def _shutdown_warm_encoders():
+    with _warm_encoders_lock:
+        encoders = list(_warm_encoders.values())
+        _warm_encoders.clear()
+    for encoder in encoders:
+        encoder.abort()
+
+atexit.register(_shutdown_warm_encoders)
+
+def _encode_output(wav_buffer, output_format, sample_rate=MODEL_SAMPLE_RATE):
+    """
+    Encode an assembled WAV (BytesIO from _assemble_wav) to output_format. The PCM is fed
+    to ffmpeg in blocks straight from the buffer; wav is returned unchanged.
+    """
+    if output_format == 'wav':
+        return wav_buffer
+    with _timed('encode'):
+        encoder = _take_encoder(output_format, sample_rate)
+        view = wav_buffer.getbuffer()
+        try:
+            block = _NORMALIZE_BLOCK_SAMPLES * 2
+            for start in range(44, len(view), block):
+                encoder.write(view[start:start + block])
+            encoded = encoder.finish()
+        except BaseException:
+            encoder.abort()
+            raise
+        finally:
+            view.release()
+    return io.BytesIO(encoded)
+
+def _stream_encoded(pcm_pieces, output_format, sample_rate=MODEL_SAMPLE_RATE):
+    """Feed streamed PCM pieces through ffmpeg, yielding encoded bytes as soon as they appear."""
+    encoder = _take_encoder(output_format, sample_rate)
+    try:
+        for pcm in pcm_pieces:
+            encoder.write(pcm)
+            data = encoder.read_available()
+            if data:
+                yield data
+        data = encoder.finish()
+        if data:
+            yield data
+    finally:
+        pcm_pieces.close()
+        encoder.abort()
+
+def _job_request_key(text, length_scale, noise_scale, noise_w, pause_scale, output_format='wav'):
+    raw = json.dumps([text, length_scale, noise_scale, noise_w, pause_scale, output_format], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _release_job(job_id):
+    """Drop a job id and its reference on the shared flight. Caller holds _jobs_lock."""
+    job = _jobs.pop(job_id, None)
+    if job is None:
+        return
+    flight = job['flight']
+    flight['subscribers'] -= 1
+    if flight['subscribers'] <= 0:
+        # Last subscriber gone: free the audio even if the flight is still referenced elsewhere.
+        _drop_flight_result(flight)
+
+def _drop_flight_result(flight):
+    """Free a flight's finished audio, in memory or spilled. Caller holds _jobs_lock."""
+    global _job_store_memory_bytes
+    if flight['result'] is not None:
+        _job_store_memory_bytes -= flight['result_bytes']
+        flight['result'] = None
+    if flight['result_path'] is not None:
+        try:
+            os.remove(flight['result_path'])
+        except OSError:
+            pass
+        flight['result_path'] = None
+
+def _flight_progress(flight):
+    """Progress snapshot of a flight. Caller holds _jobs_lock."""
+    elapsed = (flight['finished'] or time.time()) - flight['started']
+    audio_seconds = flight['audio_bytes'] / 2 / flight['sample_rate']
+    done, total = flight['chunks_done'], flight['chunks_total']
+    eta = None
+    if flight['status'] == 'processing' and total and done and elapsed > 0:
+        eta = round(elapsed / done * (total - done), 1)
+    return {
+        'chunks_done': done,
+        'chunks_total': total,
+        'audio_seconds': round(audio_seconds, 2),
+        'elapsed_seconds': round(elapsed, 2),
+        # Seconds of audio produced per wall-clock second so far.
+        'rate': round(audio_seconds / elapsed, 2) if elapsed > 0 else None,
+        'eta_seconds': eta,
+    }
 
 def _purge_old_jobs():
     """Remove jobs older than JOB_TTL_SECONDS."""
@@ -1041,13 +2975,197 @@ def _purge_old_jobs():
     with _jobs_lock:
         expired = [jid for jid, j in _jobs.items() if now - j['created'] > JOB_TTL_SECONDS]
         for jid in expired:
-            del _jobs[jid]
+            _release_job(jid)
     if expired:
         print(f"Purged {len(expired)} expired jobs", file=sys.stderr)
 
+_job_spill_dir = None
+
+def _job_spill_path(suffix):
+    global _job_spill_dir
+    if _job_spill_dir is None:
+        _job_spill_dir = tempfile.mkdtemp(prefix="tts-jobs-", dir=JOB_SPILL_DIR or None)
+        atexit.register(shutil.rmtree, _job_spill_dir, True)
+    fd, path = tempfile.mkstemp(suffix=f".{suffix}", dir=_job_spill_dir)
+    return fd, path
+
+def _spill_job_results():
+    """Move the oldest in-memory results to disk until the store fits JOB_STORE_MEMORY_MB."""
+    global _job_store_memory_bytes
+    budget = max(0, JOB_STORE_MEMORY_MB) * 1024 * 1024
+    spilled = 0
+    while True:
+        with _jobs_lock:
+            if _job_store_memory_bytes <= budget:
+                break
+            held = {id(j['flight']): j['flight'] for j in _jobs.values()
+                    if j['flight']['result'] is not None and not j['flight'].get('spilling')}
+            if not held:
+                break
+            flight = min(held.values(), key=lambda f: f['finished'])
+            flight['spilling'] = True
+            buffer = flight['result']
+
+        # Written outside the lock; getvalue() shares the bytes, so this copies nothing in memory.
+        try:
+            fd, path = _job_spill_path(OUTPUT_FORMATS[flight['output_format']][1])
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buffer.getvalue())
+        except OSError as e:
+            print(f"Job store: spill failed: {e}", file=sys.stderr)
+            with _jobs_lock:
+                flight['spilling'] = False
+            break
+
+        with _jobs_lock:
+            flight['spilling'] = False
+            if flight['result'] is buffer:
+                _job_store_memory_bytes -= flight['result_bytes']
+                flight['result'] = None
+                flight['result_path'] = path
+                path = None
+                spilled += 1
+        if path is not None:
+            # Released while being written.
+            os.remove(path)
+    if spilled:
+        print(f"Job store: spilled {spilled} results to disk", file=sys.stderr)
+
+_job_reaper_wake = threading.Event()
+
+def _job_reaper():
+    while True:
+        _job_reaper_wake.wait(timeout=max(1.0, JOB_REAPER_INTERVAL_SECONDS))
+        _job_reaper_wake.clear()
+        try:
+            _purge_old_jobs()
+            _spill_job_results()
+        except Exception as e:
+            print(f"Job reaper error: {e}", file=sys.stderr)
+
+threading.Thread(target=_job_reaper, name="tts-job-reaper", daemon=True).start()
+
+def _job_store_stats():
+    with _jobs_lock:
+        flights = {id(j['flight']): j['flight'] for j in _jobs.values()}.values()
+        return {
+            'jobs': len(_jobs),
+            'memory_bytes': _job_store_memory_bytes,
+            'memory_budget_bytes': max(0, JOB_STORE_MEMORY_MB) * 1024 * 1024,
+            'results_in_memory': sum(1 for f in flights if f['result'] is not None),
+            'results_on_disk': sum(1 for f in flights if f['result_path'] is not None),
+        }
+
 @app.route('/health', methods=['GET'])
 def health():
-    return "ok", 200
+    return jsonify({
+        'status': 'ok',
+        'engine': 'onnx' if _onnx_engine is not None else 'piper',
+        'piper_pool': _piper_pool.stats() if _piper_pool is not None else None,
+        'phoneme_cache': _phoneme_cache.stats(),
+        'chunk_cache': _chunk_cache.stats(),
+        'job_store': _job_store_stats(),
+        'scheduler': _scheduler.stats(),
+        'chunk_cost_model': _chunk_cost_model.stats(),
+        'auto_tune': _auto_tune_result,
+        'emotional_voice': {
+            'speakers': _emotion_speakers,
+            'piper_pool': _emotional_pool.stats() if _emotional_pool is not None else None,
+            'scheduler': _emotional_scheduler.stats(),
+        } if _emotional_scheduler is not None else None,
+    }), 200
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+# counter name -> (exposed name, type, help)
+_METRIC_COUNTERS = {
+    'chars': ('tts_input_chars_total', 'counter', 'Characters of input text received for synthesis.'),
+    'audio_seconds': ('tts_audio_seconds_total', 'counter', 'Seconds of audio produced (assembled or streamed).'),
+    'errors': ('tts_errors_total', 'counter', 'Failed requests, jobs and batch items by exception type.'),
+}
+
+def _render_metrics():
+    """Prometheus text exposition (format 0.0.4) of the recorded metrics and current gauges."""
+    totals = _metrics.snapshot()
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_prometheus_labels(labels)} {value:.10g}")
+
+    counters = {key: [] for key in _METRIC_COUNTERS}
+    histograms = []
+    oneshot_running = 0
+    for key, value in sorted(totals.items(), key=lambda item: repr(item[0])):
+        if key[0] == 'stage_seconds':
+            histograms.append((key[1], value))
+        elif key[0] == 'piper_oneshot_running':
+            oneshot_running = value
+        else:
+            counters[key[0]].append((key[1], value))
+
+    for key, (name, kind, help_text) in _METRIC_COUNTERS.items():
+        samples = counters[key]
+        if not samples and key != 'errors':
+            # Unlabelled counters are exported as 0 before their first increment.
+            samples = [((), 0)]
+        family(name, kind, help_text, samples)
+
+    lines.append("# HELP tts_stage_seconds Latency of pipeline stages: text_prep, queue_wait, chunk_synth, "
+                 "batch_synth, concat, normalize, encode.")
+    lines.append("# TYPE tts_stage_seconds histogram")
+    for stage, hist in histograms:
+        cumulative = 0
+        for bound, count in zip(_metrics.buckets + (float('inf'),), hist):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else f"{bound:g}"
+            lines.append(f"tts_stage_seconds_bucket{_prometheus_labels((('stage', stage), ('le', le)))} {cumulative}")
+        lines.append(f"tts_stage_seconds_sum{_prometheus_labels((('stage', stage),))} {hist[-1]:.10g}")
+        lines.append(f"tts_stage_seconds_count{_prometheus_labels((('stage', stage),))} {cumulative}")
+
+    with _jobs_lock:
+        statuses = [flight['status'] for flight in {id(j['flight']): j['flight'] for j in _jobs.values()}.values()]
+    family('tts_jobs', 'gauge', 'Async job flights in the job store by status (processing = queued or running).',
+           [((('status', status),), statuses.count(status)) for status in ('processing', 'ready', 'error')])
+
+    schedulers = [('narrator', _scheduler)]
+    if _emotional_scheduler is not None:
+        schedulers.append(('emotional', _emotional_scheduler))
+    queued, running = [], []
+    for name, scheduler in schedulers:
+        stats = scheduler.stats()
+        for priority, count in stats['queued'].items():
+            queued.append(((('scheduler', name), ('priority', priority)), count))
+        running.append(((('scheduler', name),), stats['running']))
+    family('tts_scheduler_queued_chunks', 'gauge', 'Chunks waiting for a synthesis slot.', queued)
+    family('tts_scheduler_running_chunks', 'gauge', 'Chunks being synthesized.', running)
+
+    alive, busy = [], []
+    for name, pool in (('narrator', _piper_pool), ('emotional', _emotional_pool)):
+        if pool is not None:
+            stats = pool.stats()
+            alive.append(((('pool', name),), stats['alive']))
+            busy.append(((('pool', name),), max(0, stats['alive'] - stats['idle'])))
+    alive.append(((('pool', 'oneshot'),), oneshot_running))
+    busy.append(((('pool', 'oneshot'),), oneshot_running))
+    family('tts_piper_processes', 'gauge', 'Running Piper processes (pool workers and one-shot calls).', alive)
+    family('tts_piper_busy_processes', 'gauge', 'Piper processes currently synthesizing a chunk.', busy)
+
+    return '\n'.join(lines) + '\n'
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(_render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 # ── Async job endpoints ───────────────────────────────────────────────────────
 
@@ -1057,8 +3175,11 @@ def generate_async():
     Submit a TTS generation job. Returns immediately with a job_id.
     The actual generation runs in the background.
 
-    Request: { "text": "...", "length_scale": 1.55, "noise_scale": 0.42, "noise_w": 0.38 }
-    Response: { "job_id": "uuid" }
+    Identical requests submitted while a matching job is still running share its result.
+
+    Request: { "text": "...", "length_scale": 1.55, "noise_scale": 0.42, "noise_w": 0.38, "pause_scale": 1.0,
+               "output_format": "wav" | "opus" | "mp3" | "flac" }
+    Response: { "job_id": "uuid", "shared": false }
     """
     if not request.is_json:
         return "JSON body required", 400
@@ -1071,89 +3192,272 @@ def generate_async():
     length_scale = _to_float(data.get('length_scale'), DEFAULT_LENGTH_SCALE)
     noise_scale = _to_float(data.get('noise_scale'), DEFAULT_NOISE_SCALE)
     noise_w = _to_float(data.get('noise_w'), DEFAULT_NOISE_W)
+    pause_scale = _to_float(data.get('pause_scale'), 1.0)
+    output_format = _parse_output_format(data.get('output_format'))
+    if output_format is None:
+        return "Unsupported output_format", 400
 
     _purge_old_jobs()
 
     job_id = str(uuid.uuid4())
+    key = _job_request_key(text, length_scale, noise_scale, noise_w, pause_scale, output_format)
     with _jobs_lock:
+        flight = _inflight.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = {
+                'key': key,
+                'status': 'processing',
+                'result': None,
+                'result_path': None,
+                'result_bytes': 0,
+                'output_format': output_format,
+                'error': None,
+                'subscribers': 0,
+                'started': time.time(),
+                'finished': None,
+                'chunks_done': 0,
+                'chunks_total': None,
+                'audio_bytes': 0,
+                'sample_rate': _output_sample_rate(),
+                'version': 0,
+            }
+            _inflight[key] = flight
+        flight['subscribers'] += 1
         _jobs[job_id] = {
-            'status': 'processing',
-            'result': None,
-            'error': None,
+            'flight': flight,
             'created': time.time(),
         }
 
+    if shared:
+        print(f"Job {job_id}: joined running identical job ({flight['subscribers']} subscribers)", file=sys.stderr)
+        return jsonify({'job_id': job_id, 'shared': True}), 202
+
     print(f"Job {job_id}: queued (text len={len(text)})", file=sys.stderr)
 
+    def report_progress(chunks_done, chunks_total, audio_bytes):
+        with _jobs_changed:
+            flight['chunks_done'] = chunks_done
+            flight['chunks_total'] = chunks_total
+            flight['audio_bytes'] = audio_bytes
+            flight['version'] += 1
+            _jobs_changed.notify_all()
+
     def run_job():
+        global _job_store_memory_bytes
         start = time.time()
         try:
-            result = _do_generate(text, length_scale, noise_scale, noise_w)
+            result = _do_generate(
+                text, length_scale, noise_scale, noise_w, pause_scale,
+                progress=report_progress, priority=PRIORITY_ASYNC,
+            )
+            result = _encode_output(result, output_format, _output_sample_rate())
             elapsed = time.time() - start
-            print(f"Job {job_id}: ready ({len(result)} bytes, {elapsed:.1f}s)", file=sys.stderr)
-            with _jobs_lock:
-                if job_id in _jobs:
-                    _jobs[job_id]['status'] = 'ready'
-                    _jobs[job_id]['result'] = result
+            print(f"Job {job_id}: ready ({result.getbuffer().nbytes} bytes, {elapsed:.1f}s)", file=sys.stderr)
+            with _jobs_changed:
+                flight['status'] = 'ready'
+                if flight['subscribers'] > 0:
+                    flight['result'] = result
+                    flight['result_bytes'] = result.getbuffer().nbytes
+                    _job_store_memory_bytes += flight['result_bytes']
+                    over_budget = _job_store_memory_bytes > max(0, JOB_STORE_MEMORY_MB) * 1024 * 1024
+                else:
+                    over_budget = False
+                flight['finished'] = time.time()
+                flight['version'] += 1
+                _inflight.pop(key, None)
+                _jobs_changed.notify_all()
+            if over_budget:
+                _job_reaper_wake.set()
         except Exception as e:
             elapsed = time.time() - start
             print(f"Job {job_id}: error after {elapsed:.1f}s: {e}", file=sys.stderr)
-            with _jobs_lock:
-                if job_id in _jobs:
-                    _jobs[job_id]['status'] = 'error'
-                    _jobs[job_id]['error'] = str(e)
+            _metrics.inc('errors', type=type(e).__name__)
+            with _jobs_changed:
+                flight['status'] = 'error'
+                flight['error'] = str(e)
+                flight['finished'] = time.time()
+                flight['version'] += 1
+                _inflight.pop(key, None)
+                _jobs_changed.notify_all()
 
     _job_executor.submit(run_job)
 
-    return jsonify({'job_id': job_id}), 202
+    return jsonify({'job_id': job_id, 'shared': False}), 202
 
 
 @app.route('/generate/status/<job_id>', methods=['GET'])
 def generate_status(job_id):
     """
     Poll job status.
-    Response: { "status": "processing" | "ready" | "error", "error": null | "message" }
+    Response: { "status": "processing" | "ready" | "error", "error": null | "message", "progress": {...} }
     """
     with _jobs_lock:
         job = _jobs.get(job_id)
-
-    if job is None:
-        return jsonify({'status': 'not_found'}), 404
+        if job is None:
+            return jsonify({'status': 'not_found'}), 404
+        flight = job['flight']
+        status = flight['status']
+        progress = _flight_progress(flight)
 
     return jsonify({
-        'status': job['status'],
-        'error': job.get('error'),
+        'status': status,
+        'error': flight.get('error'),
+        'progress': progress,
     }), 200
 
 
+@app.route('/generate/events/<job_id>', methods=['GET'])
+def generate_events(job_id):
+    """
+    Server-Sent Events feed of job progress, replacing status polling.
+    Emits "progress" events while chunks complete, then one final "ready" or "error" event.
+    data: { "status": ..., "error": ..., "progress": { "chunks_done", "chunks_total", "audio_seconds",
+            "elapsed_seconds", "rate", "eta_seconds" } }
+    Returns 503 with a status_url to poll when SSE_MAX_STREAMS streams are already open.
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'job not found'}), 404
+        flight = job['flight']
+
+    if _sse_slots is None or not _sse_slots.acquire(blocking=False):
+        response = jsonify({
+            'error': 'too many open event streams',
+            'status_url': f'/generate/status/{job_id}',
+        })
+        response.headers['Retry-After'] = '2'
+        return response, 503
+
+    def events():
+        seen = None
+        while True:
+            with _jobs_changed:
+                _jobs_changed.wait_for(
+                    lambda: flight['version'] != seen or flight['status'] != 'processing',
+                    timeout=SSE_KEEPALIVE_SECONDS,
+                )
+                if flight['version'] == seen and flight['status'] == 'processing':
+                    payload = None
+                else:
+                    seen = flight['version']
+                    status = flight['status']
+                    payload = {'status': status, 'error': flight.get('error'), 'progress': _flight_progress(flight)}
+            if payload is None:
+                yield ": keepalive\n\n"
+                continue
+            event = 'progress' if status == 'processing' else status
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+            if status != 'processing':
+                return
+
+    response = Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # Runs when the stream ends or the client goes away, even if it was never iterated.
+    response.call_on_close(_sse_slots.release)
+    return response
+
+
 @app.route('/generate/result/<job_id>', methods=['GET'])
 def generate_result(job_id):
     """
-    Fetch completed job result as WAV audio.
-    Returns 202 if still processing, 200 with audio/wav if ready, 500 if error.
+    Fetch completed job result in the job's output_format (WAV by default).
+    Returns 202 if still processing, 200 with the audio if ready, 500 if error.
     """
     with _jobs_lock:
         job = _jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'job not found'}), 404
 
-    if job is None:
-        return jsonify({'error': 'job not found'}), 404
-
-    if job['status'] == 'processing':
-        return jsonify({'status': 'processing'}), 202
+        flight = job['flight']
+        if flight['status'] == 'processing':
+            return jsonify({'status': 'processing'}), 202
 
-    if job['status'] == 'error':
-        return jsonify({'error': job.get('error', 'unknown error')}), 500
+        if flight['status'] == 'error':
+            return jsonify({'error': flight.get('error') or 'unknown error'}), 500
 
-    # Ready — serve audio and clean up job
-    result_bytes = job['result']
-    with _jobs_lock:
-        _jobs.pop(job_id, None)
+        # Ready — take this subscriber's reference and clean up the job
+        if flight['result_path'] is not None:
+            # Open before releasing: the handle stays valid if this was the last subscriber and the file is removed.
+            result_file = open(flight['result_path'], 'rb')
+        else:
+            # getvalue() shares the underlying bytes, so each subscriber gets its own read position without a copy.
+            result_file = io.BytesIO(flight['result'].getvalue())
+        mimetype, extension, _ = OUTPUT_FORMATS[flight['output_format']]
+        _release_job(job_id)
 
     return send_file(
-        io.BytesIO(result_bytes),
-        mimetype="audio/wav",
+        result_file,
+        mimetype=mimetype,
         as_attachment=False,
-        download_name="tts.wav"
+        download_name=f"tts.{extension}"
+    )
+
+@app.route('/generate/stream', methods=['POST'])
+def generate_stream():
+    """
+    Stream WAV audio while the story is still being synthesized.
+    The header carries an open-ended size; chunk PCM and pauses follow in text order.
+
+    With "output_format" opus/mp3/flac the PCM is piped through ffmpeg while later chunks
+    are still rendering and the encoded stream is sent instead.
+
+    Request: { "text": "...", "length_scale": 1.55, "noise_scale": 0.42, "noise_w": 0.38, "pause_scale": 1.0,
+               "output_format": "wav" }
+    Response: audio/wav (or the format's mimetype), chunked transfer
+    """
+    if not request.is_json:
+        return "JSON body required", 400
+
+    data = request.json
+    text = data.get('text', '')
+    if not text:
+        return "No text provided", 400
+
+    length_scale = _to_float(data.get('length_scale'), DEFAULT_LENGTH_SCALE)
+    noise_scale = _to_float(data.get('noise_scale'), DEFAULT_NOISE_SCALE)
+    noise_w = _to_float(data.get('noise_w'), DEFAULT_NOISE_W)
+    pause_scale = _to_float(data.get('pause_scale'), 1.0)
+    output_format = _parse_output_format(data.get('output_format'))
+    if output_format is None:
+        return "Unsupported output_format", 400
+
+    print(f"Stream request: len={len(text)}, speed={length_scale}, noise={noise_scale}, noise_w={noise_w}", file=sys.stderr)
+    chunks, chunk_params = _prepare_chunks(text, length_scale, noise_scale, noise_w)
+    if not chunks:
+        return "No speakable text", 400
+    sample_rate = _output_sample_rate()
+
+    def generate():
+        start = time.time()
+        sent = 0
+        try:
+            if output_format == 'wav':
+                pieces = _stream_wav(chunks, chunk_params, sample_rate, pause_scale)
+            else:
+                pieces = _stream_encoded(
+                    _stream_pcm(chunks, chunk_params, sample_rate, pause_scale), output_format, sample_rate
+                )
+            for piece in pieces:
+                sent += len(piece)
+                yield piece
+        except GeneratorExit:
+            print(f"Stream closed by client after {sent} bytes ({time.time() - start:.1f}s)", file=sys.stderr)
+            raise
+        except Exception as e:
+            print(f"Stream error after {sent} bytes: {e}", file=sys.stderr)
+            _metrics.inc('errors', type=type(e).__name__)
+            return
+        print(f"Stream done: {len(chunks)} chunks, {sent} bytes, {time.time() - start:.1f}s", file=sys.stderr)
+
+    return Response(
+        generate(),
+        mimetype=OUTPUT_FORMATS[output_format][0],
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no', 'X-TTS-Chunks': str(len(chunks))},
     )
 
 # ── Legacy synchronous endpoints (kept for backward compatibility) ─────────────
@@ -1165,6 +3469,8 @@ def generate_tts():
     length_scale = DEFAULT_LENGTH_SCALE
     noise_scale = DEFAULT_NOISE_SCALE
     noise_w = DEFAULT_NOISE_W
+    pause_scale = 1.0
+    output_format = None
 
     if request.method == 'POST':
         if request.is_json:
@@ -1173,6 +3479,8 @@ def generate_tts():
             length_scale = _to_float(data.get('length_scale'), DEFAULT_LENGTH_SCALE)
             noise_scale = _to_float(data.get('noise_scale'), DEFAULT_NOISE_SCALE)
             noise_w = _to_float(data.get('noise_w'), DEFAULT_NOISE_W)
+            pause_scale = _to_float(data.get('pause_scale'), 1.0)
+            output_format = data.get('output_format')
         else:
             text = request.form.get('text')
             # form handling for params if needed, but JSON is main use case
@@ -1182,6 +3490,9 @@ def generate_tts():
                 noise_scale = _to_float(request.form.get('noise_scale'), DEFAULT_NOISE_SCALE)
             if request.form.get('noise_w'):
                 noise_w = _to_float(request.form.get('noise_w'), DEFAULT_NOISE_W)
+            if request.form.get('pause_scale'):
+                pause_scale = _to_float(request.form.get('pause_scale'), 1.0)
+            output_format = request.form.get('output_format')
 
     if not text:
         text = request.args.get('text')
@@ -1192,98 +3503,199 @@ def generate_tts():
             noise_scale = _to_float(request.args.get('noise_scale'), DEFAULT_NOISE_SCALE)
         if request.args.get('noise_w'):
             noise_w = _to_float(request.args.get('noise_w'), DEFAULT_NOISE_W)
+        if request.args.get('pause_scale'):
+            pause_scale = _to_float(request.args.get('pause_scale'), 1.0)
+    if not output_format:
+        output_format = request.args.get('output_format')
 
     if not text:
         print("Error: No text provided in request", file=sys.stderr)
         return "No text provided", 400
 
+    output_format = _parse_output_format(output_format)
+    if output_format is None:
+        return "Unsupported output_format", 400
+
     print(f"Sync request: len={len(text)}, speed={length_scale}, noise={noise_scale}, noise_w={noise_w}", file=sys.stderr)
     start_time = time.time()
 
     try:
-        result = _do_generate(text, length_scale, noise_scale, noise_w)
+        result = _do_generate(text, length_scale, noise_scale, noise_w, pause_scale)
+        result = _encode_output(result, output_format, _output_sample_rate())
         total_time = time.time() - start_time
-        print(f"Successfully generated audio. Size: {len(result)} bytes, Total time: {total_time:.1f}s", file=sys.stderr)
+        print(f"Successfully generated audio. Size: {result.getbuffer().nbytes} bytes ({output_format}), Total time: {total_time:.1f}s", file=sys.stderr)
 
+        mimetype, extension, _ = OUTPUT_FORMATS[output_format]
         return send_file(
-            io.BytesIO(result),
-            mimetype="audio/wav",
+            result,
+            mimetype=mimetype,
             as_attachment=False,
-            download_name="tts.wav"
+            download_name=f"tts.{extension}"
         )
 
     except Exception as e:
         print(f"Server exception: {e}", file=sys.stderr)
+        _metrics.inc('errors', type=type(e).__name__)
         return str(e), 500
 
+def _multipart_part_header(boundary, headers):
+    """Delimiter, headers and blank line opening one multipart/mixed part (body and CRLF follow)."""
+    lines = [f"--{boundary}"] + [f"{name}: {value}" for name, value in headers] + ['', '']
+    return '\r\n'.join(lines).encode('ascii')
+
 @app.route('/batch', methods=['POST'])
 def generate_tts_batch():
     """
     Batch endpoint: generate multiple TTS items in parallel.
-    Request: { "items": [{ "id": "chunk-1", "text": "..." }, ...], "length_scale": 1.55, ... }
+    Request: { "items": [{ "id": "chunk-1", "text": "..." }, ...], "length_scale": 1.55, ..., "output_format": "wav" }
     Response: { "results": [{ "id": "chunk-1", "audio": "base64...", "error": null }, ...] }
+
+    Binary mode ("response": "multipart" or Accept: multipart/mixed) streams a multipart/mixed
+    body instead: a JSON manifest part { "count", "items": [{ "index", "id" }] }, then one
+    part per item as soon as it is finished, audio/wav with X-Item-Index / X-Item-Id headers,
+    or application/json { "index", "id", "error" } if the item failed.
     """
     if not request.is_json:
         return "JSON body required", 400
 
     data = request.json
     items = data.get('items', [])
-    if not items:
+    multipart = (
+        data.get('response') == 'multipart'
+        or request.accept_mimetypes.best == 'multipart/mixed'
+    )
+    if not items and not multipart:
         return jsonify({"results": []}), 200
 
     length_scale = _to_float(data.get('length_scale'), DEFAULT_LENGTH_SCALE)
     noise_scale = _to_float(data.get('noise_scale'), DEFAULT_NOISE_SCALE)
     noise_w = _to_float(data.get('noise_w'), DEFAULT_NOISE_W)
+    pause_scale = _to_float(data.get('pause_scale'), 1.0)
+    output_format = _parse_output_format(data.get('output_format'))
+    if output_format is None:
+        return "Unsupported output_format", 400
+    mimetype = OUTPUT_FORMATS[output_format][0]
 
     print(f"Batch request: {len(items)} items, speed={length_scale}", file=sys.stderr)
     start_time = time.time()
+    sample_rate = _output_sample_rate()
 
-    def process_item(item):
+    # Split every item up front (same front-end and prosody smoothing as a single text), then
+    # queue all chunks of the batch as one scheduler job in item order. Idle slots pick up the
+    # next chunk of the batch instead of waiting behind one long item.
+    prepared = []
+    for item in items:
         item_id = item.get('id', 'unknown')
         text = item.get('text', '')
         if not text:
-            return {"id": item_id, "audio": None, "error": "No text"}
+            prepared.append({"id": item_id, "chunks": None, "error": "No text"})
+            continue
         try:
-            text = preprocess_text(text)
-            text = prepare_for_tts(text)
-            text = _enhance_story_text_for_tts(text)
-            text = _apply_custom_pronunciations(text)
-            chunks = split_text_into_chunks(text)
-
-            wav_chunks = []
-            for i, chunk in enumerate(chunks):
-                chunk_length, chunk_noise, chunk_noise_w = _derive_chunk_params(
-                    chunk, length_scale, noise_scale, noise_w
-                )
-                wav_data = generate_wav_chunk(chunk, chunk_length, chunk_noise, chunk_noise_w)
-                wav_chunks.append(wav_data)
-                if i < len(chunks) - 1:
-                    wav_chunks.append(_get_silence_between(chunks[i], chunks[i + 1]))
-
-            result_wav = _postprocess_output_wav(concatenate_wav(wav_chunks))
-            audio_b64 = base64.b64encode(result_wav).decode('ascii')
-            return {"id": item_id, "audio": f"data:audio/wav;base64,{audio_b64}", "error": None}
+            chunks, chunk_params = _prepare_chunks(text, length_scale, noise_scale, noise_w)
+            prepared.append({"id": item_id, "chunks": chunks, "params": chunk_params, "error": None})
         except Exception as e:
             print(f"Batch item {item_id} error: {e}", file=sys.stderr)
-            return {"id": item_id, "audio": None, "error": str(e)}
-
-    # Process all items in parallel
-    workers = min(MAX_PARALLEL_PIPER, len(items))
-    results = [None] * len(items)
+            _metrics.inc('errors', type=type(e).__name__)
+            prepared.append({"id": item_id, "chunks": None, "error": str(e)})
+
+    job = _scheduler.new_job()
+    item_futures = []
+    for entry in prepared:
+        futures = []
+        if entry['chunks'] is not None:
+            for chunk, (chunk_length, chunk_noise, chunk_noise_w) in zip(entry['chunks'], entry['params']):
+                futures.append(_scheduler_for(chunk).submit(
+                    PRIORITY_BATCH, job, generate_pcm_chunk, chunk, chunk_length, chunk_noise, chunk_noise_w
+                ))
+        item_futures.append(futures)
+
+    def finish_item(idx):
+        """Wait for one item's chunks and assemble its WAV with the single-text silence rules."""
+        entry = prepared[idx]
+        if entry['error'] is not None:
+            return {"id": entry['id'], "buffer": None, "error": entry['error']}
+        try:
+            pcm_chunks = [future.result() for future in item_futures[idx]]
+            item_futures[idx] = None
+            result_wav = _assemble_wav(pcm_chunks, entry['chunks'], sample_rate, pause_scale)
+            return {"id": entry['id'], "buffer": _encode_output(result_wav, output_format, sample_rate), "error": None}
+        except Exception as e:
+            print(f"Batch item {entry['id']} error: {e}", file=sys.stderr)
+            _metrics.inc('errors', type=type(e).__name__)
+            return {"id": entry['id'], "buffer": None, "error": str(e)}
+
+    def cancel_pending():
+        for futures in item_futures:
+            for future in futures or ():
+                future.cancel()
+
+    chunk_count = sum(len(futures) for futures in item_futures)
+
+    if multipart:
+        boundary = uuid.uuid4().hex
+
+        def parts():
+            manifest = json.dumps({
+                'count': len(items),
+                'items': [{'index': i, 'id': entry['id']} for i, entry in enumerate(prepared)],
+            }).encode('utf-8')
+            yield _multipart_part_header(boundary, [('Content-Type', 'application/json'), ('Content-Length', len(manifest))])
+            yield manifest
+            yield b'\r\n'
+
+            ok_count = 0
+            try:
+                # The queue runs in item order, so items complete (and are sent) in that order.
+                for idx in range(len(prepared)):
+                    result = finish_item(idx)
+                    id_header = urllib.parse.quote(str(result['id']), safe='')
+                    if result['buffer'] is not None:
+                        # getvalue() shares the assembled buffer; nothing is re-encoded or copied.
+                        body = result['buffer'].getvalue()
+                        content_type = mimetype
+                        ok_count += 1
+                    else:
+                        body = json.dumps({'index': idx, 'id': result['id'], 'error': result['error']}).encode('utf-8')
+                        content_type = 'application/json'
+                    yield _multipart_part_header(boundary, [
+                        ('Content-Type', content_type),
+                        ('Content-Length', len(body)),
+                        ('X-Item-Index', idx),
+                        ('X-Item-Id', id_header),
+                    ])
+                    yield body
+                    yield b'\r\n'
+                yield f"--{boundary}--\r\n".encode('ascii')
+                total_time = time.time() - start_time
+                print(f"Batch done: {ok_count}/{len(items)} ok, {chunk_count} chunks, {total_time:.1f}s (multipart)", file=sys.stderr)
+            finally:
+                cancel_pending()
+
+        response = Response(
+            parts(),
+            mimetype=f"multipart/mixed; boundary={boundary}",
+            headers={'X-Accel-Buffering': 'no'},
+        )
+        # A client that leaves before the first part is pulled never starts parts(), so its
+        # finally never runs; closing the response still cancels the queued chunks.
+        response.call_on_close(cancel_pending)
+        return response
 
-    if workers <= 1:
-        for i in range(len(items)):
-            results[i] = process_item(items[i])
-    else:
-        with ThreadPoolExecutor(max_workers=workers) as pool:
-            futures = {pool.submit(process_item, items[i]): i for i in range(len(items))}
-            for future in as_completed(futures):
-                idx = futures[future]
-                results[idx] = future.result()
+    results = []
+    try:
+        for idx in range(len(prepared)):
+            result = finish_item(idx)
+            audio = None
+            if result['buffer'] is not None:
+                audio_b64 = base64.b64encode(result['buffer'].getbuffer()).decode('ascii')
+                audio = f"data:{mimetype};base64,{audio_b64}"
+            results.append({"id": result['id'], "audio": audio, "error": result['error']})
+    finally:
+        cancel_pending()
 
     total_time = time.time() - start_time
     ok_count = sum(1 for r in results if r and r.get('audio'))
-    print(f"Batch done: {ok_count}/{len(items)} ok, {total_time:.1f}s ({workers} workers)", file=sys.stderr)
+    print(f"Batch done: {ok_count}/{len(items)} ok, {chunk_count} chunks, {total_time:.1f}s", file=sys.stderr)
 
     return jsonify({"results": results}), 200
 